@@ -0,0 +1,320 @@
+import os
+import math
+import asyncio
+import time
+import heapq
+import itertools
+import threading
+
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from metrics import QUEUE_DEPTH
+
+
+class Priority(IntEnum):
+    """Admission priority classes; lower values are served first"""
+    INTERACTIVE = 0
+    BATCH = 1
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> "Priority":
+        if not value:
+            return cls.INTERACTIVE
+        try:
+            return cls[value.strip().upper()]
+        except KeyError:
+            raise ValueError(f"Unknown priority: {value}")
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of queued.
+
+    Attributes:
+        status_code: 429 for per-client limits, 503 for overload / missed deadlines
+        retry_after: Suggested seconds before retrying
+        reason: Short machine-readable reason (client_limit, queue_full, deadline)
+    """
+
+    def __init__(self, status_code: int, retry_after: float, reason: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission in front of the crew.
+
+    At most `max_concurrent` requests run at once; the rest wait in a queue
+    of at most `max_queue` entries, interactive before batch and FIFO within
+    a class. Each client may hold at most `per_client_limit` running or
+    queued requests. A request is rejected up front when its projected queue
+    wait already exceeds its deadline, and dropped from the queue once the
+    deadline passes, instead of burning LLM tokens on an answer nobody will
+    receive.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        per_client_limit: Optional[int] = None,
+        initial_service_time: float = 30.0,
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrent: Requests running at once (env AI_MAX_CONCURRENT_CREWS, default 8)
+            max_queue: Requests allowed to wait (env AI_ADMISSION_QUEUE, default 64)
+            per_client_limit: Running + queued requests per client (env AI_PER_CLIENT_LIMIT, default 4)
+            initial_service_time: Service time estimate (seconds) before any request finished
+        """
+        self.max_concurrent = max_concurrent or int(os.getenv("AI_MAX_CONCURRENT_CREWS", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("AI_ADMISSION_QUEUE", "64"))
+        self.per_client_limit = per_client_limit or int(os.getenv("AI_PER_CLIENT_LIMIT", "4"))
+
+        # Exponentially weighted moving average of request service time
+        self.service_time = initial_service_time
+        self._alpha = 0.2
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._per_client: Dict[str, int] = {}
+        # (loop, event) of each coroutine queued in admit_async
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.rejected: Dict[str, int] = {}
+
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def running(self) -> int:
+        return self._running
+
+    def projected_wait(self, priority: Priority = Priority.INTERACTIVE) -> float:
+        """Estimated seconds a new request of this priority would wait for a slot"""
+        with self._cond:
+            return self._projected_wait(priority)
+
+    def _projected_wait(self, priority: Priority) -> float:
+        ahead = sum(1 for p, _ in self._queue if p <= priority)
+        free = self.max_concurrent - self._running
+        if ahead < free:
+            return 0.0
+        # Every max_concurrent completions move the line forward by one "round"
+        rounds = (ahead - free) // self.max_concurrent + 1
+        return rounds * self.service_time
+
+    @contextmanager
+    def admit(
+        self,
+        client_id: Optional[str],
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None,
+    ) -> Iterator[float]:
+        """
+        Hold a slot for the duration of the with-block.
+
+        Args:
+            client_id: Caller identity used for per-client limits; None skips
+                them (e.g. batch items, already bounded by the batch concurrency)
+            priority: Priority class of the request
+            deadline: Seconds the client is willing to wait before work starts
+
+        Yields:
+            Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        arrived = time.monotonic()
+        entry = self._enqueue(client_id, priority, deadline)
+        try:
+            self._wait_for_slot(entry, priority, arrived, deadline)
+        except AdmissionRejected:
+            self._leave(client_id)
+            raise
+
+        admitted = time.monotonic()
+        try:
+            yield admitted - arrived
+        finally:
+            self._release(client_id, time.monotonic() - admitted)
+
+    @asynccontextmanager
+    async def admit_async(
+        self,
+        client_id: Optional[str],
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[float]:
+        """
+        admit() for coroutines: waits for a slot without blocking the event loop.
+
+        Queued entries await an event that is set whenever a slot is released
+        or the queue changes, then check their turn, so the limits and
+        ordering are the same as for admit().
+        """
+        arrived = time.monotonic()
+        release = await self.acquire_async(client_id, priority, deadline)
+        try:
+            yield time.monotonic() - arrived
+        finally:
+            release()
+
+    async def acquire_async(
+        self,
+        client_id: Optional[str],
+        priority: Priority = Priority.INTERACTIVE,
+        deadline: Optional[float] = None,
+    ) -> Callable[[], None]:
+        """
+        Wait for a slot as admit_async() does and return the function releasing it.
+
+        For slots handed over to a worker thread, which may release them later
+        from that thread; calling the function again does nothing.
+
+        Raises:
+            AdmissionRejected: If the request is shed
+        """
+        arrived = time.monotonic()
+        entry = self._enqueue(client_id, priority, deadline)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                # Cleared before checking, so a release in between still wakes us
+                waiter[1].clear()
+                if self._try_take_slot(entry, priority, arrived, deadline):
+                    break
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0.0, deadline - (time.monotonic() - arrived))
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            # Rejected, or the request was cancelled while queued
+            with self._cond:
+                if entry in self._queue:
+                    self._drop(entry)
+            self._leave(client_id)
+            raise
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+
+        admitted = time.monotonic()
+        released = threading.Lock()
+
+        def release() -> None:
+            if released.acquire(blocking=False):
+                self._release(client_id, time.monotonic() - admitted)
+
+        return release
+
+    def _reject(self, status_code: int, retry_after: float, reason: str, message: str) -> AdmissionRejected:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return AdmissionRejected(status_code, retry_after, reason, message)
+
+    def _enqueue(self, client_id: Optional[str], priority: Priority, deadline: Optional[float]) -> Tuple[int, int]:
+        with self._cond:
+            if client_id is not None and self._per_client.get(client_id, 0) >= self.per_client_limit:
+                raise self._reject(
+                    429, self.service_time, "client_limit",
+                    f"Too many concurrent requests for client ({self.per_client_limit} allowed)",
+                )
+
+            wait = self._projected_wait(priority)
+            if wait > 0 and len(self._queue) >= self.max_queue:
+                raise self._reject(503, wait, "queue_full", "Server is overloaded, queue is full")
+            if deadline is not None and wait > deadline:
+                raise self._reject(
+                    503, wait, "deadline",
+                    f"Projected wait of {wait:.1f}s exceeds deadline of {deadline:g}s",
+                )
+
+            entry = (int(priority), next(self._seq))
+            heapq.heappush(self._queue, entry)
+            QUEUE_DEPTH.labels("admission").inc()
+            if client_id is not None:
+                self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+            return entry
+
+    def _wait_for_slot(self, entry: Tuple[int, int], priority: Priority, arrived: float, deadline: Optional[float]) -> None:
+        with self._cond:
+            while not self._try_take_slot(entry, priority, arrived, deadline):
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - (time.monotonic() - arrived)
+                self._cond.wait(timeout)
+
+    def _try_take_slot(self, entry: Tuple[int, int], priority: Priority, arrived: float, deadline: Optional[float]) -> bool:
+        """Take a slot if entry is first in line and one is free; raise once the deadline passed"""
+        with self._cond:
+            if self._queue[0] == entry and self._running < self.max_concurrent:
+                heapq.heappop(self._queue)
+                QUEUE_DEPTH.labels("admission").dec()
+                self._running += 1
+                # The next entry may also fit into a free slot
+                self._notify_all()
+                return True
+
+            if deadline is not None and deadline - (time.monotonic() - arrived) <= 0:
+                self._drop(entry)
+                raise self._reject(
+                    503, self._projected_wait(priority), "deadline",
+                    "Request could not be started before its deadline",
+                )
+            return False
+
+    def _drop(self, entry: Tuple[int, int]) -> None:
+        self._queue.remove(entry)
+        heapq.heapify(self._queue)
+        QUEUE_DEPTH.labels("admission").dec()
+        self._notify_all()
+
+    def _notify_all(self) -> None:
+        """Wake threads queued in admit() and coroutines queued in admit_async() (holding _cond)"""
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _leave(self, client_id: Optional[str]) -> None:
+        if client_id is None:
+            return
+        with self._cond:
+            remaining = self._per_client.get(client_id, 1) - 1
+            if remaining > 0:
+                self._per_client[client_id] = remaining
+            else:
+                self._per_client.pop(client_id, None)
+
+    def _release(self, client_id: Optional[str], elapsed: float) -> None:
+        with self._cond:
+            self._running -= 1
+            self.service_time = (1 - self._alpha) * self.service_time + self._alpha * elapsed
+            self._notify_all()
+        self._leave(client_id)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "running": self._running,
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "service_time": self.service_time,
+            "rejected": dict(self.rejected),
+        }
@@ -1,9 +1,17 @@
-from langchain_huggingface import HuggingFacePipeline
+from agents.crew_metrics import token_counts
+from agents import deadline
+from agents.results import format_result
+from agents.usage import record as record_usage
+from config.llm_cache import acached_completion, cached_completion
+from config.llm_config import openai_client
+from metrics import LLM_CALL_DURATION, LLM_TOKENS
 from prompt_processing import PromptProcessing
 from tools.tools import ToolExecutor
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+import json
 import os
 import sys
+import time
 from pathlib import Path
 
 file_path = Path("load_models.py")
@@ -11,32 +19,185 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 OPEN_ROUTER_API = os.getenv("OPEN_ROUTER_API")
 
 class MyAgent:
+    SELECT_TEMPERATURE = 0.0
+
     def __init__(self, 
                 SYSTEM_PROMPT: str,
                 p_proc: PromptProcessing,
                 executor: ToolExecutor,
                 OPEN_ROUTER_API: str = OPEN_ROUTER_API,
+                model: str = "deepseek/deepseek-v3.2",
+                reasoning: bool = True,
+                EXPLAIN_PROMPT: str | None = None,
+                temperature: float | None = None,
                 ):
-        self.client = OpenAI(base_url="https://openrouter.ai/api/v1",
-                            api_key=OPEN_ROUTER_API,
-                            )
+        # Mocked under LLM_MODE=mock, recorded/replayed when AI_LLM_CASSETTE_MODE is set
+        self.client = openai_client(OpenAI,
+                                    base_url="https://openrouter.ai/api/v1",
+                                    api_key=OPEN_ROUTER_API,
+                                    )
+        # Same endpoint for the async chat path, so awaiting the LLM holds no thread
+        self.aclient = openai_client(AsyncOpenAI, is_async=True,
+                                     base_url="https://openrouter.ai/api/v1",
+                                     api_key=OPEN_ROUTER_API,
+                                     )
         self.SYSTEM_PROMPT = SYSTEM_PROMPT
+        self.EXPLAIN_PROMPT = EXPLAIN_PROMPT
         self.p_proc = p_proc
         self.executor = executor
+        self.model = model
+        self.reasoning = reasoning
+        # Explanation temperature (None leaves the provider default); tool
+        # selection always runs at SELECT_TEMPERATURE
+        self.temperature = temperature
     
     def run_agent(self, question):
         messages = [
         {"role": "system", "content": self.SYSTEM_PROMPT},
         {"role": "user", "content": question}
         ]
-        extra_body={"reasoning": {"enabled": True}}
+        response = self._complete(messages, role="tool_selector")
+        
+        response = response.choices[0].message
         
-        response = self.client.chat.completions.create(
-            model="deepseek/deepseek-v3.2",
-            messages=messages,
-            extra_body=extra_body
+        return response
+    
+    def select_tool(self, question) -> dict:
+        """Ask the tool selector for one tool call and parse it"""
+        message = self.run_agent(question)
+        call = self.p_proc.extract_json(message.content or "")
+        self.p_proc.validate_call(call)
+        call.setdefault("action", None)
+        return call
+    
+    def execute(self, call: dict):
+        """Run a tool call in process"""
+        return self.executor.execute(call)
+    
+    async def aselect_tool(self, question) -> dict:
+        """select_tool() over the async client"""
+        messages = [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": question}
+        ]
+        response = await self._acomplete(messages, role="tool_selector")
+        call = self.p_proc.extract_json(response.choices[0].message.content or "")
+        self.p_proc.validate_call(call)
+        call.setdefault("action", None)
+        return call
+    
+    async def aexecute(self, call: dict):
+        """execute() on the tool pool instead of the event loop"""
+        return await self.executor.aexecute(call)
+    
+    async def aexplain(self, question, call: dict, result) -> str:
+        """explain() over the async client"""
+        response = await self._acomplete(self._explain_messages(question, call, result), role="explainer")
+        return (response.choices[0].message.content or "").strip()
+    
+    def explain(self, question, call: dict, result) -> str:
+        """Second LLM call: turn the tool result into a learner-friendly answer"""
+        response = self._complete(self._explain_messages(question, call, result), role="explainer")
+        return (response.choices[0].message.content or "").strip()
+    
+    def stream_explanation(self, question, call: dict, result):
+        """Same as explain(), yielding text pieces as they arrive"""
+        start = time.perf_counter()
+        status = "success"
+        try:
+            chunks = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._explain_messages(question, call, result),
+                extra_body=self._extra_body(),
+                stream=True,
+                **self._sampling("explainer"),
+                **self._request_options()
+            )
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            LLM_CALL_DURATION.labels("explainer", self.model, status).observe(time.perf_counter() - start)
+    
+    def _explain_messages(self, question, call: dict, result):
+        if not self.EXPLAIN_PROMPT:
+            raise ValueError("MyAgent was created without an EXPLAIN_PROMPT")
+        content = (
+            f"Question: {question}\n"
+            f"Tool call: {json.dumps(call)}\n"
+            f"Tool result: {format_result(result)}"
         )
+        return [
+            {"role": "system", "content": self.EXPLAIN_PROMPT},
+            {"role": "user", "content": content}
+        ]
+    
+    def _extra_body(self):
+        return {"reasoning": {"enabled": self.reasoning}}
+    
+    def _sampling(self, role: str):
+        # Tool selection is deterministic, so it is cacheable (see llm_cache)
+        temperature = self.SELECT_TEMPERATURE if role == "tool_selector" else self.temperature
+        return {"temperature": temperature} if temperature is not None else {}
+    
+    def _request_options(self):
+        """Per-call timeout from the request deadline's current stage budget, if there is one"""
+        budget = deadline.remaining()
+        return {"timeout": max(budget, 1.0)} if budget is not None else {}
+    
+    def _complete(self, messages, role: str):
+        """One chat completion, recorded in the same LLM metrics as crew agents"""
+        start = time.perf_counter()
+        status = "success"
+        try:
+            response = cached_completion(
+                self.client, role,
+                model=self.model,
+                messages=messages,
+                extra_body=self._extra_body(),
+                **self._sampling(role),
+                **self._request_options()
+            )
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            LLM_CALL_DURATION.labels(role, self.model, status).observe(time.perf_counter() - start)
         
-        response = response.choices[0].message
+        self._record_tokens(response, role)
+        return response
+    
+    async def _acomplete(self, messages, role: str):
+        """_complete() over the async client"""
+        start = time.perf_counter()
+        status = "success"
+        try:
+            response = await acached_completion(
+                self.aclient, role,
+                model=self.model,
+                messages=messages,
+                extra_body=self._extra_body(),
+                **self._sampling(role),
+                **self._request_options()
+            )
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            LLM_CALL_DURATION.labels(role, self.model, status).observe(time.perf_counter() - start)
         
-        return response
\ No newline at end of file
+        self._record_tokens(response, role)
+        return response
+    
+    def _record_tokens(self, response, role: str):
+        usage = response.usage.model_dump() if getattr(response, "usage", None) else {}
+        if usage.get("completion_tokens_details"):
+            usage["reasoning_tokens"] = usage["completion_tokens_details"].get("reasoning_tokens")
+        tokens = token_counts(usage)
+        for kind, count in tokens.items():
+            if count:
+                LLM_TOKENS.labels(role, self.model, kind).observe(count)
+        record_usage(role, self.model, tokens)
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from prompt_processing import normalize_prompt
+
+
+@dataclass
+class CachedAnswer:
+    """A previously solved answer served from the cache instead of the crew"""
+    raw: str
+    cached: bool = True
+
+
+class AnswerCache:
+    """
+    Disk-backed cache of final answers, keyed on the normalized prompt and
+    the pipeline that answered it (a lean answer is not a crew answer).
+
+    Entries live in a SQLite file so they survive restarts and can be shared
+    by every worker process on the host. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted once `max_entries` is hit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initialize the answer cache.
+
+        Args:
+            path: SQLite file (env AI_ANSWER_CACHE_PATH, default output/answer_cache.sqlite3)
+            max_entries: LRU size bound (env AI_ANSWER_CACHE_MAX_ENTRIES, default 10000)
+            ttl: Seconds an answer stays valid (env AI_ANSWER_CACHE_TTL, default 7 days)
+        """
+        self.path = path or os.getenv("AI_ANSWER_CACHE_PATH", "output/answer_cache.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("AI_ANSWER_CACHE_MAX_ENTRIES", "10000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("AI_ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_last_access ON answers(last_access)")
+
+    @staticmethod
+    def key(prompt: str, pipeline: Optional[str] = None) -> str:
+        normalized = normalize_prompt(prompt)
+        if pipeline:
+            normalized = f"{pipeline}:{normalized}"
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, pipeline: Optional[str] = None) -> Optional[CachedAnswer]:
+        """Return the cached answer for prompt from pipeline, or None on a miss or expired entry"""
+        key = self.key(prompt, pipeline)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT answer, created_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return CachedAnswer(raw=row[0])
+
+    def put(self, prompt: str, answer: str, pipeline: Optional[str] = None) -> None:
+        """Store pipeline's answer and evict least recently used entries beyond max_entries"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, prompt, answer, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self.key(prompt, pipeline), normalize_prompt(prompt), answer, now, now),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def invalidate(self, prompt: Optional[str] = None) -> int:
+        """
+        Remove one prompt's answers (from every pipeline), or every entry when prompt is None.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock, self._conn:
+            if prompt is None:
+                cursor = self._conn.execute("DELETE FROM answers")
+            else:
+                cursor = self._conn.execute("DELETE FROM answers WHERE prompt = ?", (normalize_prompt(prompt),))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
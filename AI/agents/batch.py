@@ -0,0 +1,105 @@
+import os
+import time
+import logging
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agents.results import extract_answer
+from metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Defaults for /chat/batch, overridable per request
+DEFAULT_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("AI_BATCH_MAX_CONCURRENCY", "16"))
+DEFAULT_ITEM_TIMEOUT = float(os.getenv("AI_BATCH_ITEM_TIMEOUT", "300"))
+
+
+def run_batch(
+    prompts: List[str],
+    runner: Callable[[str], Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    item_timeout: float = DEFAULT_ITEM_TIMEOUT,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run many prompts through the pipeline and yield results in completion order.
+
+    At most `concurrency` prompts run at once. Each item's timeout starts when
+    it begins running, not when it is queued. A timed-out item is reported
+    immediately, but its thread cannot be interrupted and keeps its slot until
+    the underlying call returns, so runners should stop on their own by then
+    (/chat/batch runs each item under a Deadline of item_timeout).
+
+    Args:
+        prompts: Problems to solve
+        runner: Callable(prompt) returning a crew output
+        concurrency: Max prompts running at the same time
+        item_timeout: Seconds a single prompt may run before it is reported as timed out
+
+    Yields:
+        One dict per prompt: index, prompt, status (success | error | timeout),
+        response, error and elapsed seconds
+    """
+    concurrency = max(1, min(concurrency, MAX_CONCURRENCY))
+    started: Dict[int, float] = {}
+
+    def execute(index: int, prompt: str) -> Dict[str, Any]:
+        started[index] = time.monotonic()
+        if not prompt or not prompt.strip():
+            raise ValueError("Prompt cannot be empty")
+        answer = extract_answer(runner(prompt))
+        if not answer:
+            raise ValueError("Empty response from agents")
+        return {"status": "success", "response": answer, "error": None}
+
+    queue_depth = QUEUE_DEPTH.labels("batch")
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chat-batch")
+    pending = {}
+    try:
+        pending = {pool.submit(execute, i, p): i for i, p in enumerate(prompts)}
+        queue_depth.inc(len(pending))
+
+        while pending:
+            done, _ = wait(pending, timeout=_next_expiry(pending, started, item_timeout), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = pending.pop(future)
+                queue_depth.dec()
+                try:
+                    item = future.result()
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {str(e)}")
+                    item = {"status": "error", "response": "", "error": str(e)}
+                yield _item(index, prompts[index], item, started)
+
+            now = time.monotonic()
+            for future, index in list(pending.items()):
+                if index in started and now - started[index] >= item_timeout:
+                    del pending[future]
+                    queue_depth.dec()
+                    future.cancel()
+                    item = {"status": "timeout", "response": "", "error": f"Timed out after {item_timeout:g}s"}
+                    yield _item(index, prompts[index], item, started)
+    finally:
+        queue_depth.dec(len(pending))
+        # Don't wait on stragglers: their results are no longer wanted
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _next_expiry(pending, started: Dict[int, float], item_timeout: float) -> Optional[float]:
+    """Seconds until the earliest running item hits its timeout"""
+    now = time.monotonic()
+    remaining = [
+        started[index] + item_timeout - now
+        for index in pending.values() if index in started
+    ]
+    if not remaining:
+        # Nothing has started yet; check back shortly
+        return 0.1
+    return max(0.0, min(remaining))
+
+
+def _item(index: int, prompt: str, item: Dict[str, Any], started: Dict[int, float]) -> Dict[str, Any]:
+    elapsed = time.monotonic() - started[index] if index in started else 0.0
+    return {"index": index, "prompt": prompt, "elapsed": round(elapsed, 3), **item}
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class FollowerTimeout(TimeoutError):
+    """A caller attached to another caller's execution gave up waiting for it"""
+
+
+class _Call:
+    """One in-flight execution that later callers can attach to."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is still running block until it
+    finishes and receive the same result, or the same exception. Once the
+    call completes the key is forgotten, so later calls run fresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once per concurrent group of callers sharing key.
+
+        Args:
+            key: Identity of the work (e.g. the normalized prompt)
+            fn: Zero-argument callable performing the work
+            timeout: Seconds this caller waits if it attaches to another
+                caller's execution (the execution itself goes on)
+
+        Returns:
+            (result, shared) where shared is True if this caller attached to
+            another caller's execution instead of running fn itself
+
+        Raises:
+            FollowerTimeout: This caller attached and the execution outlived timeout
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise FollowerTimeout(f"Identical in-flight request still running after {timeout:g}s")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
+
+
+class _AsyncCall:
+    """One in-flight task and how many callers are still awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop.
+
+    The work runs in a task of its own that every caller, leader included,
+    awaits through asyncio.shield: a caller that is cancelled (e.g. its
+    client disconnected) leaves the others waiting, and the work is only
+    cancelled once nobody is waiting for it. All callers run on the loop
+    thread, so no lock is needed.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _AsyncCall] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Await fn() once per concurrent group of callers sharing key.
+
+        Returns:
+            (result, shared) as for SingleFlight.do
+
+        Raises:
+            FollowerTimeout: This caller attached and the execution outlived timeout
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            call = _AsyncCall(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.executions += 1
+            call.task.add_done_callback(lambda _: self._release(key, call))
+
+        call.waiters += 1
+        try:
+            if not shared:
+                return await asyncio.shield(call.task), shared
+            # asyncio.wait neither cancels the task on timeout nor mistakes the
+            # work's own TimeoutErrors (DeadlineExceeded) for this caller's
+            done, _ = await asyncio.wait({call.task}, timeout=timeout)
+            if not done:
+                raise FollowerTimeout(f"Identical in-flight request still running after {timeout:g}s")
+            return call.task.result(), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _release(self, key: str, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        return len(self._calls)
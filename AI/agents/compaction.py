@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import math
+import threading
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import CONTEXT_TOKENS
+
+# Prompt tokens each stage's output may cost the stage that reads it.
+# Override with AI_CONTEXT_BUDGETS="analyze_problem=150,verify_solution=400,..."
+DEFAULT_BUDGETS = {
+    "analyze_problem": 200,
+    "execute_solution": 200,
+    "verify_solution": 300,
+}
+
+# Analysis fields the planner uses; everything else in the analysis is prose
+ANALYSIS_FIELDS = ("problem type", "type", "given", "known", "variable", "unknown", "constraint",
+                   "assumption", "question", "goal", "find", "equation", "expression")
+
+# Verifier lines worth passing on to the explainer besides the verdict
+VERIFICATION_HINTS = re.compile(r"=|answer|result|correct|error|mistake", re.IGNORECASE)
+VERDICT = re.compile(r"verdict", re.IGNORECASE)
+CORRECTED = re.compile(r"corrected", re.IGNORECASE)
+
+# Bump when a compactor changes what it keeps, so cached stages built on the
+# old compact form are not reused (see stage_cache.fingerprint)
+VERSION = 2
+
+
+def _parse_budgets(spec: str) -> Dict[str, int]:
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        budgets[name.strip()] = int(value)
+    return budgets
+
+
+BUDGETS = {**DEFAULT_BUDGETS, **_parse_budgets(os.getenv("AI_CONTEXT_BUDGETS", ""))}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and math)"""
+    return math.ceil(len(text) / 4)
+
+
+def _lines(text: str) -> List[str]:
+    # Markdown emphasis and headings cost tokens without telling the next agent anything
+    cleaned = (re.sub(r"^[#>\s]+|\*\*|__|`", "", line).strip() for line in str(text).splitlines())
+    return [line for line in cleaned if line]
+
+
+def fit(lines: List[str], budget: int, keep: Optional[str] = None, latest: bool = False) -> str:
+    """
+    Join lines until the token budget is used up; `keep` (e.g. the verdict) always fits.
+
+    Lines are kept from the start, or with `latest` from the end (earlier
+    lines are dropped first); either way they stay in their original order.
+    """
+    reserved = estimate_tokens(keep) + 1 if keep else 0
+    kept: List[str] = []
+    used = reserved
+    for line in reversed(lines) if latest else lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not kept:
+                # A single oversized line is cut rather than dropped
+                room = max(0, (budget - used) * 4)
+                kept.append("... " + line[len(line) - room:].lstrip() if latest else line[:room].rstrip() + " ...")
+            break
+        kept.append(line)
+        used += cost
+    if latest:
+        kept.reverse()
+    if keep and keep not in kept:
+        kept.append(keep)
+    return "\n".join(kept)
+
+
+def compact_analysis(text: str, budget: int) -> str:
+    """The analysis' "Field: value" lines and list items, without the surrounding prose"""
+    lines = _lines(text)
+    fields = [
+        line for line in lines
+        if line.startswith(("-", "•"))
+        or (":" in line and line.split(":", 1)[0].lower().strip("-• ").startswith(ANALYSIS_FIELDS))
+    ]
+    return fit(fields or lines, budget)
+
+
+def compact_execution(text: str, budget: int) -> str:
+    """
+    The executor's tool call and result as one JSON object.
+
+    The budget only trims the prose around the call: the call itself is
+    passed on whole even when it alone is over budget, since a cut one is
+    no longer valid JSON and the verifier would check a broken result.
+    """
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"\{", str(text)):
+        try:
+            call, _ = decoder.raw_decode(str(text), match.start())
+        except ValueError:
+            continue
+        if isinstance(call, dict) and "tool" in call:
+            compact = {key: call[key] for key in ("tool", "action", "args", "result") if key in call}
+            return json.dumps(compact, default=str)
+    return fit(_lines(text), budget)
+
+
+def compact_verification(text: str, budget: int) -> str:
+    """
+    The verifier's conclusions (results, corrections) and its verdict line.
+
+    A correction is only useful with the corrected answer and its reasoning,
+    which the verifier writes last: for a CORRECTED verdict every line is a
+    candidate and the earliest ones are dropped first.
+    """
+    lines = _lines(text)
+    verdict = next((line for line in reversed(lines) if VERDICT.search(line)), None)
+    if verdict and CORRECTED.search(verdict):
+        return fit([line for line in lines if line != verdict], budget, keep=verdict, latest=True)
+    hints = [line for line in lines if line != verdict and VERIFICATION_HINTS.search(line)]
+    return fit(hints or lines, budget, keep=verdict)
+
+
+COMPACTORS: Dict[str, Callable[[str, int], str]] = {
+    "analyze_problem": compact_analysis,
+    "execute_solution": compact_execution,
+    "verify_solution": compact_verification,
+}
+
+
+class ContextCompactor:
+    """
+    Shrinks crew task outputs to what the next stage needs before it is
+    passed on as context.
+
+    Installed as a task guardrail, so the compacted text replaces the task
+    output: downstream prompts, the stage cache and partial answers all see
+    the compact form. Records the estimated tokens of each output before and
+    after compaction.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        self.budgets = budgets or BUDGETS
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def compact(self, stage: str, text: str) -> str:
+        compacted = COMPACTORS[stage](text, self.budgets.get(stage, DEFAULT_BUDGETS[stage]))
+        before, after = estimate_tokens(str(text)), estimate_tokens(compacted)
+        CONTEXT_TOKENS.labels(stage, "original").observe(before)
+        CONTEXT_TOKENS.labels(stage, "compacted").observe(after)
+        with self._lock:
+            totals = self._totals.setdefault(stage, {"outputs": 0, "original_tokens": 0, "compacted_tokens": 0})
+            totals["outputs"] += 1
+            totals["original_tokens"] += before
+            totals["compacted_tokens"] += after
+        return compacted
+
+    def policy(self, stage: str) -> Dict[str, Any]:
+        """What decides `stage`'s compact form (part of its stage cache fingerprint)"""
+        return {"version": VERSION, "budget": self.budgets.get(stage, DEFAULT_BUDGETS[stage])}
+
+    def guardrail(self, stage: str) -> Callable[[Any], Tuple[bool, str]]:
+        """crewai task guardrail compacting `stage`'s output; never rejects it"""
+        def compact_output(output) -> Tuple[bool, str]:
+            return True, self.compact(stage, output.raw)
+        compact_output.policy = self.policy(stage)
+        return compact_output
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {stage: dict(totals) for stage, totals in self._totals.items()}
+        for totals in stages.values():
+            original = totals["original_tokens"]
+            totals["saved_ratio"] = 1 - totals["compacted_tokens"] / original if original else 0.0
+        return {"budgets": dict(self.budgets), "stages": stages}
+
+
+compactor = ContextCompactor()
@@ -0,0 +1,137 @@
+import threading
+
+from crewai.events import BaseEventListener
+from crewai.events.types.llm_events import LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent
+from crewai.events.types.task_events import TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent
+
+from agents import usage
+from config.llm_pricing import cost
+from metrics import TASK_DURATION, LLM_CALL_DURATION, LLM_COST, LLM_TOKENS
+
+
+def _label(value) -> str:
+    # YAML folded roles end with a newline ("Mathematical Problem Analyst\n")
+    return str(value).strip() if value else "unknown"
+
+
+def token_counts(usage: dict | None) -> dict:
+    """Normalize provider usage dicts (OpenAI-style or Gemini-style) to prompt/completion/reasoning"""
+    usage = usage or {}
+    return {
+        "prompt": usage.get("prompt_tokens") or usage.get("prompt_token_count") or 0,
+        "completion": usage.get("completion_tokens") or usage.get("candidates_token_count") or 0,
+        "reasoning": usage.get("reasoning_tokens") or 0,
+    }
+
+
+class StageUsage:
+    """
+    LLM calls, seconds, tokens and list-price cost per crew stage and model,
+    for tuning which model each agent runs on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, stage: str, model: str, seconds: float, tokens: dict, dollars: float | None) -> None:
+        with self._lock:
+            totals = self._totals.setdefault((stage, model), {
+                "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0,
+            })
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["prompt_tokens"] += tokens["prompt"]
+            totals["completion_tokens"] += tokens["completion"]
+            totals["cost"] += dollars or 0.0
+
+    def stats(self) -> dict:
+        stages = {}
+        with self._lock:
+            for (stage, model), totals in self._totals.items():
+                stages.setdefault(stage, {})[model] = {
+                    **totals, "mean_seconds": totals["seconds"] / totals["calls"],
+                }
+        return stages
+
+
+class CrewMetricsListener(BaseEventListener):
+    """
+    Turn crewai events into Prometheus metrics.
+
+    Event handlers run on the event bus thread pool, so durations are taken
+    from the event timestamps (set where the event was emitted) rather than
+    from the time the handler happens to run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._task_starts = {}
+        self._llm_starts = {}
+        self.usage = StageUsage()
+        super().__init__()
+
+    def setup_listeners(self, crewai_event_bus):
+        @crewai_event_bus.on(TaskStartedEvent)
+        def on_task_started(source, event):
+            with self._lock:
+                self._task_starts[self._task_key(event)] = event.timestamp
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def on_task_completed(source, event):
+            self._observe_task(event, "success")
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def on_task_failed(source, event):
+            self._observe_task(event, "error")
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def on_llm_started(source, event):
+            with self._lock:
+                self._llm_starts[event.call_id] = event.timestamp
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def on_llm_completed(source, event):
+            agent, model = _label(event.agent_role), _label(event.model)
+            seconds = self._observe_llm(event, agent, model, "success")
+            tokens = token_counts(event.usage)
+            for kind, count in tokens.items():
+                if count:
+                    LLM_TOKENS.labels(agent, model, kind).observe(count)
+            dollars = cost(event.model, tokens["prompt"], tokens["completion"])
+            if dollars:
+                LLM_COST.labels(agent, model).inc(dollars)
+            if seconds is not None:
+                self.usage.record(_label(event.task_name), model, seconds, tokens, dollars)
+            # Handlers run in a copy of the emitting context, so this lands on the request being served
+            usage.record(agent, model, tokens, stage=_label(event.task_name))
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def on_llm_failed(source, event):
+            self._observe_llm(event, _label(event.agent_role), _label(event.model), "error")
+
+    @staticmethod
+    def _task_key(event):
+        return event.task_id or id(event.task)
+
+    @staticmethod
+    def _task_name(event):
+        task = getattr(event, "task", None)
+        return _label(getattr(task, "name", None) or event.task_name)
+
+    def _observe_task(self, event, status):
+        with self._lock:
+            started = self._task_starts.pop(self._task_key(event), None)
+        if started is not None:
+            TASK_DURATION.labels(self._task_name(event), status).observe(
+                (event.timestamp - started).total_seconds()
+            )
+
+    def _observe_llm(self, event, agent, model, status):
+        with self._lock:
+            started = self._llm_starts.pop(event.call_id, None)
+        if started is None:
+            return None
+        seconds = (event.timestamp - started).total_seconds()
+        LLM_CALL_DURATION.labels(agent, model, status).observe(seconds)
+        return seconds
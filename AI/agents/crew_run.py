@@ -1,23 +1,233 @@
 import os
-from agents.multi_agents import MathCrew
+import time
+import asyncio
+import logging
+from agents.answer_cache import AnswerCache
+from agents.coalescing import AsyncSingleFlight, FollowerTimeout, SingleFlight
+from agents.deadline import (Deadline, DeadlineExceeded, PartialAnswer, DEFAULT_TIMEOUT, limit_llm_timeouts,
+                             arun_within, remaining, run_within)
+from agents.fast_path import FastPathRouter
+from agents.results import extract_answer
+from agents.stage_cache import StageCache, akickoff_cached, kickoff_cached
+from metrics import ANSWER_CACHE_LOOKUPS, COALESCED_REQUESTS, DEADLINE_EXPIRATIONS, PIPELINE_DURATION
+from prompt_processing import normalize_prompt
+from startup import lazy
+from tools.pool import in_tool_pool
+
+logger = logging.getLogger(__name__)
 
 os.makedirs('output', exist_ok=True)
 
-def run(inputs):
+# Feeds per-task and per-LLM-call latency/token metrics from crewai events
+crew_metrics = None
+
+@lazy
+def load_crew():
+    """
+    Import crewai and build the crew template on first use.
+    
+    This is the expensive part of the service (several seconds of imports),
+    so it is kept out of module import; warmup.preload calls it before a
+    production worker takes traffic.
+    
+    Returns:
+        The process-wide MathCrew template (see multi_agents.crew_template)
+    """
+    global crew_metrics
+    from agents.crew_metrics import CrewMetricsListener
+    from agents.multi_agents import crew_template
+    crew_metrics = CrewMetricsListener()
+    return crew_template()
+
+# Identical prompts arriving while one is already running share its crew run
+COALESCE_PROMPTS = os.getenv("AI_COALESCE_PROMPTS", "1") == "1"
+flights = SingleFlight()
+async_flights = AsyncSingleFlight()
+
+ANSWER_CACHE = os.getenv("AI_ANSWER_CACHE", "1") == "1"
+
+@lazy
+def get_answer_cache():
+    """Solved answers, kept on disk and served without running the crew again (None when AI_ANSWER_CACHE=0)"""
+    return AnswerCache() if ANSWER_CACHE else None
+
+STAGE_CACHE = os.getenv("AI_STAGE_CACHE", "1") == "1"
+
+@lazy
+def get_stage_cache():
+    """Individual task outputs, so runs for different prompts reuse the stages they share (None when AI_STAGE_CACHE=0)"""
+    return StageCache() if STAGE_CACHE else None
+
+# Machine-readable prompts ("solve x^2 - 4 = 0", "det [[1,2],[3,4]]") go straight to the tools
+router = FastPathRouter() if os.getenv("AI_FAST_PATH", "1") == "1" else None
+
+# Which pipeline answers a prompt: the five-agent crew, "lean" (tool
+# selector call → in-process tool → explainer call, see agents/lean.py), or
+# "speculative" (the crew, explaining in parallel with verification, see
+# agents/speculative.py)
+PIPELINES = ("crew", "lean", "speculative")
+DEFAULT_PIPELINE = os.getenv("AI_PIPELINE", "crew")
+# When the lean pipeline cannot produce a tool result, answer with the crew instead
+LEAN_FALLBACK = os.getenv("AI_LEAN_FALLBACK", "1") == "1"
+
+# Stage names each pipeline reports to task_callback, in order (deadline budgets are split over them)
+CREW_STAGES = ("analyze_problem", "plan_solution", "execute_solution", "verify_solution", "explain_solution")
+STAGES = {
+    "crew": CREW_STAGES,
+    "lean": ("select_tool", "execute_tool", "explain"),
+    "speculative": CREW_STAGES,
+}
+
+def resolve_pipeline(pipeline=None):
+    """Validate a per-request pipeline name, defaulting to AI_PIPELINE"""
+    pipeline = (pipeline or DEFAULT_PIPELINE).strip().lower()
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown pipeline: {pipeline} (expected one of {', '.join(PIPELINES)})")
+    return pipeline
+
+def run(inputs, task_callback=None, pipeline=None, deadline=None):
     """
     Run the math crew and return the final output.
     
+    Prompts the fast-path router can parse are answered by the tools
+    directly. Previously solved prompts are answered from the answer cache.
+    Otherwise concurrent calls whose normalized prompt matches attach to the
+    one in-flight crew run and all receive its output. The shared run keeps
+    the deadline of the call that started it; the others wait for it only
+    until their own deadline passes. Calls that pass a task_callback always
+    get their own run so every caller sees its stages.
+    
     Args:
         inputs: The user's mathematical problem
+        task_callback: Optional callable invoked with each TaskOutput as soon
+            as its task finishes (analyze → plan → execute → verify → explain)
+        pipeline: "crew", "lean" or "speculative"; defaults to AI_PIPELINE
+        deadline: Optional Deadline for the whole request; defaults to
+            AI_REQUEST_TIMEOUT seconds from now when that is set
         
     Returns:
-        The crew's final output
+        The crew's final output, a LeanAnswer, a SpeculativeAnswer, a
+        FastPathAnswer when the router solved it, a CachedAnswer on a cache
+        hit, or a PartialAnswer when the deadline passed mid-pipeline
+        
+    Raises:
+        DeadlineExceeded: The deadline passed before any usable stage output
+    """
+    pipeline = resolve_pipeline(pipeline)
+    if deadline is None:
+        deadline = Deadline.after(DEFAULT_TIMEOUT)
+    
+    if router is not None:
+        routed = router.answer(inputs)
+        if routed is not None:
+            return routed
+    
+    if task_callback is not None:
+        return execute(inputs, pipeline, task_callback, deadline)
+    
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        cached = answer_cache.get(inputs, pipeline)
+        ANSWER_CACHE_LOOKUPS.labels("miss" if cached is None else "hit").inc()
+        if cached is not None:
+            logger.info("Answer served from cache")
+            return cached
+    
+    if COALESCE_PROMPTS:
+        key = f"{pipeline}:{normalize_prompt(inputs)}"
+        try:
+            result, shared = flights.do(key, lambda: execute(inputs, pipeline, deadline=deadline),
+                                        timeout=_wait_budget(deadline))
+        except FollowerTimeout:
+            raise _coalesced_expired(deadline)
+        if shared:
+            COALESCED_REQUESTS.inc()
+            logger.info("Attached to an identical in-flight request")
+            return result
+    else:
+        result = execute(inputs, pipeline, deadline=deadline)
+    
+    answer = extract_answer(result)
+    if answer_cache is not None and answer and not isinstance(result, PartialAnswer):
+        answer_cache.put(inputs, answer, pipeline)
+    return result
+
+def _wait_budget(deadline):
+    """Seconds a coalesced caller may wait on the shared run (None: no deadline)"""
+    return deadline.remaining() if deadline is not None else None
+
+def _coalesced_expired(deadline):
+    """DeadlineExceeded for a caller whose deadline passed while it waited on an identical request"""
+    DEADLINE_EXPIRATIONS.labels("coalesced", "timeout").inc()
+    return DeadlineExceeded(f"No answer within {deadline.seconds:g}s (waiting on an identical in-flight request)")
+
+def execute(inputs, pipeline="crew", task_callback=None, deadline=None):
+    """
+    Run one pipeline end to end, bypassing the router, cache and coalescing.
+    
+    With a deadline the pipeline runs under run_within: each stage gets its
+    share of the remaining time and the best stage output so far is returned
+    when it runs out.
+    
+    Records ai_pipeline_duration_seconds so the pipelines' latency can be
+    compared on live traffic.
     """
+    start = time.perf_counter()
+    status = "success"
+    try:
+        if deadline is None:
+            result = _execute(inputs, pipeline, task_callback)
+        else:
+            result = run_within(deadline, lambda callback: _execute(inputs, pipeline, callback), STAGES[pipeline], task_callback)
+        if isinstance(result, PartialAnswer):
+            status = "partial"
+        elif pipeline == "lean" and not hasattr(result, "call"):
+            status = "fallback"
+        return result
+    except DeadlineExceeded:
+        status = "timeout"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        PIPELINE_DURATION.labels(pipeline, status).observe(time.perf_counter() - start)
+
+def _execute(inputs, pipeline, task_callback=None):
+    """Dispatch to the pipeline (the lean one falls back to the crew when it fails)"""
+    if pipeline == "lean":
+        from agents import lean
+        try:
+            return lean.solve(inputs, task_callback)
+        except lean.LeanPipelineError as e:
+            if not LEAN_FALLBACK:
+                raise
+            logger.warning(f"Lean pipeline failed ({e}), falling back to the crew")
+    elif pipeline == "speculative":
+        from agents import speculative
+        return speculative.solve(inputs, task_callback)
+    return _kickoff(inputs, task_callback)
+
+def _kickoff(inputs, task_callback=None, cached=True):
+    """Run a fresh copy of the crew once (cached=False skips the stage cache)"""
     inputs_dict = {
         'topic': inputs,
     }
     
-    result = MathCrew().crew().kickoff(inputs=inputs_dict)
+    load_crew()
+    from agents.multi_agents import new_crew
+    crew = new_crew(inputs)
+    if remaining() is not None:
+        # Running under a deadline: each stage's LLM calls get that stage's budget
+        limit_llm_timeouts(crew.agents)
+        task_callback = _limiting_llm_timeouts(crew, task_callback)
+    stage_cache = get_stage_cache() if cached else None
+    if stage_cache is not None:
+        result = kickoff_cached(crew, inputs_dict, stage_cache, task_callback)
+    else:
+        if task_callback is not None:
+            crew.task_callback = task_callback
+        result = crew.kickoff(inputs=inputs_dict)
     
     print("\n\n=== FINAL REPORT ===\n\n")
     print(result.raw)
@@ -26,3 +236,193 @@ def run(inputs):
     
     # Return the result so it can be used by the API
     return result
+
+def _limiting_llm_timeouts(crew, task_callback):
+    """Wrap task_callback to re-cap LLM timeouts once the next stage's budget starts"""
+    def callback(output):
+        if task_callback is not None:
+            task_callback(output)
+        limit_llm_timeouts(crew.agents)
+    return callback
+
+async def arun(inputs, pipeline=None, deadline=None):
+    """
+    run() on the event loop, without holding a thread per request.
+    
+    LLM calls are awaited (Crew.akickoff, the lean agent's async client),
+    tools and the fast-path router run on the tool pool, and cache lookups
+    on the default executor. Identical prompts coalesce on async_flights.
+    The speculative pipeline has no async form yet and runs in a thread.
+    
+    Args:
+        inputs: The user's mathematical problem
+        pipeline: "crew", "lean" or "speculative"; defaults to AI_PIPELINE
+        deadline: Optional Deadline for the whole request; defaults to
+            AI_REQUEST_TIMEOUT seconds from now when that is set
+        
+    Returns:
+        The same answer types as run()
+        
+    Raises:
+        DeadlineExceeded: The deadline passed before any usable stage output
+    """
+    pipeline = resolve_pipeline(pipeline)
+    if deadline is None:
+        deadline = Deadline.after(DEFAULT_TIMEOUT)
+    
+    if router is not None:
+        routed = await in_tool_pool(router.answer, inputs)
+        if routed is not None:
+            return routed
+    
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        cached = await asyncio.to_thread(answer_cache.get, inputs, pipeline)
+        ANSWER_CACHE_LOOKUPS.labels("miss" if cached is None else "hit").inc()
+        if cached is not None:
+            logger.info("Answer served from cache")
+            return cached
+    
+    if COALESCE_PROMPTS:
+        key = f"{pipeline}:{normalize_prompt(inputs)}"
+        try:
+            result, shared = await async_flights.do(key, lambda: aexecute(inputs, pipeline, deadline=deadline),
+                                                    timeout=_wait_budget(deadline))
+        except FollowerTimeout:
+            raise _coalesced_expired(deadline)
+        if shared:
+            COALESCED_REQUESTS.inc()
+            logger.info("Attached to an identical in-flight request")
+            return result
+    else:
+        result = await aexecute(inputs, pipeline, deadline=deadline)
+    
+    answer = extract_answer(result)
+    if answer_cache is not None and answer and not isinstance(result, PartialAnswer):
+        await asyncio.to_thread(answer_cache.put, inputs, answer, pipeline)
+    return result
+
+async def aexecute(inputs, pipeline="crew", task_callback=None, deadline=None):
+    """execute() on the event loop; a deadline cancels the pipeline task when it passes"""
+    start = time.perf_counter()
+    status = "success"
+    try:
+        if deadline is None:
+            result = await _aexecute(inputs, pipeline, task_callback)
+        else:
+            result = await arun_within(deadline, lambda callback: _aexecute(inputs, pipeline, callback), STAGES[pipeline], task_callback)
+        if isinstance(result, PartialAnswer):
+            status = "partial"
+        elif pipeline == "lean" and not hasattr(result, "call"):
+            status = "fallback"
+        return result
+    except DeadlineExceeded:
+        status = "timeout"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        PIPELINE_DURATION.labels(pipeline, status).observe(time.perf_counter() - start)
+
+async def _aexecute(inputs, pipeline, task_callback=None):
+    """_execute() for the event loop"""
+    if pipeline == "lean":
+        from agents import lean
+        try:
+            return await lean.asolve(inputs, task_callback)
+        except lean.LeanPipelineError as e:
+            if not LEAN_FALLBACK:
+                raise
+            logger.warning(f"Lean pipeline failed ({e}), falling back to the crew")
+    elif pipeline == "speculative":
+        from agents import speculative
+        return await asyncio.to_thread(speculative.solve, inputs, task_callback)
+    return await _akickoff(inputs, task_callback)
+
+async def _akickoff(inputs, task_callback=None):
+    """_kickoff() with Crew.akickoff"""
+    inputs_dict = {
+        'topic': inputs,
+    }
+    
+    # The first crew of a cold worker takes seconds to import and build; not on the loop
+    if not load_crew.loaded():
+        await asyncio.to_thread(load_crew)
+    from agents.multi_agents import new_crew
+    crew = new_crew(inputs)
+    if remaining() is not None:
+        limit_llm_timeouts(crew.agents)
+        task_callback = _limiting_llm_timeouts(crew, task_callback)
+    stage_cache = get_stage_cache()
+    if stage_cache is not None:
+        result = await akickoff_cached(crew, inputs_dict, stage_cache, task_callback)
+    else:
+        if task_callback is not None:
+            crew.task_callback = task_callback
+        result = await crew.akickoff(inputs=inputs_dict)
+    
+    logger.debug(f"Final report: {result.raw}")
+    return result
+
+def stream(inputs, pipeline=None):
+    """
+    Run the math crew and yield the final task's answer token by token.
+    
+    Earlier tasks (analyze → ... → verify) run as usual; only the text
+    chunks produced by the last agent (math_explainer) are forwarded.
+    With the lean pipeline, the explainer call is streamed instead. The
+    speculative pipeline only knows which explanation it keeps once the
+    verifier is done, so its answer arrives as a single chunk.
+    
+    Args:
+        inputs: The user's mathematical problem
+        pipeline: "crew", "lean" or "speculative"; defaults to AI_PIPELINE
+        
+    Yields:
+        Text chunks of the final answer as the LLM produces them
+        
+    Returns:
+        The crew's final output (as the generator's return value)
+    """
+    from crewai.types.streaming import StreamChunkType
+    
+    pipeline = resolve_pipeline(pipeline)
+    
+    if router is not None:
+        routed = router.answer(inputs)
+        if routed is not None:
+            yield routed.raw
+            return routed
+    
+    if pipeline == "lean":
+        from agents import lean
+        try:
+            # Tool selection and execution happen before the first piece is yielded
+            return (yield from lean.stream(inputs))
+        except lean.LeanPipelineError as e:
+            if not LEAN_FALLBACK:
+                raise
+            logger.warning(f"Lean pipeline failed ({e}), falling back to the crew")
+    
+    if pipeline == "speculative":
+        result = execute(inputs, pipeline)
+        yield result.raw
+        return result
+    
+    inputs_dict = {
+        'topic': inputs,
+    }
+    
+    load_crew()
+    from agents.multi_agents import new_crew
+    crew = new_crew(inputs)
+    crew.stream = True
+    final_role = crew.tasks[-1].agent.role.strip()
+    
+    streaming = crew.kickoff(inputs=inputs_dict)
+    for chunk in streaming:
+        if chunk.chunk_type == StreamChunkType.TEXT and chunk.agent_role.strip() == final_role:
+            yield chunk.content
+    
+    return streaming.result
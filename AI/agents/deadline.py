@@ -0,0 +1,312 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from metrics import DEADLINE_EXPIRATIONS
+
+logger = logging.getLogger(__name__)
+
+# End-to-end budget (seconds) for requests that don't send their own; 0 disables it
+DEFAULT_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "0")) or None
+
+# Relative share of the remaining time each stage gets. Time a stage doesn't
+# use is redistributed over the stages after it. Override with
+# AI_STAGE_BUDGETS="execute_solution=3,explain_solution=1,..."
+DEFAULT_STAGE_WEIGHTS = {
+    "analyze_problem": 1.0,
+    "plan_solution": 1.0,
+    "execute_solution": 2.0,
+    "verify_solution": 1.5,
+    "explain_solution": 2.0,
+    "select_tool": 1.0,
+    "execute_tool": 0.5,
+    "explain": 2.0,
+}
+
+# Stage outputs worth returning when time runs out, best first
+ANSWER_STAGES = ("explain_solution", "explain", "verify_solution", "execute_solution", "execute_tool")
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+STAGE_WEIGHTS = {**DEFAULT_STAGE_WEIGHTS, **_parse_weights(os.getenv("AI_STAGE_BUDGETS", ""))}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline passed before any stage produced a usable answer"""
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.stage = stage
+
+
+@dataclass
+class PartialAnswer:
+    """
+    Best stage output available when the deadline passed; exposes .raw like a crew output.
+
+    stage is the stage whose output is returned (e.g. execute_solution: the
+    tool result without verification or explanation), expired_stage the one
+    that ran out of time.
+    """
+    raw: str
+    stage: str
+    expired_stage: Optional[str]
+    complete: bool = False
+
+
+class Deadline:
+    """
+    Remaining-time budget of one request, split over the pipeline's stages.
+
+    Created when the request arrives, so time spent waiting for admission
+    counts against it. Each stage may use its weighted share of whatever is
+    left when it starts; `remaining()` inside the pipeline returns the
+    current stage's budget for LLM clients to use as their timeout.
+    """
+
+    def __init__(self, seconds: float, weights: Optional[Dict[str, float]] = None):
+        self.seconds = seconds
+        self.weights = weights or STAGE_WEIGHTS
+        self.expires_at = time.monotonic() + seconds
+        self.stages: List[str] = []
+        self.completed: List[str] = []
+        self.stage_expires_at = self.expires_at
+        self._workers = 0
+        self._settled: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> Optional["Deadline"]:
+        """A deadline `seconds` from now, or None when no budget was given"""
+        return cls(seconds) if seconds else None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def stage_remaining(self) -> float:
+        return max(0.0, min(self.stage_expires_at, self.expires_at) - time.monotonic())
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        return next((stage for stage in self.stages if stage not in self.completed), None)
+
+    def stage_budget(self, stage: Optional[str]) -> float:
+        """Share of the remaining time for `stage`, weighted against the stages still to run"""
+        pending = [s for s in self.stages if s not in self.completed]
+        if stage not in pending:
+            return self.remaining()
+        total = sum(self.weights.get(s, 1.0) for s in pending)
+        return self.remaining() * self.weights.get(stage, 1.0) / total
+
+    def begin(self, stages: Sequence[str]) -> None:
+        """Start the budget of the first of `stages`"""
+        self.stages = list(stages)
+        self.completed = []
+        self._start_stage()
+
+    def complete(self, stage: Optional[str]) -> None:
+        """Record a finished stage and start the next one's budget"""
+        if stage:
+            self.completed.append(stage)
+        self._start_stage()
+
+    def _start_stage(self) -> None:
+        self.stage_expires_at = time.monotonic() + self.stage_budget(self.current_stage)
+
+    def on_settled(self, fn: Callable[[], Any]) -> None:
+        """
+        Call fn once no pipeline thread of this request is running.
+
+        That is right away unless run_within gave up on a thread that is still
+        finishing its stage; fn then runs on that thread when it exits, so
+        e.g. an admission slot stays taken while its LLM calls go on.
+        """
+        with self._lock:
+            if self._workers:
+                self._settled.append(fn)
+                return
+        fn()
+
+    def _worker_started(self) -> None:
+        with self._lock:
+            self._workers += 1
+
+    def _worker_exited(self) -> None:
+        with self._lock:
+            self._workers -= 1
+            if self._workers:
+                return
+            settled, self._settled = self._settled, []
+        for fn in settled:
+            try:
+                fn()
+            except Exception:
+                logger.exception("Deadline settle callback failed")
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current stage of this request, or None when it has no deadline"""
+    deadline = _current.get()
+    return deadline.stage_remaining() if deadline is not None else None
+
+
+def limit_llm_timeouts(agents) -> None:
+    """
+    Cap crew agents' LLM calls at the current stage budget.
+
+    Crew copies give every agent its own shallow LLM copy, so this does not
+    leak into other requests. Provider clients without a per-call timeout
+    (e.g. the native Gemini client) are left alone; the deadline is still
+    enforced by run_within.
+    """
+    budget = remaining()
+    if budget is None:
+        return
+    for agent in agents:
+        if hasattr(agent.llm, "timeout"):
+            agent.llm.timeout = max(budget, 1.0)
+
+
+def _best_partial(outputs: List[Any]) -> Optional[Any]:
+    by_stage = {getattr(output, "name", None): output for output in outputs}
+    for stage in ANSWER_STAGES:
+        output = by_stage.get(stage)
+        if output is not None and str(output.raw).strip():
+            return output
+    return None
+
+
+def run_within(
+    deadline: Deadline,
+    fn: Callable[[Callable], Any],
+    stages: Sequence[str],
+    task_callback: Optional[Callable] = None,
+) -> Any:
+    """
+    Run a pipeline against a deadline and return what is ready when it passes.
+
+    fn(task_callback) runs the pipeline in a separate thread and must call
+    task_callback with each stage's output (crew TaskOutputs or StageOutputs).
+    If a stage outlives its budget or the request deadline passes, the best
+    stage output so far is returned as a PartialAnswer. The pipeline thread
+    cannot be interrupted; it stops at its next stage boundary, and LLM calls
+    made under the deadline time out on their own. Use deadline.on_settled()
+    to hold resources (the admission slot) until it has exited.
+
+    Raises:
+        DeadlineExceeded: No stage produced a usable answer in time
+    """
+    outputs: List[Any] = []
+    changed = threading.Event()
+    done = threading.Event()
+    abandoned = threading.Event()
+    outcome: Dict[str, Any] = {}
+
+    def on_stage(output):
+        if abandoned.is_set():
+            raise DeadlineExceeded("Request deadline passed, stopping the pipeline")
+        outputs.append(output)
+        deadline.complete(getattr(output, "name", None))
+        changed.set()
+        if task_callback is not None:
+            task_callback(output)
+
+    def target():
+        _current.set(deadline)
+        try:
+            outcome["result"] = fn(on_stage)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+            changed.set()
+            deadline._worker_exited()
+
+    deadline.begin(stages)
+    context = contextvars.copy_context()
+    deadline._worker_started()
+    threading.Thread(target=context.run, args=(target,), name="deadline-run", daemon=True).start()
+
+    while not done.is_set():
+        timeout = deadline.stage_remaining()
+        if timeout <= 0:
+            break
+        changed.wait(timeout)
+        changed.clear()
+
+    if done.is_set():
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    abandoned.set()
+    return _expire(deadline, list(outputs))
+
+
+async def arun_within(
+    deadline: Deadline,
+    fn: Callable[[Callable], Awaitable[Any]],
+    stages: Sequence[str],
+    task_callback: Optional[Callable] = None,
+) -> Any:
+    """
+    run_within() for coroutines: fn(task_callback) is awaited as a task.
+
+    Unlike a thread, the task is cancelled when time runs out, so in-flight
+    async LLM calls are abandoned right away.
+    """
+    outputs: List[Any] = []
+
+    def on_stage(output):
+        outputs.append(output)
+        deadline.complete(getattr(output, "name", None))
+        if task_callback is not None:
+            task_callback(output)
+
+    async def target():
+        _current.set(deadline)
+        return await fn(on_stage)
+
+    deadline.begin(stages)
+    task = asyncio.ensure_future(target())
+    while not task.done():
+        # A stage that finishes moves stage_remaining() forward; waking at the
+        # old stage's expiry and re-checking is enough
+        timeout = deadline.stage_remaining()
+        if timeout <= 0:
+            break
+        await asyncio.wait({task}, timeout=timeout)
+
+    if task.done():
+        return task.result()
+
+    task.cancel()
+    return _expire(deadline, list(outputs))
+
+
+def _expire(deadline: Deadline, outputs: List[Any]) -> PartialAnswer:
+    """The best partial answer for an expired deadline, or DeadlineExceeded"""
+    expired = deadline.current_stage
+    partial = _best_partial(outputs)
+    DEADLINE_EXPIRATIONS.labels(expired or "unknown", "timeout" if partial is None else "partial").inc()
+    if partial is None:
+        raise DeadlineExceeded(f"No answer within {deadline.seconds:g}s (ran out of time in {expired})", expired)
+
+    logger.warning(f"Deadline of {deadline.seconds:g}s passed in {expired}, returning the {partial.name} output")
+    return PartialAnswer(raw=str(partial.raw).strip(), stage=partial.name, expired_stage=expired)
@@ -0,0 +1,90 @@
+"""
+Difficulty-based model escalation for the crew.
+
+Agents run on their own `llm:` model from config/agents.yaml (cheap, fast
+models for the light stages). With AI_ESCALATION=1, prompts that look hard
+get the agents that have an `escalate_llm:` model switched to it for that
+one run, so the planner and verifier reason with a stronger model only
+when the problem calls for it.
+
+Difficulty is a cheap text estimate, not an LLM call: long word problems,
+proofs, calculus/series/optimization topics, systems of equations and
+non-linear functions all count towards it.
+
+Environment:
+    AI_ESCALATION: 1 to escalate hard prompts (default 0)
+    AI_ESCALATION_THRESHOLD: Difficulty (0-1) from which a prompt escalates (default 0.5)
+"""
+
+import os
+import re
+import copy
+import threading
+
+from typing import Any, Callable, Dict, Optional
+
+from metrics import MODEL_ESCALATIONS
+
+ESCALATION = os.getenv("AI_ESCALATION", "0") == "1"
+THRESHOLD = float(os.getenv("AI_ESCALATION_THRESHOLD", "0.5"))
+
+HARD_TOPICS = re.compile(
+    r"\b(prove|show that|integra\w*|limit|series|converge\w*|eigen\w*|differential|optimi[sz]\w*|"
+    r"maximi[sz]\w*|minimi[sz]\w*|inequalit\w*|probabilit\w*|expected value|induction)\b",
+    re.IGNORECASE,
+)
+NONLINEAR = re.compile(r"\^\s*\(?[a-z]|\*\*\s*[a-z]|\b(sqrt|log|ln|sin|cos|tan|exp)\b", re.IGNORECASE)
+
+
+def difficulty(problem: str) -> float:
+    """Rough 0-1 difficulty of a math prompt"""
+    text = str(problem)
+    score = min(len(text) / 600, 0.3)
+    score += 0.2 * min(len(HARD_TOPICS.findall(text)), 2)
+    if text.count("=") >= 2:
+        score += 0.15
+    if NONLINEAR.search(text):
+        score += 0.15
+    return min(score, 1.0)
+
+
+class EscalationPolicy:
+    """
+    Switches agents of a per-run crew copy to their escalation model when
+    the prompt's difficulty reaches the threshold.
+
+    `models` maps agent roles to escalation model names, `resolve` turns a
+    model name and temperature into an LLM (through LLMConfig, see
+    multi_agents); the escalated agent keeps its temperature.
+    """
+
+    def __init__(self, models: Dict[str, str], resolve: Callable[[str, Optional[float]], Any],
+                 threshold: float = THRESHOLD):
+        self.models = models
+        self.resolve = resolve
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counts = {"escalated": 0, "kept": 0}
+
+    def apply(self, crew, problem: str) -> bool:
+        """Escalate crew's agents for problem; returns whether any model changed"""
+        escalated = False
+        if difficulty(problem) >= self.threshold:
+            for agent in crew.agents:
+                model = self.models.get(str(agent.role).strip())
+                # Native providers drop the "gemini/" prefix from their model name
+                if model and str(getattr(agent.llm, "model", "")).split("/")[-1] != model.split("/")[-1]:
+                    # resolve() hands out the LLM shared by every run (LLMConfig caches
+                    # them); this run's copy may get its own timeout (limit_llm_timeouts)
+                    agent.llm = copy.copy(self.resolve(model, getattr(agent.llm, "temperature", None)))
+                    escalated = True
+        result = "escalated" if escalated else "kept"
+        MODEL_ESCALATIONS.labels(result).inc()
+        with self._lock:
+            self._counts[result] += 1
+        return escalated
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {"enabled": ESCALATION, "threshold": self.threshold, "models": dict(self.models), **counts}
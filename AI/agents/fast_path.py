@@ -0,0 +1,376 @@
+import re
+import json
+import logging
+import threading
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from agents.results import format_result
+from metrics import FAST_PATH_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Names the math tools understand; any other multi-letter word makes a prompt ambiguous
+FUNCTIONS = {
+    "sin", "cos", "tan", "cot", "sec", "csc", "asin", "acos", "atan",
+    "log", "exp", "sqrt", "abs", "floor", "ceiling", "pi", "E",
+}
+# A bare "e" is Euler's number (the tools know it as E, as they know pi); glued to a
+# number ("2e^x", "1e-5") it is ambiguous and the prompt falls back
+EULER = re.compile(r"(?<![\w.])e(?!\w)")
+# Periodic: sympy returns only the principal solutions, not the general n*pi family
+TRIG_FUNCTIONS = {"sin", "cos", "tan", "cot", "sec", "csc"}
+IDENTIFIER = re.compile(r"[a-zA-Z_]\w*")
+EXPRESSION_CHARS = re.compile(r"^[\w\s+\-*/^().,]+$")
+ARITHMETIC = re.compile(r"^[\d\s+\-*/^().%]+$")
+NUMBER_LIST = re.compile(r"^\[?\s*(-?\d+(?:\.\d+)?(?:\s*,\s*-?\d+(?:\.\d+)?)+)\s*\]?$")
+MATRIX = re.compile(r"^\[\s*\[[-\d.,\s\[\]]+\]\s*\]$")
+
+SOLVE = re.compile(
+    r"^(?:solve|find\s+(?:the\s+)?(?:roots|solutions?)\s+of)?\s*(?:the\s+equation\s+)?"
+    r"(?:for\s+(?P<var>[a-z])\s*[:,]?\s*)?(?P<eq>[^=]+=[^=]+?)"
+    r"(?:\s+for\s+(?P<var2>[a-z]))?$",
+    re.IGNORECASE,
+)
+DERIVATIVE = re.compile(
+    r"^(?:find\s+)?(?:the\s+)?(?:(?:derivative|differentiate)\s*(?:of\s+)?|d/d(?P<dvar>[a-z])\s*(?:of\s+)?)"
+    r"(?P<expr>.+?)(?:\s+(?:with\s+respect\s+to|wrt|w\.r\.t\.?)\s+(?P<var>[a-z]))?$",
+    re.IGNORECASE,
+)
+INTEGRAL = re.compile(
+    r"^(?:find\s+)?(?:the\s+)?(?:integral|integrate|antiderivative)\s*(?:of\s+)?"
+    r"(?P<expr>.+?)(?:\s*d(?P<dvar>[a-z])|\s+(?:with\s+respect\s+to|wrt)\s+(?P<var>[a-z]))?$",
+    re.IGNORECASE,
+)
+SIMPLIFY = re.compile(r"^simplify\s*:?\s*(?P<expr>.+)$", re.IGNORECASE)
+MATRIX_OP = re.compile(
+    r"^(?:find\s+)?(?:the\s+)?(?P<op>det|determinant|inverse|inv|eigenvalues|eigen)\s*(?:of\s+)?"
+    r"(?:the\s+)?(?:matrix\s+)?(?P<matrix>\[.*\])$",
+    re.IGNORECASE,
+)
+STATISTIC = re.compile(
+    r"^(?:find\s+)?(?:the\s+)?(?P<op>mean|average|median|variance|std|standard\s+deviation)\s*"
+    r"(?:of\s+)?(?:the\s+)?(?:numbers\s+|data\s+)?:?\s*(?P<data>.+)$",
+    re.IGNORECASE,
+)
+ARITHMETIC_PREFIX = re.compile(r"^(?:calculate|compute|evaluate|what\s+is)\s+", re.IGNORECASE)
+
+MATRIX_ACTIONS = {
+    "det": "determinant", "determinant": "determinant",
+    "inverse": "inverse", "inv": "inverse",
+    "eigenvalues": "eigen", "eigen": "eigen",
+}
+STATISTIC_ACTIONS = {
+    "mean": "mean", "average": "mean", "median": "median",
+    "variance": "variance", "std": "std", "standard deviation": "std",
+}
+
+
+@dataclass
+class Route:
+    """A prompt the router recognized: which tool call to make and how to explain its result"""
+    name: str
+    call: Dict[str, Any]
+    explain: Callable[[Any], str]
+
+
+@dataclass
+class FastPathAnswer:
+    """Answer produced by the tools alone; exposes .raw like a crew output"""
+    raw: str
+    route: str
+    call: Dict[str, Any] = field(default_factory=dict)
+
+
+def _expression(text: str) -> Optional[str]:
+    """Tool-ready expression, or None when the text is not plain math"""
+    text = text.strip().rstrip(".?!")
+    if not text or not EXPRESSION_CHARS.match(text):
+        return None
+    return EULER.sub("E", text).replace("^", "**")
+
+
+def _variables(expr: str) -> Optional[List[str]]:
+    """Free single-letter variables of an expression; None if it contains unknown words"""
+    found = []
+    for name in IDENTIFIER.findall(expr):
+        if name in FUNCTIONS:
+            continue
+        if len(name) != 1 or name == "e":
+            return None
+        if name not in found:
+            found.append(name)
+    return found
+
+
+def _pick_variable(expr: str, given: Optional[str]) -> Optional[str]:
+    variables = _variables(expr)
+    if variables is None:
+        return None
+    if given:
+        return given if given in variables else None
+    return variables[0] if len(variables) == 1 else None
+
+
+class FastPathRouter:
+    """
+    Deterministic router in front of the crew.
+
+    Prompts that are already machine-readable ("solve x^2 - 5x + 6 = 0",
+    "derivative of sin(x)*x^2", "det [[1,2],[3,4]]", "mean of 1, 2, 3",
+    "2 + 3 * 4") are parsed with regular expressions, sent straight to the
+    math tools through ToolExecutor and answered with a templated
+    explanation. Anything that does not match exactly, or that the tool
+    rejects, returns None so the caller falls back to the crew.
+    """
+
+    def __init__(self, executor_factory: Optional[Callable[[], Any]] = None):
+        """
+        Initialize the router.
+
+        Args:
+            executor_factory: Returns the ToolExecutor to use; defaults to the
+                crew's shared executor (built on first use)
+        """
+        self._executor_factory = executor_factory or _default_executor
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.fallbacks = 0
+
+        self.rules = [
+            self._matrix,
+            self._statistic,
+            self._derivative,
+            self._integral,
+            self._simplify,
+            self._solve,
+            self._arithmetic,
+        ]
+
+    def classify(self, prompt: str) -> Optional[Route]:
+        """Return the route for a prompt, or None if it is not directly solvable"""
+        text = " ".join(prompt.split()).rstrip(".?!")
+        for rule in self.rules:
+            route = rule(text)
+            if route is not None:
+                return route
+        return None
+
+    def answer(self, prompt: str) -> Optional[FastPathAnswer]:
+        """
+        Solve a prompt with the tools alone.
+
+        Returns:
+            A FastPathAnswer, or None when the crew should handle the prompt
+        """
+        route = self.classify(prompt)
+        if route is None:
+            self._count("none", "fallback")
+            return None
+
+        try:
+            result = self._executor_factory().execute(route.call)
+            explanation = route.explain(result)
+        except Exception as e:
+            logger.info(f"Fast path {route.name} failed, falling back to crew: {str(e)}")
+            self._count(route.name, "error")
+            return None
+
+        self._count(route.name, "hit")
+        return FastPathAnswer(raw=explanation, route=route.name, call=route.call)
+
+    def _count(self, route: str, result: str) -> None:
+        FAST_PATH_REQUESTS.labels(route, result).inc()
+        with self._lock:
+            if result == "hit":
+                self.hits[route] = self.hits.get(route, 0) + 1
+            elif result == "error":
+                self.errors[route] = self.errors.get(route, 0) + 1
+            else:
+                self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + sum(self.errors.values()) + self.fallbacks
+            return {
+                "hits": dict(self.hits),
+                "errors": dict(self.errors),
+                "fallbacks": self.fallbacks,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Rules: each returns a Route or None
+    # ---------------------------------------------------------------------------------------------------------
+
+    def _solve(self, text: str) -> Optional[Route]:
+        match = SOLVE.match(text)
+        if not match:
+            return None
+        sides = [_expression(side) for side in match.group("eq").split("=")]
+        if None in sides or any("," in side for side in sides):
+            return None
+        equation = " = ".join(sides)
+        # EquationSolver only knows the variable it solves for, so no parameters
+        variables = _variables(equation)
+        if variables is None or len(variables) != 1 or TRIG_FUNCTIONS & set(IDENTIFIER.findall(equation)):
+            return None
+        var = _pick_variable(equation, match.group("var") or match.group("var2"))
+        if var is None:
+            return None
+
+        shown = match.group("eq").strip()
+
+        def explain(solutions):
+            if any(getattr(s, "is_real", True) is False for s in solutions):
+                # Real vs. complex answers depends on the course level; let the crew decide
+                raise ValueError("Equation has non-real solutions")
+            if not solutions:
+                return f"The equation {shown} has no solution for {var}."
+            values = ", ".join(f"{var} = {format_result(s)}" for s in solutions)
+            return (
+                f"To solve {shown}, move every term to one side and find the values of {var} "
+                f"that make the expression equal to zero.\n\n**Solution:** {values}"
+            )
+
+        return Route("solve", {
+            "tool": "equation_solver", "action": "solve_equation",
+            "args": {"equation": equation, "var": var},
+        }, explain)
+
+    def _derivative(self, text: str) -> Optional[Route]:
+        match = DERIVATIVE.match(text)
+        if not match:
+            return None
+        expr = _expression(match.group("expr"))
+        if expr is None or "," in expr:
+            return None
+        var = _pick_variable(expr, match.group("var") or match.group("dvar"))
+        if var is None:
+            return None
+
+        shown = match.group("expr").strip()
+
+        def explain(result):
+            return (
+                f"Differentiating {shown} with respect to {var}:\n\n"
+                f"**d/d{var} [{shown}] = {format_result(result)}**"
+            )
+
+        return Route("derivative", {
+            "tool": "symbolic_math", "action": "derivative",
+            "args": {"expr": expr, "var": var},
+        }, explain)
+
+    def _integral(self, text: str) -> Optional[Route]:
+        match = INTEGRAL.match(text)
+        if not match:
+            return None
+        expr = _expression(match.group("expr"))
+        if expr is None or "," in expr:
+            return None
+        var = _pick_variable(expr, match.group("var") or match.group("dvar"))
+        if var is None:
+            return None
+
+        shown = match.group("expr").strip()
+
+        def explain(result):
+            return (
+                f"Integrating {shown} with respect to {var}:\n\n"
+                f"**∫ {shown} d{var} = {format_result(result)} + C**"
+            )
+
+        return Route("integral", {
+            "tool": "symbolic_math", "action": "integral",
+            "args": {"expr": expr, "var": var},
+        }, explain)
+
+    def _simplify(self, text: str) -> Optional[Route]:
+        match = SIMPLIFY.match(text)
+        if not match:
+            return None
+        expr = _expression(match.group("expr"))
+        if expr is None or "," in expr or _variables(expr) is None:
+            return None
+
+        shown = match.group("expr").strip()
+
+        def explain(result):
+            return f"Simplifying {shown}:\n\n**{shown} = {format_result(result)}**"
+
+        return Route("simplify", {
+            "tool": "symbolic_math", "action": "simplify",
+            "args": {"expr": expr},
+        }, explain)
+
+    def _matrix(self, text: str) -> Optional[Route]:
+        match = MATRIX_OP.match(text)
+        if not match or not MATRIX.match(match.group("matrix")):
+            return None
+        try:
+            matrix = json.loads(match.group("matrix"))
+        except ValueError:
+            return None
+        if not matrix or any(not isinstance(row, list) or len(row) != len(matrix) for row in matrix):
+            # All three operations need a square matrix
+            return None
+
+        action = MATRIX_ACTIONS[match.group("op").lower()]
+        shown = match.group("matrix")
+
+        def explain(result):
+            if action == "determinant":
+                return f"The determinant of {shown} is **{format_result(result)}**."
+            if action == "inverse":
+                return f"The inverse of {shown} is **{format_result(result)}**."
+            values, _ = result
+            return f"The eigenvalues of {shown} are **{format_result(values)}**."
+
+        return Route(f"matrix_{action}", {
+            "tool": "matrix", "action": action, "args": {"A": matrix},
+        }, explain)
+
+    def _statistic(self, text: str) -> Optional[Route]:
+        match = STATISTIC.match(text)
+        if not match:
+            return None
+        numbers = NUMBER_LIST.match(match.group("data").strip())
+        if not numbers:
+            return None
+        data = [float(n) if "." in n else int(n) for n in re.split(r"\s*,\s*", numbers.group(1))]
+
+        op = " ".join(match.group("op").lower().split())
+        action = STATISTIC_ACTIONS[op]
+        # statistics.variance/stdev compute the sample (n - 1) versions
+        label = {"mean": "mean", "median": "median", "variance": "sample variance", "std": "sample standard deviation"}[action]
+
+        def explain(result):
+            return f"The {label} of {format_result(data)} is **{format_result(result)}**."
+
+        return Route(f"statistics_{action}", {
+            "tool": "statistics", "action": action, "args": {"data": data},
+        }, explain)
+
+    def _arithmetic(self, text: str) -> Optional[Route]:
+        expr = ARITHMETIC_PREFIX.sub("", text).strip()
+        if not ARITHMETIC.match(expr) or not re.search(r"\d\s*[-+*/^%]\s*[\d(]", expr):
+            return None
+
+        shown = expr
+
+        def explain(result):
+            return f"**{shown} = {format_result(result)}**"
+
+        return Route("arithmetic", {
+            "tool": "calculator", "action": None,
+            "args": {"expression": expr.replace("^", "**")},
+        }, explain)
+
+
+def _default_executor():
+    from agents.multi_agents import get_executor
+    return get_executor()
@@ -0,0 +1,174 @@
+import os
+import time
+import uuid
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+from agents.results import extract_answer
+from metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background chat job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue cannot accept another submission"""
+
+
+@dataclass
+class Job:
+    """A single background crew run and the events it produced so far."""
+    id: str
+    prompt: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    # Extra keyword arguments for the runner (e.g. pipeline)
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def stages(self) -> List[Dict[str, Any]]:
+        """Return the per-task outputs recorded so far"""
+        return [e for e in self.events if e["event"] == "stage"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stages": self.stages(),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Run crew executions on a bounded worker pool and record per-task progress.
+
+    Submissions return immediately with a job id. Each finished crew task is
+    appended to the job's event list, so clients can poll or stream partial
+    output while the remaining stages are still running.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, Callable[[Any], None]], Any],
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initialize the job manager.
+
+        Args:
+            runner: Callable(prompt, task_callback, **options) running the pipeline
+            max_workers: Concurrent crew runs (env AI_JOB_WORKERS, default 4)
+            max_pending: Max queued + running jobs (env AI_JOB_MAX_PENDING, default 64)
+            ttl: Seconds to keep finished jobs around (env AI_JOB_TTL, default 3600)
+        """
+        self.runner = runner
+        self.max_workers = max_workers or int(os.getenv("AI_JOB_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("AI_JOB_MAX_PENDING", "64"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("AI_JOB_TTL", "3600"))
+
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chat-job")
+
+    def submit(self, prompt: str, **options: Any) -> Job:
+        """
+        Queue a prompt for background execution.
+
+        Args:
+            prompt: The user's problem
+            **options: Passed through to the runner
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._prune()
+            if self.pending() >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({self.max_pending} pending)")
+            job = Job(id=uuid.uuid4().hex, prompt=prompt, options=options)
+            self._jobs[job.id] = job
+        QUEUE_DEPTH.labels("jobs").inc()
+
+        self._pool.submit(self._execute, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        """Number of jobs that are queued or running"""
+        return sum(1 for job in list(self._jobs.values()) if not job.finished)
+
+    def _execute(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+
+        def on_task_complete(output: Any) -> None:
+            job.events.append({
+                "event": "stage",
+                "index": len(job.stages()),
+                "task": getattr(output, "name", None),
+                "agent": getattr(output, "agent", None),
+                "output": extract_answer(output),
+                "elapsed": time.time() - job.started_at,
+            })
+
+        try:
+            answer = extract_answer(self.runner(job.prompt, on_task_complete, **job.options))
+            if not answer:
+                raise ValueError("Empty response from agents")
+            job.result = answer
+            self._finish(job, JobStatus.SUCCEEDED, {"event": "done", "result": answer})
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            job.error = str(e)
+            self._finish(job, JobStatus.FAILED, {"event": "error", "error": str(e)})
+
+    @staticmethod
+    def _finish(job: Job, status: JobStatus, event: Dict[str, Any]) -> None:
+        # The terminal event is published before the status flips, so a reader
+        # that sees a finished job is guaranteed to have every event available
+        job.finished_at = time.time()
+        job.events.append(event)
+        job.status = status
+        QUEUE_DEPTH.labels("jobs").dec()
+
+    def _prune(self) -> None:
+        """Drop finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,160 @@
+import os
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from agents.results import StageOutput, format_result
+from startup import lazy
+
+logger = logging.getLogger(__name__)
+
+# The tool selector only has to emit one JSON object; reasoning mostly adds latency there
+LEAN_MODEL = os.getenv("AI_LEAN_MODEL", "deepseek/deepseek-v3.2")
+LEAN_REASONING = os.getenv("AI_LEAN_REASONING", "0") == "1"
+
+
+class LeanPipelineError(ValueError):
+    """The lean pipeline could not produce a tool result (bad tool call or tool error)"""
+
+
+@dataclass
+class LeanAnswer:
+    """Result of the lean pipeline; exposes .raw like a crew output"""
+    raw: str
+    call: Dict[str, Any]
+    result: str
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@lazy
+def get_agent():
+    """MyAgent wired to the system_prompts.json tool selector and the shared tools"""
+    from agents.agent import MyAgent
+    from agents.multi_agents import get_executor, get_prompts
+
+    p_proc = get_prompts()
+    return MyAgent(
+        SYSTEM_PROMPT=p_proc.get_system_prompt(),
+        EXPLAIN_PROMPT=p_proc.get_prompt("explain_prompt_template"),
+        p_proc=p_proc,
+        executor=get_executor(),
+        model=LEAN_MODEL,
+        reasoning=LEAN_REASONING,
+    )
+
+
+def _select_and_execute(question: str, timings: Dict[str, float], task_callback: Optional[Callable]):
+    """Steps 1 and 2: one LLM call picks the tool, the tool runs in process"""
+    agent = get_agent()
+
+    start = time.perf_counter()
+    try:
+        call = agent.select_tool(question)
+    except Exception as e:
+        raise LeanPipelineError(f"Tool selection failed: {e}")
+    timings["select_tool"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("select_tool", "Tool Selector", str(call)))
+
+    start = time.perf_counter()
+    try:
+        result = agent.execute(call)
+    except Exception as e:
+        raise LeanPipelineError(f"Tool {call.get('tool')} failed: {e}")
+    timings["execute_tool"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("execute_tool", "Tool Executor", format_result(result)))
+
+    return agent, call, result
+
+
+def solve(question: str, task_callback: Optional[Callable] = None) -> LeanAnswer:
+    """
+    Answer a question with two LLM calls instead of the five-agent crew.
+
+    1. The system_prompts.json tool selector returns one JSON tool call.
+    2. ToolExecutor runs it in process.
+    3. One more LLM call explains the result.
+
+    Args:
+        question: The user's mathematical problem
+        task_callback: Optional callable invoked with a StageOutput after each step
+
+    Raises:
+        LeanPipelineError: If no usable tool call or tool result was produced
+    """
+    timings: Dict[str, float] = {}
+    agent, call, result = _select_and_execute(question, timings, task_callback)
+
+    start = time.perf_counter()
+    explanation = agent.explain(question, call, result)
+    timings["explain"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("explain", "Explainer", explanation))
+
+    logger.info(f"Lean pipeline timings: {timings}")
+    return LeanAnswer(raw=explanation, call=call, result=format_result(result), timings=timings)
+
+
+async def _aselect_and_execute(question: str, timings: Dict[str, float], task_callback: Optional[Callable]):
+    """_select_and_execute() for the event loop: async LLM call, tool on the tool pool"""
+    # Building the agent imports crewai on a cold worker; keep that off the loop
+    agent = get_agent() if get_agent.loaded() else await asyncio.to_thread(get_agent)
+
+    start = time.perf_counter()
+    try:
+        call = await agent.aselect_tool(question)
+    except Exception as e:
+        raise LeanPipelineError(f"Tool selection failed: {e}")
+    timings["select_tool"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("select_tool", "Tool Selector", str(call)))
+
+    start = time.perf_counter()
+    try:
+        result = await agent.aexecute(call)
+    except Exception as e:
+        raise LeanPipelineError(f"Tool {call.get('tool')} failed: {e}")
+    timings["execute_tool"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("execute_tool", "Tool Executor", format_result(result)))
+
+    return agent, call, result
+
+
+async def asolve(question: str, task_callback: Optional[Callable] = None) -> LeanAnswer:
+    """solve() without holding a thread: both LLM calls are awaited, the tool runs on the tool pool"""
+    timings: Dict[str, float] = {}
+    agent, call, result = await _aselect_and_execute(question, timings, task_callback)
+
+    start = time.perf_counter()
+    explanation = await agent.aexplain(question, call, result)
+    timings["explain"] = time.perf_counter() - start
+    if task_callback is not None:
+        task_callback(StageOutput("explain", "Explainer", explanation))
+
+    logger.info(f"Lean pipeline timings: {timings}")
+    return LeanAnswer(raw=explanation, call=call, result=format_result(result), timings=timings)
+
+
+def stream(question: str) -> Iterator[str]:
+    """
+    Same as solve(), but yields the explanation as it is generated.
+
+    Returns:
+        The LeanAnswer (as the generator's return value)
+    """
+    timings: Dict[str, float] = {}
+    agent, call, result = _select_and_execute(question, timings, None)
+
+    start = time.perf_counter()
+    pieces = []
+    for piece in agent.stream_explanation(question, call, result):
+        pieces.append(piece)
+        yield piece
+    timings["explain"] = time.perf_counter() - start
+
+    return LeanAnswer(raw="".join(pieces).strip(), call=call, result=format_result(result), timings=timings)
@@ -6,16 +6,18 @@ from pathlib import Path
 
 from tools.tools import (CalculatorTool, EquationSolverTool, SymbolicMathTool, MatrixToolAgent,
                         StatisticsToolAgent, ToolRegistry, ToolExecutor, InputProcessingTool)
+from tools.plan_compiler import plan_guardrail
+from agents.compaction import compactor
+from agents.escalation import ESCALATION, EscalationPolicy
 from prompt_processing import PromptProcessing
 from config.llm_config import LLMConfig, LLMMode
-
-from langchain.tools import tool
+from config.llm_router import LLMRouter, router_from_env, routed_llm
+from startup import lazy
 
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import pprint
 
@@ -23,33 +25,123 @@ from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())
 print("DEBUG: OPENAI_API_KEY loaded:", bool(os.getenv("OPENAI_API_KEY")))
 print("DEBUG: GOOGLE_API_KEY loaded:", bool(os.getenv("GOOGLE_API_KEY")))
+# Task outputs are compacted to what the next stage needs before they are passed on (see agents/compaction.py)
+COMPACT_CONTEXT = os.getenv("AI_COMPACT_CONTEXT", "1") == "1"
+
+def compacted(stage: str) -> dict:
+    """Task kwargs installing the context compaction guardrail for stage, when enabled"""
+    return {"guardrail": compactor.guardrail(stage)} if COMPACT_CONTEXT else {}
+
 # =============================================================================================================
 # TOOLS REGISTRY
 # =============================================================================================================
 
-# Registering tools
-registry = ToolRegistry()
-registry.register(CalculatorTool())
-registry.register(EquationSolverTool())
-registry.register(SymbolicMathTool())
-registry.register(MatrixToolAgent())
-registry.register(StatisticsToolAgent())
-registry.register(InputProcessingTool())
+# Everything below is built on first use, not at import (see startup.lazy)
 
-executor = ToolExecutor(registry=registry)
+@lazy
+def get_registry() -> ToolRegistry:
+    """Registering tools"""
+    registry = ToolRegistry()
+    registry.register(CalculatorTool())
+    registry.register(EquationSolverTool())
+    registry.register(SymbolicMathTool())
+    registry.register(MatrixToolAgent())
+    registry.register(StatisticsToolAgent())
+    registry.register(InputProcessingTool())
+    return registry
+
+@lazy
+def get_executor() -> ToolExecutor:
+    return ToolExecutor(registry=get_registry())
 
 # =============================================================================================================
 # GET PROMPTS
 # =============================================================================================================
 
-p_proc = PromptProcessing()
-p_proc.load("system_prompts.json")
-SYSTEM_PROMPT = p_proc.get_system_prompt()
+@lazy
+def get_prompts() -> PromptProcessing:
+    p_proc = PromptProcessing()
+    p_proc.load("system_prompts.json")
+    return p_proc
+
+def get_system_prompt() -> str:
+    return get_prompts().get_system_prompt()
+
+@lazy
+def get_llm_config() -> LLMConfig:
+    """Initialize LLM with Google API (Gemini), or the LLM_MODE provider when that is set"""
+    if os.getenv("LLM_MODE"):
+        llm_config = LLMConfig(LLMConfig.get_mode_from_env())
+    else:
+        llm_config = LLMConfig(LLMMode.GOOGLE, model="gemini/gemini-2.5-flash-lite")
+    llm_config.print_status()
+    return llm_config
+
+@lazy
+def get_llm_router() -> Optional[LLMRouter]:
+    """Hedged failover routing over AI_LLM_PROVIDERS (None unless two or more are usable)"""
+    return router_from_env()
+
+def get_llm() -> LLM:
+    router = get_llm_router()
+    if router is not None:
+        return routed_llm(router)
+    return get_llm_config().get_llm()
+
+# Agents use their own `llm:` model from agents.yaml, unless LLM_MODE or
+# AI_LLM_PROVIDERS put every agent on one provider (or AI_AGENT_MODELS=0)
+AGENT_MODELS = os.getenv("AI_AGENT_MODELS", "1") == "1"
+
+def per_agent_models() -> bool:
+    return AGENT_MODELS and not os.getenv("LLM_MODE") and get_llm_router() is None
+
+def get_model_llm(model: Optional[str], temperature: Optional[float] = None) -> LLM:
+    """
+    LLM for an agents.yaml model name and temperature, resolved through LLMConfig.
+
+    Without per-agent models this is the shared provider, at `temperature`
+    when one is given. Routed LLMs answer with each provider's own settings.
+    """
+    if get_llm_router() is not None:
+        return get_llm()
+    overrides = {"temperature": temperature} if temperature is not None else {}
+    if not model or not per_agent_models():
+        if not overrides:
+            return get_llm()
+        llm_config = get_llm_config()
+        return LLMConfig(llm_config.mode, **{**llm_config.custom_config, **overrides}).get_llm()
+    return LLMConfig(LLMConfig.mode_for_model(model), model=model, **overrides).get_llm()
+
+def agent_llm(conf: Dict[str, Any]) -> LLM:
+    """LLM for an agents.yaml entry (its `llm:` model and `temperature:`)"""
+    return get_model_llm(conf.get('llm'), conf.get('temperature'))
+
+@lazy
+def get_escalation_policy() -> EscalationPolicy:
+    """Escalation models (`escalate_llm:` in agents.yaml) by agent role"""
+    with open("config/agents.yaml") as f:
+        agents_config = yaml.safe_load(f)
+    models = {
+        conf["role"].strip(): conf["escalate_llm"]
+        for conf in agents_config.values() if conf.get("escalate_llm")
+    }
+    return EscalationPolicy(models, resolve=get_model_llm)
+
+# Old module attributes, now resolved on first access
+_LAZY_ATTRIBUTES = {
+    "registry": get_registry,
+    "executor": get_executor,
+    "p_proc": get_prompts,
+    "SYSTEM_PROMPT": get_system_prompt,
+    "llm_config": get_llm_config,
+    "llm": get_llm,
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Initialize LLM with Google API (Gemini)
-llm_config = LLMConfig(LLMMode.GOOGLE, model="gemini/gemini-2.5-flash-lite")
-llm_config.print_status()
-llm = llm_config.get_llm()
 # =============================================================================================================
 # CONFIG CREW
 # =============================================================================================================
@@ -71,7 +163,6 @@ class MathCrew():
         self.agents = [
             self.problem_analyzer(),
             self.math_planner(),
-            self.input_formatter(),
             self.math_executor(),
             self.solution_verifier(),
             self.math_explainer(),
@@ -80,7 +171,6 @@ class MathCrew():
         self.tasks = [
             self.analyze_problem(),
             self.plan_solution(),
-            self.format_input(),
             self.execute_solution(),
             self.verify_solution(),
             self.explain_solution(),
@@ -95,7 +185,7 @@ class MathCrew():
             config=self.agents_config['problem_analyzer'],
             verbose=True,
             #tools=[SerperDevTool()]
-            llm=llm
+            llm=agent_llm(self.agents_config['problem_analyzer'])
         )
     
     @agent
@@ -103,16 +193,7 @@ class MathCrew():
         return Agent(
             config=self.agents_config['math_planner'],
             verbose=True,
-            llm=llm
-        )
-      
-    @agent
-    def input_formatter(self) -> Agent:
-        return Agent(
-            config=self.agents_config['input_formatter'],
-            verbose=True,
-            tools=[registry.get('input_processing')],
-            llm=llm
+            llm=agent_llm(self.agents_config['math_planner'])
         )
       
     @agent
@@ -121,14 +202,14 @@ class MathCrew():
             config=self.agents_config['math_executor'],
             verbose=True,
             tools=[
-                registry.get("calculator"),
-                registry.get("equation_solver"),
-                registry.get("symbolic_math"),
-                registry.get("matrix"),
-                registry.get("statistics"),
-                registry.get('input_processing')
+                get_registry().get("calculator"),
+                get_registry().get("equation_solver"),
+                get_registry().get("symbolic_math"),
+                get_registry().get("matrix"),
+                get_registry().get("statistics"),
+                get_registry().get('input_processing')
             ],
-            llm=llm
+            llm=agent_llm(self.agents_config['math_executor'])
         ) 
     @agent
     def solution_verifier (self) -> Agent:
@@ -136,10 +217,10 @@ class MathCrew():
             config=self.agents_config['solution_verifier'],
             verbose=True,
             tools=[
-                registry.get("calculator"),
-                registry.get("symbolic_math"),
+                get_registry().get("calculator"),
+                get_registry().get("symbolic_math"),
             ],
-            llm=llm
+            llm=agent_llm(self.agents_config['solution_verifier'])
         )
     
     @agent
@@ -147,7 +228,7 @@ class MathCrew():
         return Agent(
             config=self.agents_config['math_explainer'],
             verbose=True,
-            llm=llm
+            llm=agent_llm(self.agents_config['math_explainer'])
         )
     
     @task
@@ -157,7 +238,8 @@ class MathCrew():
         return Task(
             description=task_conf["description"],
             expected_output=task_conf["expected_output"],
-            agent=agent_obj
+            agent=agent_obj,
+            **compacted("analyze_problem")
         )
         
     @task
@@ -170,20 +252,10 @@ class MathCrew():
             description=task_conf["description"],
             expected_output=task_conf["expected_output"],
             agent=agent_obj,
-            context=context
-        )
-    
-    @task
-    def format_input(self) -> Task:
-        task_conf = self.tasks_config['format_input']
-        agent_obj = getattr(self, task_conf["agent"])()
-        raw_ctx = task_conf.get("context", [])
-        context = [getattr(self, c)() if isinstance(c, str) and hasattr(self, c) else c for c in raw_ctx]
-        return Task(
-            description=task_conf["description"],
-            expected_output=task_conf["expected_output"],
-            agent=agent_obj,
-            context=context
+            context=context,
+            # Compiles the plan into the JSON tool call math_executor runs (no LLM call);
+            # plans that don't compile reach math_executor as written
+            guardrail=plan_guardrail
         )
     
     @task
@@ -196,7 +268,8 @@ class MathCrew():
             description=task_conf["description"],
             expected_output=task_conf["expected_output"],
             agent=agent_obj,
-            context=context
+            context=context,
+            **compacted("execute_solution")
         )
     @task
     def verify_solution(self) -> Task:
@@ -208,7 +281,8 @@ class MathCrew():
             description=task_conf["description"],
             expected_output=task_conf["expected_output"],
             agent=agent_obj,
-            context=context
+            context=context,
+            **compacted("verify_solution")
         )
         
     @task
@@ -231,4 +305,32 @@ class MathCrew():
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True
-        )
\ No newline at end of file
+        )
+# =============================================================================================================
+# CREW TEMPLATE
+# =============================================================================================================
+
+@lazy
+def crew_template() -> Crew:
+    """
+    The MathCrew built once per process: YAML parsed, five agents and the task
+    graph wired up. Never kick it off directly, take a copy with new_crew().
+    
+    Building a MathCrew per request is also a leak: crewai memoizes @agent and
+    @task results in a process-wide cache keyed by id(self), which keeps every
+    instance alive and can hand a new instance the stale tasks of a dead one
+    that had the same id.
+    """
+    return MathCrew().crew()
+
+def new_crew(inputs: Optional[str] = None) -> Crew:
+    """
+    Cheap per-request crew: fresh agents and tasks copied from the template.
+    
+    With AI_ESCALATION=1 and the prompt in inputs, hard prompts get stronger
+    models for this run (see agents/escalation.py).
+    """
+    crew = crew_template().copy()
+    if inputs is not None and ESCALATION:
+        get_escalation_policy().apply(crew, inputs)
+    return crew
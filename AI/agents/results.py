@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+def extract_answer(result: Any) -> Optional[str]:
+    """
+    Extract the answer text from a crew (or task) output.
+
+    Args:
+        result: CrewOutput, TaskOutput or any object returned by the pipeline
+
+    Returns:
+        The stripped answer text, or None if nothing usable was returned
+    """
+    if result is None:
+        return None
+
+    # Try .raw first (most common from CrewAI)
+    if hasattr(result, 'raw'):
+        return str(result.raw).strip()
+    # Try .output
+    if hasattr(result, 'output'):
+        return str(result.output).strip()
+    # Try string conversion
+    if result:
+        return str(result).strip()
+    return None
+
+
+def format_result(value: Any) -> str:
+    """Render a tool result (sympy, numpy or python numbers) as readable text"""
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(format_result(v) for v in value) + "]"
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    return str(value).replace("**", "^")
+
+
+@dataclass
+class StageOutput:
+    """
+    Output of one stage of a pipeline that does not run crewai tasks.
+
+    Mirrors the TaskOutput fields that task callbacks read (name, agent,
+    raw), so job progress events look the same for every pipeline.
+    """
+    name: str
+    agent: str
+    raw: str
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import logging
+import threading
+import contextvars
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from metrics import SPECULATION_RESULTS, SPECULATION_SAVED_SECONDS, SPECULATION_WASTED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Explainer calls started ahead of verification; a miss leaves one running until it finishes
+SPECULATIVE_WORKERS = int(os.getenv("AI_SPECULATIVE_WORKERS", "4"))
+
+# verify_solution ends with "Verdict: CONFIRMED" or "Verdict: CORRECTED" (see config/tasks.yaml)
+VERDICT = re.compile(r"verdict\s*[:\-]\s*\**\s*(confirmed|corrected)", re.IGNORECASE)
+
+
+def confirmed(verification: str) -> bool:
+    """
+    Whether the verifier accepted the executed solution unchanged.
+
+    Only an explicit CONFIRMED verdict counts; a missing or unreadable
+    verdict is treated as a correction so nothing unverified is committed.
+    """
+    verdicts = VERDICT.findall(verification or "")
+    return bool(verdicts) and verdicts[-1].lower() == "confirmed"
+
+
+@dataclass
+class SpeculativeAnswer:
+    """Result of the speculative pipeline; exposes .raw like a crew output"""
+    raw: str
+    verification: str
+    speculation_hit: bool
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class Speculator:
+    """
+    Run verification and a speculative explanation side by side.
+
+    The explainer starts on the executed solution while the verifier checks
+    it. If the verifier confirms the solution, the speculative explanation is
+    the answer and the verify → explain wait is saved; otherwise it is
+    discarded and the explainer runs again on the corrected solution.
+    """
+
+    def __init__(self, max_workers: int = SPECULATIVE_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def run(
+        self,
+        solution: str,
+        verify: Callable[[str], Any],
+        explain: Callable[[str], Any],
+    ) -> tuple:
+        """
+        Args:
+            solution: Output of execute_solution
+            verify: Runs the verifier on a solution, returns its output (with .raw)
+            explain: Runs the explainer on a context, returns its output (with .raw)
+
+        Returns:
+            (verification output, committed explanation output, hit, timings)
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        # Run in a copy of this context so the explainer's LLM calls count towards this request
+        speculative = self._pool.submit(contextvars.copy_context().run, self._timed, explain, solution)
+
+        verify_start = time.perf_counter()
+        verification = verify(solution)
+        timings["verify"] = time.perf_counter() - verify_start
+
+        if confirmed(verification.raw):
+            try:
+                explanation, timings["explain"] = speculative.result()
+            except Exception as e:
+                logger.warning(f"Speculative explanation failed ({e}), explaining the verified solution")
+                self._record("error")
+            else:
+                # Sequentially this would have cost verify + explain
+                saved = max(0.0, timings["verify"] + timings["explain"] - (time.perf_counter() - start))
+                timings["saved"] = saved
+                self._record("hit", saved=saved)
+                return verification, explanation, True, timings
+        else:
+            # Don't wait for the discarded explanation; account for it once it finishes
+            speculative.add_done_callback(self._discarded)
+            self._record("miss")
+
+        explain_start = time.perf_counter()
+        explanation = explain(verification.raw)
+        timings["explain"] = time.perf_counter() - explain_start
+        return verification, explanation, False, timings
+
+    @staticmethod
+    def _timed(fn: Callable[[str], Any], context: str):
+        start = time.perf_counter()
+        return fn(context), time.perf_counter() - start
+
+    def _discarded(self, future) -> None:
+        if future.exception() is None:
+            wasted = future.result()[1]
+            SPECULATION_WASTED_SECONDS.inc(wasted)
+            with self._lock:
+                self.wasted_seconds += wasted
+
+    def _record(self, result: str, saved: float = 0.0) -> None:
+        SPECULATION_RESULTS.labels(result).inc()
+        if saved:
+            SPECULATION_SAVED_SECONDS.inc(saved)
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+                self.saved_seconds += saved
+            elif result == "miss":
+                self.misses += 1
+            else:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses + self.errors
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "wasted_seconds": round(self.wasted_seconds, 3),
+            }
+
+
+speculator = Speculator()
+
+
+def solve(question: str, task_callback: Optional[Callable] = None) -> SpeculativeAnswer:
+    """
+    Answer a question with the crew, overlapping verification and explanation.
+
+    analyze → plan → execute run as a regular crew; verify_solution and a
+    speculative explain_solution then run in parallel on the executed solution.
+
+    Args:
+        question: The user's mathematical problem
+        task_callback: Optional callable invoked with each TaskOutput, in
+            stage order; only the committed explanation is reported
+    """
+    from crewai import Crew, Process
+    from agents.crew_run import get_stage_cache, load_crew
+    from agents.multi_agents import new_crew
+    from agents.stage_cache import kickoff_cached
+
+    load_crew()
+    crew = new_crew(question)
+    *head_tasks, verify_task, explain_task = crew.tasks
+    head = Crew(agents=crew.agents, tasks=head_tasks, process=Process.sequential)
+
+    start = time.perf_counter()
+    stage_cache = get_stage_cache()
+    if stage_cache is not None:
+        solution = kickoff_cached(head, {"topic": question}, stage_cache, task_callback)
+    else:
+        if task_callback is not None:
+            head.task_callback = task_callback
+        solution = head.kickoff(inputs={"topic": question})
+    head_seconds = time.perf_counter() - start
+
+    def verify(context):
+        return verify_task.execute_sync(agent=verify_task.agent, context=context)
+
+    def explain(context):
+        # A discarded speculative run may still be going when the explainer runs
+        # again, so each run gets its own Task and Agent (the LLM is shared)
+        agent = explain_task.agent.copy()
+        task = explain_task.copy(agents=[agent], task_mapping={verify_task.key: verify_task})
+        return task.execute_sync(agent=agent, context=context)
+
+    verification, explanation, hit, timings = speculator.run(solution.raw, verify, explain)
+    timings["analyze_plan_execute"] = head_seconds
+    if task_callback is not None:
+        task_callback(verification)
+        task_callback(explanation)
+
+    logger.info(f"Speculative pipeline timings: {timings} (hit={hit})")
+    return SpeculativeAnswer(
+        raw=explanation.raw, verification=verification.raw, speculation_hit=hit, timings=timings,
+    )
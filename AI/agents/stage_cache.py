@@ -0,0 +1,268 @@
+import os
+import re
+import asyncio
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import STAGE_CACHE_LOOKUPS
+
+
+def _squash(text: str) -> str:
+    # Upstream outputs only differ in layout more often than you'd think; case
+    # is kept because it matters in math (A vs a, X vs x)
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def fingerprint(task) -> Dict[str, Any]:
+    """
+    What, besides its upstream context, determines a task's output.
+
+    Must be taken from the un-interpolated template (a fresh crew copy),
+    otherwise the prompt leaks into every stage's key.
+    """
+    agent = task.agent
+    llm = getattr(agent, "llm", None)
+    return {
+        "task": task.name,
+        "description": task.description,
+        "expected_output": task.expected_output,
+        "role": agent.role,
+        "goal": agent.goal,
+        "backstory": agent.backstory,
+        "model": getattr(llm, "model", None),
+        "tools": sorted(tool.name for tool in agent.tools or []),
+        # Compacted outputs (agents/compaction.py) change with the compaction policy
+        "compaction": getattr(getattr(task, "guardrail", None), "policy", None),
+    }
+
+
+def stage_key(task_fingerprint: Dict[str, Any], inputs: Dict[str, Any], context: List[str]) -> str:
+    """
+    Content address of one stage run.
+
+    Upstream context is the raw output of each context task. The request
+    inputs only take part for stages whose template interpolates them (in
+    MathCrew, analyze_problem through the agent's {topic} goal); that is what
+    lets a paraphrased question hit plan_solution once its analysis matches.
+    """
+    template = json.dumps(task_fingerprint, sort_keys=True, default=str)
+    used_inputs = {
+        name: _squash(value)
+        for name, value in sorted(inputs.items())
+        if "{" + name + "}" in template
+    }
+    payload = json.dumps(
+        {"fingerprint": task_fingerprint, "inputs": used_inputs, "context": [_squash(c) for c in context]},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    Disk-backed cache of individual crew task outputs.
+
+    Same storage model as the answer cache (SQLite, TTL, LRU eviction past
+    `max_entries`), but keyed per stage by stage_key, so runs for different
+    prompts share the stages whose inputs turn out identical.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initialize the stage cache.
+
+        Args:
+            path: SQLite file (env AI_STAGE_CACHE_PATH, default output/stage_cache.sqlite3)
+            max_entries: LRU size bound (env AI_STAGE_CACHE_MAX_ENTRIES, default 50000)
+            ttl: Seconds an output stays valid (env AI_STAGE_CACHE_TTL, default 7 days)
+        """
+        self.path = path or os.getenv("AI_STAGE_CACHE_PATH", "output/stage_cache.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("AI_STAGE_CACHE_MAX_ENTRIES", "50000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("AI_STAGE_CACHE_TTL", str(7 * 24 * 3600)))
+
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stages (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS stages_last_access ON stages(last_access)")
+
+    def get(self, stage: str, key: str) -> Optional[str]:
+        """Return the cached output for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM stages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM stages WHERE key = ?", (key,))
+                row = None
+            counts = self.misses if row is None else self.hits
+            counts[stage] = counts.get(stage, 0) + 1
+            if row is not None:
+                self._conn.execute("UPDATE stages SET last_access = ? WHERE key = ?", (now, key))
+        STAGE_CACHE_LOOKUPS.labels(stage, "miss" if row is None else "hit").inc()
+        return None if row is None else row[0]
+
+    def put(self, stage: str, key: str, output: str) -> None:
+        """Store a stage output and evict least recently used entries beyond max_entries"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (key, stage, output, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, output, now, now),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM stages WHERE key IN (
+                    SELECT key FROM stages ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def invalidate(self, stage: Optional[str] = None) -> int:
+        """
+        Remove one stage's outputs, or every entry when stage is None.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock, self._conn:
+            if stage is None:
+                cursor = self._conn.execute("DELETE FROM stages")
+            else:
+                cursor = self._conn.execute("DELETE FROM stages WHERE stage = ?", (stage,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, COUNT(*) FROM stages GROUP BY stage").fetchall()
+            hits, misses = dict(self.hits), dict(self.misses)
+        stages = {}
+        for stage in sorted(set(hits) | set(misses) | {row[0] for row in rows}):
+            lookups = hits.get(stage, 0) + misses.get(stage, 0)
+            stages[stage] = {
+                "entries": dict(rows).get(stage, 0),
+                "hits": hits.get(stage, 0),
+                "misses": misses.get(stage, 0),
+                "hit_rate": hits.get(stage, 0) / lookups if lookups else 0.0,
+            }
+        return {
+            "entries": sum(row[1] for row in rows),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stages": stages,
+        }
+
+
+def _stage_key(crew, index: int, task, inputs: Dict[str, Any], fingerprints: Dict[str, Any]) -> str:
+    if not isinstance(task.context, list):
+        # No explicit context means "every earlier task" in a crew; make that
+        # explicit, since each stage below may run in a crew of its own
+        task.context = crew.tasks[:index]
+    context = [upstream.output.raw for upstream in task.context if upstream.output is not None]
+    return stage_key(fingerprints[task.name], inputs, context)
+
+
+def _cached_output(task, raw: str, task_callback: Optional[Callable]):
+    from crewai.tasks.output_format import OutputFormat
+    from crewai.tasks.task_output import TaskOutput
+
+    output = TaskOutput(
+        description=task.description,
+        name=task.name,
+        expected_output=task.expected_output,
+        agent=task.agent.role,
+        raw=raw,
+        output_format=OutputFormat.RAW,
+    )
+    task.output = output
+    if task_callback is not None:
+        task_callback(output)
+    return output
+
+
+def _stage_crew(task, task_callback: Optional[Callable]):
+    from crewai import Crew, Process
+
+    stage = Crew(agents=[task.agent], tasks=[task], process=Process.sequential)
+    if task_callback is not None:
+        stage.task_callback = task_callback
+    return stage
+
+
+def kickoff_cached(crew, inputs: Dict[str, Any], cache: StageCache, task_callback: Optional[Callable] = None):
+    """
+    Run a crew's tasks in order, reusing cached stage outputs.
+
+    A stage whose key is cached is not executed: its stored output becomes
+    the task's output, so downstream context is built from it as usual. The
+    run therefore resumes after the deepest cached stage, and stages further
+    down can still hit again (e.g. execute_solution for a tool call already
+    run for another prompt). Missed stages run as one-task crews so input
+    interpolation, callbacks and crewai events work as in a normal kickoff.
+
+    Returns:
+        A CrewOutput over all task outputs, like Crew.kickoff
+    """
+    from crewai.crews.crew_output import CrewOutput
+
+    fingerprints = {task.name: fingerprint(task) for task in crew.tasks}
+    outputs = []
+    for index, task in enumerate(crew.tasks):
+        key = _stage_key(crew, index, task, inputs, fingerprints)
+        cached = cache.get(task.name, key)
+        if cached is not None:
+            output = _cached_output(task, cached, task_callback)
+        else:
+            output = _stage_crew(task, task_callback).kickoff(inputs=inputs).tasks_output[0]
+            cache.put(task.name, key, output.raw)
+        outputs.append(output)
+
+    return CrewOutput(raw=outputs[-1].raw, tasks_output=outputs)
+
+
+async def akickoff_cached(crew, inputs: Dict[str, Any], cache: StageCache, task_callback: Optional[Callable] = None):
+    """
+    kickoff_cached() on the event loop: missed stages run with Crew.akickoff,
+    and cache lookups and writes (SQLite) run on the default executor.
+    """
+    from crewai.crews.crew_output import CrewOutput
+
+    fingerprints = {task.name: fingerprint(task) for task in crew.tasks}
+    outputs = []
+    for index, task in enumerate(crew.tasks):
+        key = _stage_key(crew, index, task, inputs, fingerprints)
+        cached = await asyncio.to_thread(cache.get, task.name, key)
+        if cached is not None:
+            output = _cached_output(task, cached, task_callback)
+        else:
+            output = (await _stage_crew(task, task_callback).akickoff(inputs=inputs)).tasks_output[0]
+            await asyncio.to_thread(cache.put, task.name, key, output.raw)
+        outputs.append(output)
+
+    return CrewOutput(raw=outputs[-1].raw, tasks_output=outputs)
@@ -0,0 +1,251 @@
+"""
+Per-request LLM token and cost ledger.
+
+Every LLM call (crew agents through crewai's LLM events, MyAgent through
+its chat completions) is recorded with its prompt, completion and
+reasoning tokens and its list-price cost (config/llm_pricing.py),
+attributed to the request id, tenant, stage, agent role and model:
+
+- in the RequestUsage of the request being served, which rides along in a
+  context variable like the deadline does, so its totals can be returned
+  with the answer;
+- in a local SQLite ledger, aggregated by stage, agent, model or tenant
+  at GET /admin/usage to see which stage to optimize and what each tenant
+  spends.
+
+Calls made outside a tracked request (warmup, jobs) land in the ledger
+without a request id.
+
+Environment:
+    AI_USAGE_LEDGER: 1 (default) to keep the ledger, 0 for per-request totals only
+    AI_USAGE_PATH: SQLite file (default output/usage.sqlite3)
+    AI_USAGE_RETENTION: Seconds ledger rows are kept (default 90 days)
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import contextvars
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.llm_pricing import cost
+from startup import lazy
+
+LEDGER = os.getenv("AI_USAGE_LEDGER", "1") == "1"
+
+GROUPS = ("stage", "agent", "model", "tenant")
+
+
+@dataclass
+class LLMCall:
+    """Tokens and estimated cost of one LLM call"""
+    stage: str
+    agent: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reasoning_tokens: int = 0
+    cost: Optional[float] = None
+    request_id: Optional[str] = None
+    tenant: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+def _add(totals: Dict[str, Any], call: LLMCall) -> None:
+    totals["calls"] += 1
+    totals["prompt_tokens"] += call.prompt_tokens
+    totals["completion_tokens"] += call.completion_tokens
+    totals["reasoning_tokens"] += call.reasoning_tokens
+    totals["cost"] += call.cost or 0.0
+
+
+def _empty() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "reasoning_tokens": 0, "cost": 0.0}
+
+
+class RequestUsage:
+    """The LLM calls made while serving one request"""
+
+    def __init__(self, request_id: Optional[str] = None, tenant: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.tenant = tenant
+        self.calls: List[LLMCall] = []
+        self._lock = threading.Lock()
+
+    def add(self, call: LLMCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def totals(self) -> Dict[str, Any]:
+        """Token and cost totals, overall and by stage"""
+        with self._lock:
+            calls = list(self.calls)
+        totals, stages = _empty(), {}
+        for call in calls:
+            _add(totals, call)
+            _add(stages.setdefault(call.stage, _empty()), call)
+        return {"request_id": self.request_id, **totals, "stages": stages}
+
+
+_current: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar("usage", default=None)
+
+
+@contextmanager
+def tracking(request_id: Optional[str] = None, tenant: Optional[str] = None) -> Iterator[RequestUsage]:
+    """Attribute the LLM calls made in this context (and threads it hands work to) to one request"""
+    usage = RequestUsage(request_id, tenant)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[RequestUsage]:
+    """The RequestUsage of the request being served, if any"""
+    return _current.get()
+
+
+def record(agent: str, model: str, tokens: Dict[str, int], stage: Optional[str] = None) -> LLMCall:
+    """
+    Record one LLM call.
+
+    Args:
+        agent: Agent role (crew) or MyAgent role ("tool_selector", "explainer")
+        model: Model name as reported by the provider
+        tokens: prompt/completion/reasoning counts (see crew_metrics.token_counts)
+        stage: Crew task or pipeline stage (defaults to the agent role)
+    """
+    request = current()
+    call = LLMCall(
+        stage=stage or agent,
+        agent=agent,
+        model=model,
+        prompt_tokens=tokens.get("prompt", 0),
+        completion_tokens=tokens.get("completion", 0),
+        reasoning_tokens=tokens.get("reasoning", 0),
+        cost=cost(model, tokens.get("prompt", 0), tokens.get("completion", 0)),
+        request_id=request.request_id if request else None,
+        tenant=request.tenant if request else None,
+    )
+    if request is not None:
+        request.add(call)
+    ledger = get_ledger()
+    if ledger is not None:
+        ledger.record(call)
+    return call
+
+
+class UsageLedger:
+    """
+    Local store of every recorded LLM call.
+
+    Same storage model as the answer and stage caches (a SQLite file shared
+    by the workers on the host); rows older than `retention` seconds are
+    pruned as new ones come in.
+    """
+
+    # Prune at most this often (seconds)
+    PRUNE_INTERVAL = 3600
+
+    def __init__(self, path: Optional[str] = None, retention: Optional[float] = None):
+        """
+        Initialize the ledger.
+
+        Args:
+            path: SQLite file (env AI_USAGE_PATH, default output/usage.sqlite3)
+            retention: Seconds rows are kept (env AI_USAGE_RETENTION, default 90 days)
+        """
+        self.path = path or os.getenv("AI_USAGE_PATH", "output/usage.sqlite3")
+        self.retention = retention if retention is not None else float(
+            os.getenv("AI_USAGE_RETENTION", str(90 * 24 * 3600)))
+
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    request_id TEXT,
+                    tenant TEXT,
+                    stage TEXT NOT NULL,
+                    agent TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    reasoning_tokens INTEGER NOT NULL,
+                    cost REAL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_calls_request ON llm_calls(request_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_calls_created ON llm_calls(created_at)")
+
+    def record(self, call: LLMCall) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO llm_calls (request_id, tenant, stage, agent, model, prompt_tokens, "
+                "completion_tokens, reasoning_tokens, cost, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (call.request_id, call.tenant, call.stage, call.agent, call.model, call.prompt_tokens,
+                 call.completion_tokens, call.reasoning_tokens, call.cost, call.created_at),
+            )
+            if call.created_at - self._pruned_at > self.PRUNE_INTERVAL:
+                self._conn.execute("DELETE FROM llm_calls WHERE created_at < ?", (call.created_at - self.retention,))
+                self._pruned_at = call.created_at
+
+    def request(self, request_id: str) -> List[Dict[str, Any]]:
+        """Every recorded call of one request, in order"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM llm_calls WHERE request_id = ? ORDER BY created_at", (request_id,)
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self, group_by: str = "stage", since: Optional[float] = None,
+                tenant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totals grouped by stage, agent, model or tenant.
+
+        Args:
+            group_by: One of GROUPS
+            since: Only calls at or after this Unix time
+            tenant: Only this tenant's calls
+        """
+        if group_by not in GROUPS:
+            raise ValueError(f"Unknown usage grouping: {group_by} (expected one of {', '.join(GROUPS)})")
+        query = (
+            f"SELECT {group_by}, COUNT(*), COUNT(DISTINCT request_id), SUM(prompt_tokens), "
+            f"SUM(completion_tokens), SUM(reasoning_tokens), SUM(cost) FROM llm_calls "
+            "WHERE created_at >= ? AND (? IS NULL OR tenant = ?) "
+            f"GROUP BY {group_by} ORDER BY SUM(cost) DESC"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, (since or 0.0, tenant, tenant)).fetchall()
+        groups = {
+            str(key): {
+                "calls": calls,
+                "requests": requests,
+                "prompt_tokens": prompt or 0,
+                "completion_tokens": completion or 0,
+                "reasoning_tokens": reasoning or 0,
+                "cost": dollars or 0.0,
+            }
+            for key, calls, requests, prompt, completion, reasoning, dollars in rows
+        }
+        return {"group_by": group_by, "since": since, "tenant": tenant, "groups": groups}
+
+
+@lazy
+def get_ledger() -> Optional[UsageLedger]:
+    """The process-wide UsageLedger (None when AI_USAGE_LEDGER=0)"""
+    return UsageLedger() if LEDGER else None
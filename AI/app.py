@@ -1,9 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from config import llm_clients
+from metrics import mark_process_dead
 from view import router
+import os
 import uvicorn
+import warmup
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker before it accepts connections
+    warmup.start()
+    yield
+    await llm_clients.aclose()
+    mark_process_dead(os.getpid())
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = []
 
@@ -17,3 +33,15 @@ app.add_middleware(
 
 app.include_router(router)
 
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving HTTP"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once this worker finished warmup, 503 before"""
+    return JSONResponse(warmup.readiness.to_dict(), status_code=200 if warmup.readiness.ready else 503)
+
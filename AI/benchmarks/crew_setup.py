@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: per-request crew setup overhead.
+
+Compares building a fresh MathCrew (YAML parse, five agents, task graph) with
+copying the process-wide template, as crew_run does per request. No LLM is
+called; only construction is timed.
+
+    cd AI && python -m benchmarks.crew_setup [iterations]
+"""
+
+import sys
+import time
+import statistics
+
+from agents.multi_agents import MathCrew, crew_template, new_crew
+
+
+def measure(build, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        build()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    # One-time cost; includes the first LLMConfig and tool registry construction
+    start = time.perf_counter()
+    crew_template()
+    template_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        "fresh MathCrew().crew()": measure(lambda: MathCrew().crew(), iterations),
+        "template copy (new_crew)": measure(new_crew, iterations),
+    }
+
+    print(f"Template build (once per process): {template_ms:.1f} ms")
+    print(f"Per-request setup over {iterations} iterations:")
+    for name, samples in results.items():
+        print(
+            f"  {name:<28} mean {statistics.mean(samples):7.2f} ms"
+            f"   p50 {statistics.median(samples):7.2f} ms"
+            f"   max {max(samples):7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare the crew and lean pipelines on latency and accuracy.
+
+Each problem is answered by every pipeline through crew_run.execute, so the
+fast-path router, answer cache and coalescing are bypassed. An answer
+counts as correct when every expected fragment appears in it after
+normalization (case, whitespace, ** vs ^). Needs the LLM API keys of the
+pipelines being compared (GOOGLE_API_KEY for the crew, OPEN_ROUTER_API for
+lean), unless the LLM calls are replayed from a cassette recorded earlier
+(see config/llm_cassette.py):
+
+    cd AI && python -m benchmarks.pipelines [crew lean] [--repeat N]
+
+    # once, online
+    AI_LLM_CASSETTE_MODE=record python -m benchmarks.pipelines
+    # then offline, with the recorded provider latency or without any
+    AI_LLM_CASSETTE_MODE=replay AI_LLM_REPLAY_LATENCY=original python -m benchmarks.pipelines
+"""
+
+import re
+import sys
+import time
+import statistics
+
+from agents.crew_run import PIPELINES, execute
+from agents.results import extract_answer
+
+# (problem, fragments that must appear in a correct answer)
+PROBLEMS = [
+    ("Solve the equation x^2 - 5x + 6 = 0", ["2", "3"]),
+    ("Find the derivative of f(x) = x^3 + 2x", ["3x^2+2"]),
+    ("Integrate 2x with respect to x", ["x^2"]),
+    ("What is the determinant of the matrix [[1, 2], [3, 4]]?", ["-2"]),
+    ("Solve the system x + y = 3 and x - y = 1", ["x=2", "y=1"]),
+    ("What is the mean of 4, 8, 15, 16, 23, 42?", ["18"]),
+    ("A rectangle has a perimeter of 20 and a length of 6. What is its width?", ["4"]),
+    ("Simplify (x^2 - 1)/(x - 1)", ["x+1"]),
+    ("If I buy 3 apples at $1.25 each, how much do I pay?", ["3.75"]),
+    ("Find x if 2^x = 32", ["5"]),
+]
+
+
+def normalize(text: str) -> str:
+    text = text.lower().replace("**", "^").replace("\\cdot", "*")
+    text = re.sub(r"\s+", "", text)
+    # "3*x^2" and "3x^2" mean the same
+    return re.sub(r"(\d)\*([a-z(])", r"\1\2", text)
+
+
+def is_correct(answer: str, fragments) -> bool:
+    answer = normalize(answer)
+    return all(normalize(fragment) in answer for fragment in fragments)
+
+
+def run_pipeline(pipeline: str, repeat: int):
+    latencies, correct, failures = [], 0, 0
+    for problem, fragments in PROBLEMS:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                answer = extract_answer(execute(problem, pipeline)) or ""
+            except Exception as e:
+                failures += 1
+                print(f"  [{pipeline}] failed: {problem!r}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+            if is_correct(answer, fragments):
+                correct += 1
+            else:
+                print(f"  [{pipeline}] wrong: {problem!r} -> {answer[:120]!r}")
+    return latencies, correct, failures
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = 1
+    if "--repeat" in args:
+        index = args.index("--repeat")
+        repeat = int(args[index + 1])
+        del args[index:index + 2]
+    pipelines = args or list(PIPELINES)
+
+    total = len(PROBLEMS) * repeat
+    rows = []
+    for pipeline in pipelines:
+        print(f"Running {pipeline} on {total} problems...")
+        latencies, correct, failures = run_pipeline(pipeline, repeat)
+        rows.append((pipeline, latencies, correct, failures))
+
+    print(f"\n{'pipeline':<10} {'accuracy':>9} {'failed':>7} {'mean s':>8} {'p50 s':>8} {'max s':>8}")
+    for pipeline, latencies, correct, failures in rows:
+        mean = statistics.mean(latencies) if latencies else float("nan")
+        p50 = statistics.median(latencies) if latencies else float("nan")
+        worst = max(latencies) if latencies else float("nan")
+        print(f"{pipeline:<10} {correct / total:>9.0%} {failures:>7} {mean:>8.2f} {p50:>8.2f} {worst:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Content-addressed cache of LLM responses at the provider boundary.
+
+Requests are keyed on a canonical hash of what is sent (model, messages,
+sampling parameters, stop words, tools), so exact repeats, which are common
+for the low-temperature planning and tool-selection calls, are answered
+without a provider round trip. Only deterministic calls (temperature at or
+below AI_LLM_CACHE_MAX_TEMPERATURE, 0 by default) are eligible; sampled
+calls always go to the provider.
+
+Entries sit in an in-memory LRU in front of a SQLite store shared by every
+worker on the host. Crew LLMs built by LLMConfig are wrapped in CachedLLM,
+and MyAgent goes through cached_completion / acached_completion. Hit rates
+are kept per agent role.
+
+Environment:
+    AI_LLM_CACHE: 1 (default) to cache eligible calls, 0 to disable
+    AI_LLM_CACHE_PATH: SQLite file (default output/llm_cache.sqlite3)
+    AI_LLM_CACHE_MEMORY: Responses kept in memory (default 2048)
+    AI_LLM_CACHE_MAX_ENTRIES: Responses kept on disk (default 100000)
+    AI_LLM_CACHE_TTL: Seconds a response stays valid (default 7 days)
+    AI_LLM_CACHE_MAX_TEMPERATURE: Highest temperature that is cached (default 0)
+"""
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override, llm_call_context
+
+from config.llm_cassette import request_key, with_timeout, _chat_request, _llm_request
+from metrics import LLM_CACHE_LOOKUPS
+from startup import lazy
+
+ENABLED = os.getenv("AI_LLM_CACHE", "1") == "1"
+
+
+class ResponseCache:
+    """
+    In-memory LRU over a disk-backed store of LLM responses.
+
+    The disk store follows the answer and stage caches (SQLite, TTL, LRU
+    eviction past `max_entries`); the memory tier saves the SQLite round
+    trip for the hottest requests. Responses are stored as JSON (crewai
+    text responses or OpenAI ChatCompletion dicts).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            path: SQLite file (env AI_LLM_CACHE_PATH, default output/llm_cache.sqlite3)
+            memory_entries: In-memory LRU size (env AI_LLM_CACHE_MEMORY, default 2048)
+            max_entries: Disk LRU size bound (env AI_LLM_CACHE_MAX_ENTRIES, default 100000)
+            ttl: Seconds a response stays valid (env AI_LLM_CACHE_TTL, default 7 days)
+            max_temperature: Highest cached temperature (env AI_LLM_CACHE_MAX_TEMPERATURE, default 0)
+        """
+        self.path = path or os.getenv("AI_LLM_CACHE_PATH", "output/llm_cache.sqlite3")
+        self.memory_entries = memory_entries or int(os.getenv("AI_LLM_CACHE_MEMORY", "2048"))
+        self.max_entries = max_entries or int(os.getenv("AI_LLM_CACHE_MAX_ENTRIES", "100000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("AI_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_temperature = (max_temperature if max_temperature is not None
+                                else float(os.getenv("AI_LLM_CACHE_MAX_TEMPERATURE", "0")))
+
+        # Lookups by agent role: memory hits, disk hits, misses
+        self.lookups: Dict[str, Dict[str, int]] = {}
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+
+    def eligible(self, request: Dict[str, Any]) -> bool:
+        """Whether a request is deterministic enough to be answered from the cache"""
+        temperature = request.get("temperature")
+        return temperature is not None and temperature <= self.max_temperature and not request.get("stream")
+
+    def get(self, key: str, role: str) -> Optional[Any]:
+        """Return the cached response for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                return self._count(role, "memory_hit", entry[0])
+            self._memory.pop(key, None)
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is None:
+                    return self._count(role, "miss", None)
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            response = json.loads(row[0])
+            self._remember(key, response, row[1])
+            return self._count(role, "disk_hit", response)
+
+    def put(self, key: str, model: Optional[str], response: Any) -> None:
+        """Store a response and evict least recently used entries beyond the bounds"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, json.dumps(response, default=str), now, now),
+                )
+                self._conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+
+    def _remember(self, key: str, response: Any, created_at: float) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, role: str, result: str, response: Any) -> Any:
+        counts = self.lookups.setdefault(role, {"memory_hit": 0, "disk_hit": 0, "miss": 0})
+        counts[result] += 1
+        LLM_CACHE_LOOKUPS.labels(role, result).inc()
+        return response
+
+    def invalidate(self) -> int:
+        """Remove every cached response; returns how many were on disk"""
+        with self._lock, self._conn:
+            self._memory.clear()
+            return self._conn.execute("DELETE FROM responses").rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = {role: dict(counts) for role, counts in self.lookups.items()}
+            memory = len(self._memory)
+        roles = {}
+        for role, counts in sorted(lookups.items()):
+            total = sum(counts.values())
+            hits = counts["memory_hit"] + counts["disk_hit"]
+            roles[role] = {**counts, "hit_rate": hits / total if total else 0.0}
+        return {
+            "entries": entries,
+            "memory_entries": memory,
+            "max_entries": self.max_entries,
+            "max_temperature": self.max_temperature,
+            "ttl": self.ttl,
+            "roles": roles,
+        }
+
+
+@lazy
+def get_cache() -> Optional[ResponseCache]:
+    """The process-wide ResponseCache (None when AI_LLM_CACHE=0)"""
+    return ResponseCache() if ENABLED else None
+
+
+def _role(agent) -> str:
+    # YAML folded roles end with a newline ("Mathematical Problem Analyst\n")
+    return str(getattr(agent, "role", None) or "unknown").strip()
+
+
+# -- crewai LLMs (crew agents) -------------------------------------------------------------------------------
+
+class CachedLLM(BaseLLM):
+    """
+    crewai LLM answering eligible calls of `inner` from a ResponseCache.
+
+    Unlike the cassette wrapper it keeps the provider's native function
+    calling: only plain text responses are cached, tool call requests always
+    come from the provider. The agent's stop words are passed on to `inner`.
+    """
+
+    llm_type: str = "cached"
+    inner: Any = None
+    cache: Any = None
+    timeout: Optional[float] = None
+
+    def supports_function_calling(self) -> bool:
+        # Not part of BaseLLM; crewai checks for it with hasattr
+        supports = getattr(self.inner, "supports_function_calling", None)
+        return bool(supports and supports())
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def _key(self, messages, tools) -> Optional[str]:
+        request = _llm_request(self, messages)
+        if not self.cache.eligible(request):
+            return None
+        # The whole messages (tool calls and their ids included), not just role and content
+        request["messages"] = [{"role": "user", "content": messages}] if isinstance(messages, str) else messages
+        request["tools"] = tools
+        return request_key(request)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        key = self._key(messages, tools)
+        if key is not None and response_model is None:
+            cached = self.cache.get(key, _role(from_agent))
+            if cached is not None:
+                return self._hit(cached, messages, from_task, from_agent)
+        inner = with_timeout(self.inner, self.timeout)
+        with call_stop_override(inner, self.stop_sequences):
+            response = inner.call(messages, tools, callbacks, available_functions,
+                                  from_task, from_agent, response_model)
+        if key is not None and isinstance(response, str):
+            self.cache.put(key, self.model, response)
+        return response
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        key = self._key(messages, tools)
+        if key is not None and response_model is None:
+            # SQLite lookups go to a thread, off the event loop
+            cached = await asyncio.to_thread(self.cache.get, key, _role(from_agent))
+            if cached is not None:
+                return self._hit(cached, messages, from_task, from_agent)
+        inner = with_timeout(self.inner, self.timeout)
+        with call_stop_override(inner, self.stop_sequences):
+            response = await inner.acall(messages, tools, callbacks, available_functions,
+                                         from_task, from_agent, response_model)
+        if key is not None and isinstance(response, str):
+            await asyncio.to_thread(self.cache.put, key, self.model, response)
+        return response
+
+    def _hit(self, response, messages, from_task, from_agent):
+        from crewai.events.types.llm_events import LLMCallType
+
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            self._emit_call_completed_event(
+                response=response, call_type=LLMCallType.LLM_CALL,
+                from_task=from_task, from_agent=from_agent, messages=messages,
+            )
+        return response
+
+
+def wrap_llm(llm: BaseLLM) -> BaseLLM:
+    """llm behind the response cache (llm itself when caching is disabled)"""
+    cache = get_cache()
+    if cache is None:
+        return llm
+    return CachedLLM(model=llm.model, temperature=llm.temperature, max_tokens=llm.max_tokens,
+                     stop=llm.stop, inner=llm, cache=cache)
+
+
+# -- OpenAI clients (MyAgent) --------------------------------------------------------------------------------
+
+def _completion_key(kwargs: Dict[str, Any]) -> Optional[str]:
+    cache = get_cache()
+    request = _chat_request(kwargs)
+    if cache is None or not cache.eligible(request):
+        return None
+    return request_key(request)
+
+
+def cached_completion(client, role: str, **kwargs):
+    """client.chat.completions.create(**kwargs), answered from the cache when eligible"""
+    from openai.types.chat import ChatCompletion
+
+    key = _completion_key(kwargs)
+    if key is not None:
+        cached = get_cache().get(key, role)
+        if cached is not None:
+            # A cache hit spends no tokens
+            return ChatCompletion.model_validate({**cached, "usage": None})
+    response = client.chat.completions.create(**kwargs)
+    if key is not None:
+        get_cache().put(key, kwargs.get("model"), response.model_dump())
+    return response
+
+
+async def acached_completion(client, role: str, **kwargs):
+    """cached_completion() over an async client"""
+    from openai.types.chat import ChatCompletion
+
+    key = _completion_key(kwargs)
+    if key is not None:
+        cached = await asyncio.to_thread(get_cache().get, key, role)
+        if cached is not None:
+            return ChatCompletion.model_validate({**cached, "usage": None})
+    response = await client.chat.completions.create(**kwargs)
+    if key is not None:
+        await asyncio.to_thread(get_cache().put, key, kwargs.get("model"), response.model_dump())
+    return response
@@ -0,0 +1,373 @@
+"""
+Record/replay transport for LLM calls.
+
+In record mode every LLM request made through LLMConfig (crew agents) or
+MyAgent (lean pipeline) is sent as usual and written, with its response and
+latency, to a JSONL cassette. In replay mode nothing goes over the network:
+requests are matched on a hash of what was sent (model, messages, sampling
+parameters) and answered from the cassette, so whole MathCrew runs can be
+benchmarked and profiled offline and deterministically.
+
+Environment:
+    AI_LLM_CASSETTE_MODE: off (default), record or replay
+    AI_LLM_CASSETTE: Cassette file (default output/llm_cassette.jsonl)
+    AI_LLM_REPLAY_LATENCY: "original" to sleep for each call's recorded
+        latency, or a fixed number of seconds per call (default 0)
+"""
+
+import os
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import threading
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded response for a request"""
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Content address of one LLM request (key order and client timeouts don't matter)"""
+    payload = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    JSONL file of recorded LLM calls.
+
+    Each line holds the request key, the request itself (for inspection),
+    the response and its latency. A request recorded several times (the same
+    ReAct prompt retried, say) is replayed in recorded order, then the last
+    response repeats.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "0"):
+        """
+        Open a cassette.
+
+        Args:
+            path: JSONL file to append to (record) or read (replay)
+            mode: "record" or "replay"
+            latency: Replay delay, "original" or seconds per call
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                for line in filter(None, (line.strip() for line in f)):
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def record(self, request: Dict[str, Any], response: Any, latency: float) -> None:
+        entry = {"key": request_key(request), "request": request, "response": response, "latency": latency}
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def replay(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The next recorded entry for request.
+
+        Raises:
+            CassetteMiss: The request was never recorded
+        """
+        key = request_key(request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(
+                    f"No recorded response for {request.get('model')} request {key[:12]} in {self.path}"
+                )
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.replayed += 1
+            return entries[min(cursor, len(entries) - 1)]
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """Seconds replay should take for entry"""
+        if self.latency == "original":
+            return entry["latency"]
+        return float(self.latency or 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "requests": len(self._entries),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+
+
+def active() -> Optional[Cassette]:
+    """The process-wide cassette configured by AI_LLM_CASSETTE_MODE, or None when off"""
+    global _active
+    mode = os.getenv("AI_LLM_CASSETTE_MODE", "off").strip().lower()
+    if mode == "off":
+        return None
+    if mode not in MODES:
+        raise ValueError(f"Unknown AI_LLM_CASSETTE_MODE: {mode} (expected one of {', '.join(MODES)})")
+    with _active_lock:
+        if _active is None:
+            _active = Cassette(
+                os.getenv("AI_LLM_CASSETTE", "output/llm_cassette.jsonl"),
+                mode=mode,
+                latency=os.getenv("AI_LLM_REPLAY_LATENCY", "0"),
+            )
+        return _active
+
+
+def replaying() -> bool:
+    """Whether LLM calls are answered from a cassette instead of a provider"""
+    cassette = active()
+    return cassette is not None and cassette.mode == "replay"
+
+
+# -- crew agents ---------------------------------------------------------------------------------------------
+
+def _llm_request(llm: BaseLLM, messages) -> Dict[str, Any]:
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    return {
+        "model": llm.model,
+        "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+        "temperature": llm.temperature,
+        "max_tokens": llm.max_tokens,
+        "stop": list(llm.stop_sequences or []),
+    }
+
+
+def with_timeout(llm: BaseLLM, timeout: Optional[float]) -> BaseLLM:
+    """
+    llm, or a copy of it capped at timeout for one call.
+
+    Wrappers hold on to the shared provider LLM, so the deadline set on a
+    wrapper (see deadline.limit_llm_timeouts) is applied to a per-call copy
+    rather than to the provider every request uses.
+    """
+    if timeout is None or not hasattr(llm, "timeout") or llm.timeout == timeout:
+        return llm
+    capped = copy.copy(llm)
+    capped.timeout = timeout
+    return capped
+
+
+class CassetteLLM(BaseLLM):
+    """
+    crewai LLM that records the calls of `inner`, or replays them without it.
+
+    It does not declare native function calling, so agents use crewai's text
+    (ReAct) tool loop: every response is plain text that can be stored, and
+    tools still run for real during replay.
+    """
+
+    llm_type: str = "cassette"
+    inner: Any = None
+    cassette: Any = None
+    timeout: Optional[float] = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        request = _llm_request(self, messages)
+        if self.cassette.mode == "record":
+            inner = with_timeout(self.inner, self.timeout)
+            start = time.perf_counter()
+            response = inner.call(messages, tools, callbacks, available_functions,
+                                  from_task, from_agent, response_model)
+            self.cassette.record(request, response, time.perf_counter() - start)
+            return response
+
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            try:
+                entry = self.cassette.replay(request)
+            except CassetteMiss as e:
+                self._emit_call_failed_event(error=str(e), from_task=from_task, from_agent=from_agent)
+                raise
+            time.sleep(self.cassette.delay(entry))
+            return self._replayed(entry, messages, from_task, from_agent)
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        request = _llm_request(self, messages)
+        if self.cassette.mode == "record":
+            inner = with_timeout(self.inner, self.timeout)
+            start = time.perf_counter()
+            response = await inner.acall(messages, tools, callbacks, available_functions,
+                                         from_task, from_agent, response_model)
+            self.cassette.record(request, response, time.perf_counter() - start)
+            return response
+
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            try:
+                entry = self.cassette.replay(request)
+            except CassetteMiss as e:
+                self._emit_call_failed_event(error=str(e), from_task=from_task, from_agent=from_agent)
+                raise
+            await asyncio.sleep(self.cassette.delay(entry))
+            return self._replayed(entry, messages, from_task, from_agent)
+
+    def _replayed(self, entry, messages, from_task, from_agent):
+        from crewai.events.types.llm_events import LLMCallType
+
+        response = entry["response"]
+        self._emit_call_completed_event(
+            response=response, call_type=LLMCallType.LLM_CALL,
+            from_task=from_task, from_agent=from_agent, messages=messages,
+        )
+        return response
+
+
+def wrap_llm(llm: BaseLLM, cassette: Cassette) -> BaseLLM:
+    """A CassetteLLM recording llm's calls"""
+    return CassetteLLM(model=llm.model, temperature=llm.temperature, max_tokens=llm.max_tokens,
+                       stop=llm.stop, inner=llm, cassette=cassette)
+
+
+def replay_llm(config: Dict[str, Any], cassette: Cassette) -> BaseLLM:
+    """A CassetteLLM answering for an LLM built from config, without building it"""
+    return CassetteLLM(model=config["model"], temperature=config.get("temperature"),
+                       max_tokens=config.get("max_tokens"), stop=config.get("stop") or [], cassette=cassette)
+
+
+# -- OpenAI clients (MyAgent) --------------------------------------------------------------------------------
+
+def _chat_request(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in kwargs.items() if name != "timeout"}
+
+
+class CassetteOpenAI:
+    """
+    Stand-in for OpenAI/AsyncOpenAI exposing chat.completions.create.
+
+    Records the wrapped client's completions (streams chunk by chunk, with
+    each chunk's offset) or replays them as ChatCompletion objects without
+    a client, so no API key is needed to replay.
+    """
+
+    def __init__(self, inner, cassette: Cassette, is_async: bool = False):
+        self.inner = inner
+        self.cassette = cassette
+        self.is_async = is_async
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate if is_async else self._create))
+
+    def _create(self, **kwargs):
+        request = _chat_request(kwargs)
+        if self.cassette.mode == "record":
+            start = time.perf_counter()
+            response = self.inner.chat.completions.create(**kwargs)
+            if kwargs.get("stream"):
+                return self._record_stream(request, response, start)
+            self.cassette.record(request, response.model_dump(), time.perf_counter() - start)
+            return response
+
+        entry = self.cassette.replay(request)
+        if kwargs.get("stream"):
+            return self._replay_stream(entry)
+        time.sleep(self.cassette.delay(entry))
+        return self._completion(entry["response"])
+
+    async def _acreate(self, **kwargs):
+        request = _chat_request(kwargs)
+        if self.cassette.mode == "record":
+            start = time.perf_counter()
+            response = await self.inner.chat.completions.create(**kwargs)
+            if kwargs.get("stream"):
+                return self._arecord_stream(request, response, start)
+            self.cassette.record(request, response.model_dump(), time.perf_counter() - start)
+            return response
+
+        entry = self.cassette.replay(request)
+        if kwargs.get("stream"):
+            return self._areplay_stream(entry)
+        await asyncio.sleep(self.cassette.delay(entry))
+        return self._completion(entry["response"])
+
+    def _record_stream(self, request, chunks, start):
+        recorded = []
+        for chunk in chunks:
+            recorded.append({"offset": time.perf_counter() - start, "chunk": chunk.model_dump()})
+            yield chunk
+        self.cassette.record(request, recorded, time.perf_counter() - start)
+
+    def _replay_stream(self, entry):
+        from openai.types.chat import ChatCompletionChunk
+
+        start = time.perf_counter()
+        original = self.cassette.latency == "original"
+        if not original:
+            time.sleep(self.cassette.delay(entry))
+        for item in entry["response"]:
+            if original:
+                time.sleep(max(0.0, item["offset"] - (time.perf_counter() - start)))
+            yield ChatCompletionChunk.model_validate(item["chunk"])
+
+    async def _arecord_stream(self, request, chunks, start):
+        recorded = []
+        async for chunk in chunks:
+            recorded.append({"offset": time.perf_counter() - start, "chunk": chunk.model_dump()})
+            yield chunk
+        self.cassette.record(request, recorded, time.perf_counter() - start)
+
+    async def _areplay_stream(self, entry):
+        from openai.types.chat import ChatCompletionChunk
+
+        start = time.perf_counter()
+        original = self.cassette.latency == "original"
+        if not original:
+            await asyncio.sleep(self.cassette.delay(entry))
+        for item in entry["response"]:
+            if original:
+                await asyncio.sleep(max(0.0, item["offset"] - (time.perf_counter() - start)))
+            yield ChatCompletionChunk.model_validate(item["chunk"])
+
+    @staticmethod
+    def _completion(response):
+        from openai.types.chat import ChatCompletion
+        return ChatCompletion.model_validate(response)
+
+
+def openai_client(factory, is_async: bool = False, **kwargs):
+    """
+    factory(**kwargs), wrapped for the active cassette.
+
+    Replay doesn't construct the real client at all, so it works without
+    API keys or network.
+    """
+    cassette = active()
+    if cassette is None:
+        return factory(**kwargs)
+    inner = factory(**kwargs) if cassette.mode == "record" else None
+    return CassetteOpenAI(inner, cassette, is_async=is_async)
@@ -0,0 +1,227 @@
+"""
+Process-wide LLM client pool and cached provider health probes.
+
+OpenAI-compatible clients are shared per (client class, base_url, api_key)
+and all sit on one keep-alive httpx connection pool, so LLM calls reuse warm
+TLS connections instead of each MyAgent (and each mode switch) opening its
+own. HTTP/2 is used when the optional `h2` package is installed.
+
+Sync clients share one pool for the process. Async connections belong to
+the event loop that opened them, so async clients get one pool per running
+loop (uvicorn's, plus any asyncio.run() in jobs or scripts); close a loop's
+pool with `await aclose()` before the loop ends.
+
+Environment:
+    AI_LLM_MAX_CONNECTIONS: Connections per pool (default 100)
+    AI_LLM_KEEPALIVE_CONNECTIONS: Idle connections kept open (default 20)
+    AI_LLM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 120)
+    AI_HEALTH_TTL: Seconds a provider health probe result is trusted (default 30)
+"""
+
+import os
+import time
+import asyncio
+import weakref
+import threading
+
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+MAX_CONNECTIONS = int(os.getenv("AI_LLM_MAX_CONNECTIONS", "100"))
+KEEPALIVE_CONNECTIONS = int(os.getenv("AI_LLM_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("AI_LLM_KEEPALIVE_EXPIRY", "120"))
+HEALTH_TTL = float(os.getenv("AI_HEALTH_TTL", "30"))
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_clients: Dict[Tuple[Any, Optional[str], Optional[str]], Any] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _new_http_client(cls):
+    # Per-call timeouts are passed by the callers (request deadlines)
+    return cls(limits=_limits(), http2=HTTP2, timeout=httpx.Timeout(600.0, connect=10.0))
+
+
+def http_client(is_async: bool = False):
+    """
+    The shared keep-alive httpx client; with is_async, the AsyncClient of the
+    running event loop (RuntimeError outside one).
+    """
+    global _http_client
+    if is_async:
+        loop = asyncio.get_running_loop()
+        with _lock:
+            client = _async_http_clients.get(loop)
+            if client is None:
+                client = _async_http_clients[loop] = _new_http_client(httpx.AsyncClient)
+            return client
+    with _lock:
+        if _http_client is None:
+            _http_client = _new_http_client(httpx.Client)
+        return _http_client
+
+
+class LoopClients:
+    """
+    An async client (AsyncOpenAI) that is really one client per event loop.
+
+    Attribute access (client.chat.completions.create) goes to the running
+    loop's client, built on first use on that loop with its httpx pool.
+    """
+
+    def __init__(self, build: Callable[[], Any]):
+        self._build = build
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def current(self) -> Any:
+        loop = asyncio.get_running_loop()
+        with _lock:
+            client = self._clients.get(loop)
+        if client is not None:
+            return client
+        client = self._build()
+        with _lock:
+            return self._clients.setdefault(loop, client)
+
+    def discard(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._clients.pop(loop, None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.current(), name)
+
+
+def pooled(factory: Callable[..., Any], is_async: bool = False) -> Callable[..., Any]:
+    """
+    A drop-in for factory (OpenAI, AsyncOpenAI) returning one shared client per
+    base_url and api_key, built on the shared httpx pool (a LoopClients when
+    is_async).
+    """
+    def get(base_url: Optional[str] = None, api_key: Optional[str] = None, **kwargs):
+        key = (factory, base_url, api_key)
+        with _lock:
+            client = _clients.get(key)
+        if client is not None:
+            return client
+        if is_async:
+            client = LoopClients(lambda: factory(base_url=base_url, api_key=api_key,
+                                                 http_client=http_client(is_async=True), **kwargs))
+        else:
+            client = factory(base_url=base_url, api_key=api_key, http_client=http_client(), **kwargs)
+        with _lock:
+            return _clients.setdefault(key, client)
+    return get
+
+
+async def aclose() -> None:
+    """Close the running event loop's async connection pool (app shutdown)"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_http_clients.pop(loop, None)
+        for pooled_client in _clients.values():
+            if isinstance(pooled_client, LoopClients):
+                pooled_client.discard(loop)
+    if client is not None:
+        await client.aclose()
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        clients = [
+            {"client": factory.__name__, "base_url": base_url}
+            for factory, base_url, _ in _clients
+        ]
+    return {
+        "http2": HTTP2,
+        "max_connections": MAX_CONNECTIONS,
+        "keepalive_connections": KEEPALIVE_CONNECTIONS,
+        "async_pools": len(_async_http_clients),
+        "clients": clients,
+        "health": {url: probe.stats() for url, probe in list(_probes.items())},
+    }
+
+
+class HealthProbe:
+    """
+    Cached reachability check of a provider endpoint (e.g. a local Ollama).
+
+    The first check blocks; after that the last result is returned right
+    away and, once it is older than `ttl`, refreshed in a background thread,
+    so callers never wait on the network for a known endpoint.
+    """
+
+    def __init__(self, url: str, ttl: float = HEALTH_TTL, timeout: float = 2.0,
+                 probe: Optional[Callable[[str, float], bool]] = None):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self._probe = probe or _http_ok
+        self._lock = threading.Lock()
+        self._healthy: Optional[bool] = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self.probes = 0
+
+    def healthy(self) -> bool:
+        with self._lock:
+            known = self._healthy
+            stale = time.monotonic() - self._checked_at > self.ttl
+            refresh = known is not None and stale and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if known is None:
+            return self.refresh()
+        if refresh:
+            threading.Thread(target=self.refresh, name="health-probe", daemon=True).start()
+        return known
+
+    def refresh(self) -> bool:
+        """Probe now and cache the result"""
+        try:
+            ok = self._probe(self.url, self.timeout)
+        except Exception:
+            ok = False
+        with self._lock:
+            self._healthy = ok
+            self._checked_at = time.monotonic()
+            self._refreshing = False
+            self.probes += 1
+        return ok
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            age = time.monotonic() - self._checked_at if self._healthy is not None else None
+            return {"healthy": self._healthy, "age": age, "probes": self.probes}
+
+
+def _http_ok(url: str, timeout: float) -> bool:
+    # Any HTTP response means the server is up; connection errors raise
+    http_client().get(url, timeout=timeout)
+    return True
+
+
+_probes: Dict[str, HealthProbe] = {}
+
+
+def health_probe(url: str) -> HealthProbe:
+    """The process-wide HealthProbe for url"""
+    with _lock:
+        probe = _probes.get(url)
+        if probe is None:
+            probe = _probes[url] = HealthProbe(url)
+        return probe
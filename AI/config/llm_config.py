@@ -4,11 +4,15 @@ Handles switching between API and local LLM modes
 """
 
 import os
+import json
+import threading
 from enum import Enum
 from typing import Optional, Dict, Any
 from crewai import LLM
 from dotenv import load_dotenv
 
+from config import llm_cache, llm_cassette, llm_clients
+
 load_dotenv()
 
 
@@ -19,6 +23,7 @@ class LLMMode(Enum):
     GOOGLE = "google"
     ANTHROPIC = "anthropic"
     OLLAMA = "ollama"
+    MOCK = "mock"
 
 
 class LLMConfig:
@@ -30,6 +35,7 @@ class LLMConfig:
     - OPENAI: Requires OPENAI_API_KEY
     - GOOGLE: Requires GOOGLE_API_KEY
     - ANTHROPIC: Requires ANTHROPIC_API_KEY
+    - MOCK: Canned answers after a sampled latency, for load tests (see mock_llm)
     """
     
     # Default configurations for each mode
@@ -56,14 +62,23 @@ class LLMConfig:
             "base_url": "http://localhost:11434",
             "temperature": 0.7,
         },
+        LLMMode.MOCK: {
+            "model": "mock/math-crew",
+            "temperature": 0.0,
+        },
     }
 
+    # Built LLMs by mode and config, shared by every LLMConfig: switching back to a
+    # mode reuses its client and warm connections instead of building a new one
+    _llms: Dict[Any, Any] = {}
+    _llms_lock = threading.Lock()
+
     def __init__(self, mode: LLMMode = LLMMode.LOCAL, **kwargs):
         """
         Initialize LLM Configuration.
         
         Args:
-            mode: The LLM mode to use (LOCAL, OPENAI, GOOGLE, ANTHROPIC, OLLAMA)
+            mode: The LLM mode to use (LOCAL, OPENAI, GOOGLE, ANTHROPIC, OLLAMA, MOCK)
             **kwargs: Additional configuration parameters to override defaults
         """
         self.mode = mode
@@ -72,18 +87,44 @@ class LLMConfig:
         self._initialize_llm()
 
     def _initialize_llm(self) -> None:
-        """Initialize the LLM based on current mode"""
+        """Initialize the LLM based on current mode (wrapped for record/replay, see llm_cassette)"""
+        cassette = llm_cassette.active()
+        replaying = cassette is not None and cassette.mode == "replay"
         config = self._get_config()
         print(f"Initializing LLM in {self.mode.value} mode...")
         print(f"Model: {config.get('model')}")
         
         try:
-            self.llm = LLM(**config)
+            key = (self.mode, cassette and (cassette.mode, cassette.path),
+                   json.dumps(config, sort_keys=True, default=str))
+            with LLMConfig._llms_lock:
+                llm = LLMConfig._llms.get(key)
+            if llm is not None:
+                self.llm = llm
+            elif replaying:
+                self.llm = llm_cassette.replay_llm(config, cassette)
+            elif cassette is not None:
+                self.llm = llm_cassette.wrap_llm(self._build_llm(config), cassette)
+            elif self.mode == LLMMode.MOCK:
+                self.llm = self._build_llm(config)
+            else:
+                # Deterministic calls are answered from the response cache (see llm_cache)
+                self.llm = llm_cache.wrap_llm(self._build_llm(config))
+            with LLMConfig._llms_lock:
+                self.llm = LLMConfig._llms.setdefault(key, self.llm)
+            if cassette is not None:
+                print(f"LLM calls are {cassette.mode}ed through {cassette.path}")
             print(f"✓ LLM initialized successfully in {self.mode.value} mode")
         except Exception as e:
             print(f"✗ Failed to initialize LLM: {str(e)}")
             raise
 
+    def _build_llm(self, config: Dict[str, Any]) -> LLM:
+        if self.mode == LLMMode.MOCK:
+            from config import mock_llm
+            return mock_llm.build_llm(config)
+        return LLM(**config)
+
     def _get_config(self) -> Dict[str, Any]:
         """
         Get the configuration for the current mode.
@@ -91,8 +132,10 @@ class LLMConfig:
         """
         base_config = self.CONFIGS[self.mode].copy()
         
-        # Check for required API keys
-        if self.mode == LLMMode.OPENAI:
+        # Check for required API keys (replays need neither keys nor a running Ollama)
+        if llm_cassette.replaying():
+            pass
+        elif self.mode == LLMMode.OPENAI:
             if not os.getenv("OPENAI_API_KEY"):
                 raise ValueError("OPENAI_API_KEY not found in environment variables")
         
@@ -105,11 +148,8 @@ class LLMConfig:
                 raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
         
         elif self.mode == LLMMode.LOCAL or self.mode == LLMMode.OLLAMA:
-            # Check if Ollama is running
-            try:
-                import requests
-                requests.get(base_config["base_url"], timeout=2)
-            except Exception:
+            # Check if Ollama is running (cached, refreshed in the background; see llm_clients)
+            if not llm_clients.health_probe(base_config["base_url"]).healthy():
                 raise ValueError(
                     f"Cannot connect to Ollama at {base_config['base_url']}. "
                     "Make sure Ollama is running locally."
@@ -145,9 +185,30 @@ class LLMConfig:
             LLMMode.GOOGLE: "Google Gemini (requires GOOGLE_API_KEY)",
             LLMMode.ANTHROPIC: "Anthropic Claude (requires ANTHROPIC_API_KEY)",
             LLMMode.OLLAMA: "Ollama with custom model",
+            LLMMode.MOCK: "Mock provider for load tests (canned answers, sampled latency)",
         }
         return {mode.value: descriptions[mode] for mode in LLMMode}
 
+    @staticmethod
+    def mode_for_model(model: str) -> LLMMode:
+        """
+        The mode serving a model name, e.g. from an `llm:` key in agents.yaml
+        ("gemini/gemini-2.5-flash" -> GOOGLE, "ollama/llama3.2" -> OLLAMA).
+        """
+        prefixes = {
+            "gemini/": LLMMode.GOOGLE,
+            "ollama/": LLMMode.OLLAMA,
+            "mock/": LLMMode.MOCK,
+            "anthropic/": LLMMode.ANTHROPIC,
+            "claude": LLMMode.ANTHROPIC,
+            "openai/": LLMMode.OPENAI,
+            "gpt-": LLMMode.OPENAI,
+        }
+        for prefix, mode in prefixes.items():
+            if model.startswith(prefix):
+                return mode
+        raise ValueError(f"Cannot tell which LLM mode serves model {model!r}")
+
     @staticmethod
     def get_mode_from_env() -> LLMMode:
         """
@@ -201,6 +262,21 @@ def get_anthropic_llm(**kwargs) -> LLM:
     return config.get_llm()
 
 
+def openai_client(factory, is_async: bool = False, **kwargs):
+    """
+    An OpenAI-compatible client for MyAgent built by factory(**kwargs).
+    
+    Under LLM_MODE=mock it answers from the mock provider instead (or points
+    at AI_MOCK_LLM_URL); otherwise it is recorded/replayed when an LLM
+    cassette is active.
+    """
+    if os.getenv("LLM_MODE", "").lower() == LLMMode.MOCK.value:
+        from config import mock_llm
+        return mock_llm.openai_client(factory, is_async=is_async)
+    # One shared client per endpoint on a keep-alive connection pool
+    return llm_cassette.openai_client(llm_clients.pooled(factory, is_async), is_async=is_async, **kwargs)
+
+
 def get_llm_from_env(**kwargs) -> LLM:
     """
     Get LLM instance based on environment variables.
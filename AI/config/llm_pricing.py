@@ -0,0 +1,68 @@
+"""
+List prices of the models the service can use, for cost reporting.
+
+Prices are USD per million prompt and completion tokens. Models are matched
+exactly, then by their longest listed prefix (so every "ollama/..." model
+is free); unknown models have no cost rather than a wrong one.
+
+Environment:
+    AI_MODEL_PRICES: Extra or corrected prices,
+        e.g. "gemini/gemini-2.5-flash=0.30/2.50,openai/gpt-4o-mini=0.15/0.60"
+"""
+
+import os
+
+from typing import Dict, Optional, Tuple
+
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini/gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini/gemini-2.5-flash": (0.30, 2.50),
+    "gemini/gemini-2.5-pro": (1.25, 10.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "deepseek/deepseek-v3.2": (0.28, 0.42),
+    "ollama/": (0.0, 0.0),
+    "mock/": (0.0, 0.0),
+}
+
+
+def _parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, price = item.partition("=")
+        prompt, _, completion = price.partition("/")
+        prices[model.strip()] = (float(prompt), float(completion or prompt))
+    return prices
+
+
+PRICES = {**DEFAULT_PRICES, **_parse_prices(os.getenv("AI_MODEL_PRICES", ""))}
+
+
+def price(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(prompt, completion) USD per million tokens for model, if known"""
+    if not model:
+        return None
+    if model in PRICES:
+        return PRICES[model]
+    # Providers report models with or without their "gemini/" or "openai/" prefix,
+    # and dated snapshots are priced as their family
+    name = _bare(model)
+    prefixes = [
+        prefix for prefix in PRICES
+        if model.startswith(prefix) or (not prefix.endswith("/") and name.startswith(_bare(prefix)))
+    ]
+    return PRICES[max(prefixes, key=lambda prefix: len(_bare(prefix)))] if prefixes else None
+
+
+def _bare(model: str) -> str:
+    return model.split("/", 1)[1] if "/" in model else model
+
+
+def cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD cost of one call, None for unpriced models"""
+    prices = price(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
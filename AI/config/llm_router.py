@@ -0,0 +1,375 @@
+"""
+Hedged, latency-aware routing of crew LLM calls across providers.
+
+The crew normally talks to one model, so a provider brownout goes straight
+into our tail latency. With AI_LLM_PROVIDERS listing two or more LLMConfig
+modes, every crew LLM call goes through a RoutedLLM instead:
+
+- each provider keeps a rolling window of call latencies and outcomes;
+- the call goes to the first provider whose circuit breaker is closed;
+- when it has not answered within its own p95 latency, a duplicate (the
+  hedge) is sent to the next provider and the first answer wins; the
+  other attempt is cancelled;
+- an error fails over to the next provider right away, and a provider
+  with too many failures is skipped (breaker open) until a cooldown has
+  passed and a single trial call succeeds again.
+
+Environment:
+    AI_LLM_PROVIDERS: Providers in order of preference, as LLMConfig modes
+        with an optional model, e.g. "google=gemini/gemini-2.5-flash-lite,openai"
+    AI_LLM_HEDGE: 1 (default) to send hedged duplicates, 0 for failover only
+    AI_LLM_HEDGE_AFTER: Seconds to wait before hedging while a provider has
+        too few calls for a p95 (default 8)
+    AI_LLM_HEDGE_MIN_SAMPLES: Calls before a provider's p95 is trusted (default 20)
+    AI_LLM_ROUTER_WINDOW: Calls kept per provider for latency and error rates (default 200)
+    AI_CIRCUIT_FAILURES: Consecutive failures that open a breaker (default 5)
+    AI_CIRCUIT_ERROR_RATE: Windowed error rate that opens a breaker (default 0.5)
+    AI_CIRCUIT_COOLDOWN: Seconds a breaker stays open before a trial call (default 30)
+"""
+
+import os
+import copy
+import time
+import asyncio
+import threading
+import contextvars
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+
+from config.llm_cassette import with_timeout
+from metrics import LLM_PROVIDER_DURATION, LLM_ROUTING_EVENTS
+
+HEDGE = os.getenv("AI_LLM_HEDGE", "1") == "1"
+HEDGE_AFTER = float(os.getenv("AI_LLM_HEDGE_AFTER", "8"))
+HEDGE_MIN_SAMPLES = int(os.getenv("AI_LLM_HEDGE_MIN_SAMPLES", "20"))
+WINDOW = int(os.getenv("AI_LLM_ROUTER_WINDOW", "200"))
+CIRCUIT_FAILURES = int(os.getenv("AI_CIRCUIT_FAILURES", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("AI_CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_COOLDOWN = float(os.getenv("AI_CIRCUIT_COOLDOWN", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Attempts run here so the caller can wait on the first answer of several
+# (a thread per in-flight attempt; the async path runs on the event loop)
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AI_LLM_ROUTER_WORKERS", "64")),
+                           thread_name_prefix="llm-route")
+
+
+class Provider:
+    """
+    One routed LLM with its rolling latency/error window and circuit breaker.
+
+    The breaker opens after `failures` consecutive errors, or when the error
+    rate over the window reaches `error_rate` (once the window holds at
+    least HEDGE_MIN_SAMPLES calls). After `cooldown` seconds one trial call is
+    let through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, llm: BaseLLM, window: int = WINDOW, failures: int = CIRCUIT_FAILURES,
+                 error_rate: float = CIRCUIT_ERROR_RATE, cooldown: float = CIRCUIT_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.llm = llm
+        self.failures = failures
+        self.error_rate_limit = error_rate
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+
+    def available(self) -> bool:
+        """Whether a call may go to this provider now (claims the trial call of a half-open breaker)"""
+        with self._lock:
+            now = self._clock()
+            if self._state == OPEN and now - self._opened_at >= self.cooldown:
+                self._state, self._trial = HALF_OPEN, False
+            # A trial that never reported back (cancelled as a hedge loser) expires after another cooldown
+            if self._state == HALF_OPEN and (not self._trial or now - self._opened_at >= self.cooldown):
+                self._trial, self._opened_at = True, now
+                return True
+            return self._state == CLOSED
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+                self._consecutive_failures = 0
+                self._state = CLOSED
+                return
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failures or self._error_rate_exceeded():
+                if self._state != OPEN:
+                    LLM_ROUTING_EVENTS.labels(self.name, "circuit_open").inc()
+                self._state, self._opened_at = OPEN, self._clock()
+
+    def _error_rate_exceeded(self) -> bool:
+        outcomes = self._outcomes
+        return len(outcomes) >= HEDGE_MIN_SAMPLES and outcomes.count(False) / len(outcomes) >= self.error_rate_limit
+
+    def p95(self) -> Optional[float]:
+        """95th percentile latency of the successful calls in the window (None until there are enough)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            state = self._state
+        return {"model": self.llm.model, "state": state, "calls": calls,
+                "p95": self.p95(), "error_rate": self.error_rate()}
+
+
+class LLMRouter:
+    """
+    Sends each call to the preferred available provider, hedges it to the
+    next one when it runs past the primary's p95, and fails over on errors.
+    """
+
+    def __init__(self, providers: List[Provider], hedge: bool = HEDGE, hedge_after: float = HEDGE_AFTER):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+
+    def _next(self, remaining: List[Provider], first: bool) -> Optional[Provider]:
+        """Pop the next provider whose breaker lets a call through"""
+        while remaining:
+            provider = remaining.pop(0)
+            if provider.available():
+                return provider
+        # Every breaker is open: still try the preferred provider rather than fail outright
+        return self.providers[0] if first else None
+
+    def hedge_delay(self, provider: Provider) -> float:
+        p95 = provider.p95()
+        return self.hedge_after if p95 is None else p95
+
+    def _timeout(self, running: List[Provider], remaining: List[Provider], hedged: bool) -> Optional[float]:
+        """How long to wait for the running attempt before hedging (None: don't hedge)"""
+        if not self.hedge or hedged or len(running) != 1 or not remaining:
+            return None
+        return self.hedge_delay(running[0])
+
+    def _attempt(self, provider: Provider, invoke: Callable[[BaseLLM], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = invoke(provider.llm)
+        except Exception:
+            self._finished(provider, start, "error")
+            raise
+        self._finished(provider, start, "ok")
+        return result
+
+    async def _aattempt(self, provider: Provider, ainvoke: Callable[[BaseLLM], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await ainvoke(provider.llm)
+        except asyncio.CancelledError:
+            # The other attempt won; that says nothing about this provider's health
+            LLM_PROVIDER_DURATION.labels(provider.name, "cancelled").observe(time.perf_counter() - start)
+            raise
+        except Exception:
+            self._finished(provider, start, "error")
+            raise
+        self._finished(provider, start, "ok")
+        return result
+
+    @staticmethod
+    def _finished(provider: Provider, start: float, status: str) -> None:
+        latency = time.perf_counter() - start
+        provider.record(latency, status == "ok")
+        LLM_PROVIDER_DURATION.labels(provider.name, status).observe(latency)
+
+    def call(self, invoke: Callable[[BaseLLM], Any]) -> Any:
+        """invoke(llm) on the routed providers; returns the first answer"""
+        remaining = list(self.providers)
+        pending: Dict[Any, Provider] = {}
+        errors: List[Exception] = []
+        hedged = False
+
+        def launch(kind: Optional[str] = None) -> None:
+            provider = self._next(remaining, first=kind is None)
+            if provider is None:
+                return
+            if kind:
+                LLM_ROUTING_EVENTS.labels(provider.name, kind).inc()
+            # Each attempt runs in its own copy of the caller's context (crewai call scope, stop words)
+            context = contextvars.copy_context()
+            pending[_pool.submit(context.run, self._attempt, provider, invoke)] = provider
+
+        launch()
+        primary = next(iter(pending.values()))
+        while pending:
+            timeout = self._timeout(list(pending.values()), remaining, hedged)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                launch("hedge")
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                # A running thread can't be stopped; its late answer is dropped (and still timed)
+                for loser in pending:
+                    loser.cancel()
+                self._won(provider, primary, hedged)
+                return result
+            if not pending:
+                launch("failover")
+        raise errors[-1]
+
+    async def acall(self, ainvoke: Callable[[BaseLLM], Awaitable[Any]]) -> Any:
+        """Async call(): the losing attempt is cancelled outright"""
+        remaining = list(self.providers)
+        pending: Dict[asyncio.Task, Provider] = {}
+        errors: List[BaseException] = []
+        hedged = False
+
+        def launch(kind: Optional[str] = None) -> None:
+            provider = self._next(remaining, first=kind is None)
+            if provider is None:
+                return
+            if kind:
+                LLM_ROUTING_EVENTS.labels(provider.name, kind).inc()
+            pending[asyncio.ensure_future(self._aattempt(provider, ainvoke))] = provider
+
+        launch()
+        primary = next(iter(pending.values()))
+        try:
+            while pending:
+                timeout = self._timeout(list(pending.values()), remaining, hedged)
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch("hedge")
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    self._won(provider, primary, hedged)
+                    return task.result()
+                if not pending:
+                    launch("failover")
+            raise errors[-1]
+        finally:
+            # The loser, or everything when the caller itself was cancelled (deadline)
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _won(provider: Provider, primary: Provider, hedged: bool) -> None:
+        if hedged and provider is not primary:
+            LLM_ROUTING_EVENTS.labels(provider.name, "hedge_won").inc()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedge": self.hedge,
+            "hedge_after": self.hedge_after,
+            "providers": {p.name: p.stats() for p in self.providers},
+        }
+
+
+class RoutedLLM(BaseLLM):
+    """
+    crewai LLM answering through an LLMRouter.
+
+    Like the cassette wrapper it does not declare native function calling,
+    so agents use the text (ReAct) tool loop and any provider can take over
+    mid-task. The agent's stop words are passed on to whichever provider
+    answers.
+    """
+
+    llm_type: str = "routed"
+    router: Any = None
+    timeout: Optional[float] = None
+
+    def _invoker(self, messages, tools, callbacks, available_functions, from_task, from_agent, response_model,
+                 is_async: bool = False):
+        stop, timeout = self.stop_sequences, self.timeout
+
+        def invoke(llm: BaseLLM):
+            # Attempts may run side by side; each gets its own messages
+            llm = with_timeout(llm, timeout)
+            with call_stop_override(llm, stop):
+                return llm.call(copy.deepcopy(messages), tools, callbacks, available_functions,
+                                from_task, from_agent, response_model)
+
+        async def ainvoke(llm: BaseLLM):
+            llm = with_timeout(llm, timeout)
+            with call_stop_override(llm, stop):
+                return await llm.acall(copy.deepcopy(messages), tools, callbacks, available_functions,
+                                       from_task, from_agent, response_model)
+
+        return ainvoke if is_async else invoke
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        return self.router.call(self._invoker(messages, tools, callbacks, available_functions,
+                                              from_task, from_agent, response_model))
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        return await self.router.acall(self._invoker(messages, tools, callbacks, available_functions,
+                                                     from_task, from_agent, response_model, is_async=True))
+
+
+def parse_providers(spec: str) -> List[Tuple[str, Optional[str]]]:
+    """"google=gemini/gemini-2.5-flash-lite,openai" -> [("google", "gemini/..."), ("openai", None)]"""
+    providers = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        mode, _, model = item.partition("=")
+        providers.append((mode.strip().lower(), model.strip() or None))
+    return providers
+
+
+def routed_llm(router: LLMRouter) -> RoutedLLM:
+    """A RoutedLLM over router, named after its primary provider's model"""
+    primary = router.providers[0].llm
+    return RoutedLLM(model=primary.model, temperature=primary.temperature, router=router)
+
+
+def router_from_env() -> Optional[LLMRouter]:
+    """
+    LLMRouter over the AI_LLM_PROVIDERS that can be configured here (keys
+    present, Ollama reachable), or None when fewer than two are.
+    """
+    from config.llm_config import LLMConfig, LLMMode
+
+    providers = []
+    for mode, model in parse_providers(os.getenv("AI_LLM_PROVIDERS", "")):
+        try:
+            config = LLMConfig(LLMMode(mode), **({"model": model} if model else {}))
+        except ValueError as e:
+            print(f"Skipping LLM provider {mode}: {e}")
+            continue
+        providers.append(Provider(mode, config.get_llm()))
+    return LLMRouter(providers) if len(providers) > 1 else None
@@ -0,0 +1,397 @@
+"""
+Mock LLM provider for load and capacity testing.
+
+Answers every crew role and the lean agent with canned, schema-valid output
+(analysis text, a planner plan that compiles, a ReAct tool call, a verdict,
+an explanation) after a latency sampled from a configurable distribution.
+It runs in process (MockLLM, MockOpenAI) or as a localhost OpenAI-compatible
+server, so our own overhead and queueing can be measured without a provider:
+
+    LLM_MODE=mock python serve.py
+    # or over HTTP, to include client and connection overhead
+    python -m config.mock_llm --port 8199 &
+    LLM_MODE=mock AI_MOCK_LLM_URL=http://127.0.0.1:8199/v1 python serve.py
+
+Environment:
+    AI_MOCK_LATENCY: Latency of every call, e.g. "lognormal:median=1.2,sigma=0.6",
+        "uniform:0.5,2", "exponential:mean=1", "fixed:0.8" or "0" (default)
+    AI_MOCK_LATENCY_<STAGE>: Override for one stage (ANALYZE, PLAN, EXECUTE,
+        VERIFY, EXPLAIN, TOOL_SELECTOR, EXPLAINER)
+    AI_MOCK_SEED: Seed the latency sampler for reproducible runs
+    AI_MOCK_LLM_URL: Use the HTTP stub at this base URL instead of the in-process one
+
+Every prompt gets the same answers, so turn off AI_ANSWER_CACHE and
+AI_STAGE_CACHE unless caching is what is being measured.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import threading
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+
+MOCK_MODEL = "mock/math-crew"
+
+# Task names and the crewai agent roles that run them
+TASK_STAGES = {
+    "analyze_problem": "analyze",
+    "plan_solution": "plan",
+    "execute_solution": "execute",
+    "verify_solution": "verify",
+    "explain_solution": "explain",
+}
+ROLE_STAGES = {
+    "Problem Analyst": "analyze",
+    "Solution Planner": "plan",
+    "Solution Executor": "execute",
+    "Solution Verifier": "verify",
+    "Explanation Specialist": "explain",
+}
+
+CANNED = {
+    "analyze": (
+        "Problem type: Arithmetic\n"
+        "Given: the expression 2 + 3\n"
+        "Variables to solve for: none\n"
+        "Constraints: none"
+    ),
+    "plan": "Tool: calculator\nAction: none\nExpression: 2 + 3",
+    "verify": "2 + 3 evaluates to 5, so the result is correct.\nVerdict: CONFIRMED",
+    "explain": "Add the two numbers: 2 + 3 = 5.\n\n**5**",
+    "tool_selector": json.dumps({"tool": "calculator", "action": None, "args": {"expression": "2 + 3"}}),
+    "explainer": "Adding 2 and 3 gives 5.\n\n**5**",
+}
+
+
+class LatencyModel:
+    """Samples call latency (seconds) from a distribution given as "name:params" """
+
+    def __init__(self, spec: str = "0", rng: Optional[random.Random] = None):
+        self.spec = spec or "0"
+        self.rng = rng or random.Random()
+        name, _, params = self.spec.partition(":")
+        self.name = name.strip().lower()
+        values = [p.strip() for p in params.split(",") if p.strip()]
+        self.args = [float(v) for v in values if "=" not in v]
+        self.kwargs = {k.strip(): float(v) for k, _, v in (p.partition("=") for p in values if "=" in p)}
+
+        if self.name not in ("0", "none", "fixed", "uniform", "lognormal", "exponential"):
+            try:
+                # A bare number is a fixed latency
+                self.args, self.name = [float(self.name)], "fixed"
+            except ValueError:
+                raise ValueError(f"Unknown latency distribution: {self.spec}")
+
+    def sample(self) -> float:
+        if self.name in ("0", "none"):
+            return 0.0
+        if self.name == "fixed":
+            return self.args[0] if self.args else self.kwargs.get("seconds", 0.0)
+        if self.name == "uniform":
+            low, high = self.args if len(self.args) == 2 else (self.kwargs["low"], self.kwargs["high"])
+            return self.rng.uniform(low, high)
+        if self.name == "exponential":
+            mean = self.args[0] if self.args else self.kwargs["mean"]
+            return self.rng.expovariate(1 / mean)
+        # lognormal: production latencies are usually summarized by their median
+        mu = math.log(self.kwargs["median"]) if "median" in self.kwargs else self.kwargs.get("mu", 0.0)
+        return self.rng.lognormvariate(mu, self.kwargs.get("sigma", 0.5))
+
+
+class MockProvider:
+    """Canned answers and sampled latencies for every stage; shared by the in-process and HTTP stubs"""
+
+    def __init__(self, latency: Optional[str] = None, seed: Optional[int] = None,
+                 overrides: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            latency: Default latency spec (env AI_MOCK_LATENCY)
+            seed: Sampler seed (env AI_MOCK_SEED)
+            overrides: Per-stage latency specs (env AI_MOCK_LATENCY_<STAGE>)
+        """
+        if seed is None and os.getenv("AI_MOCK_SEED"):
+            seed = int(os.getenv("AI_MOCK_SEED"))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.latency = LatencyModel(latency if latency is not None else os.getenv("AI_MOCK_LATENCY", "0"), self._rng)
+        if overrides is None:
+            overrides = {
+                stage: os.environ[f"AI_MOCK_LATENCY_{stage.upper()}"]
+                for stage in list(CANNED) + ["execute"]
+                if f"AI_MOCK_LATENCY_{stage.upper()}" in os.environ
+            }
+        self.overrides = {stage: LatencyModel(spec, self._rng) for stage, spec in overrides.items()}
+        self.calls: Dict[str, int] = {}
+
+    def delay(self, stage: str) -> float:
+        with self._lock:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            return self.overrides.get(stage, self.latency).sample()
+
+    def respond(self, messages: List[Dict[str, Any]], task_name: Optional[str] = None, native: bool = False) -> tuple:
+        """
+        (stage, text) answering messages.
+
+        Crew stages answer in crewai's ReAct text format unless the request
+        uses native tool calling, where the final answer is the bare content.
+        """
+        stage = stage_of(messages, task_name)
+        text = _execute(messages) if stage == "execute" else CANNED[stage]
+        if stage in TASK_STAGES.values() and not native and not text.startswith("Thought:"):
+            text = f"Thought: I now know the final answer\nFinal Answer: {text}"
+        return stage, text
+
+
+def _text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(m.get("content") or "") for m in messages)
+
+
+def stage_of(messages, task_name: Optional[str] = None) -> str:
+    """Which stage a request belongs to: crew task name, agent role in the prompt, or the lean agent's call"""
+    if task_name in TASK_STAGES:
+        return TASK_STAGES[task_name]
+    text = _text(messages)
+    for role, stage in ROLE_STAGES.items():
+        if role in text:
+            return stage
+    return "explainer" if "Tool result:" in text else "tool_selector"
+
+
+PLANNED_CALL = {"tool": "calculator", "action": None, "args": {"expression": "2 + 3"}}
+
+
+def _execute(messages) -> str:
+    """ReAct executor: call the calculator first, answer with its observation afterwards"""
+    # The format instructions in the first messages mention "Observation:" too
+    history = messages[2:] if isinstance(messages, list) else []
+    # Native tool calling returns the result as a "tool" message instead
+    observed = [str(m.get("content")) for m in history if m.get("role") == "tool"]
+    observed = observed or re.findall(r"Observation:\s*(.+)", _text(history))
+    if not observed:
+        return (
+            "Thought: I should run the planned calculator call\n"
+            "Action: calculator\n"
+            'Action Input: {"expression": "2 + 3"}'
+        )
+    return json.dumps({**PLANNED_CALL, "result": observed[-1].strip()})
+
+
+def _usage(messages, text: str) -> Dict[str, int]:
+    # Roughly four characters per token, enough for token metrics to move
+    prompt = max(1, len(_text(messages)) // 4)
+    completion = max(1, len(text) // 4)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def completion(messages, text: str, model: str = MOCK_MODEL) -> Dict[str, Any]:
+    """An OpenAI chat.completion body for text"""
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        "usage": _usage(messages, text),
+    }
+
+
+def tool_call(messages, model: str = MOCK_MODEL) -> Optional[Dict[str, Any]]:
+    """
+    A chat.completion asking for the planned calculator call, for executor
+    requests that offer native tools and have no tool result yet
+    """
+    if any(m.get("role") == "tool" for m in messages):
+        return None
+    body = completion(messages, "", model)
+    body["choices"][0]["finish_reason"] = "tool_calls"
+    body["choices"][0]["message"] = {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": "calculator", "arguments": json.dumps(PLANNED_CALL["args"])},
+        }],
+    }
+    return body
+
+
+def chunks(text: str, model: str = MOCK_MODEL) -> List[Dict[str, Any]]:
+    """An OpenAI chat.completion.chunk stream for text, a word per chunk"""
+    chunk_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    pieces = re.findall(r"\S+\s*|\s+", text)
+    return [
+        {
+            "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+        }
+        for piece in pieces
+    ]
+
+
+_provider: Optional[MockProvider] = None
+_provider_lock = threading.Lock()
+
+
+def provider() -> MockProvider:
+    """Process-wide MockProvider configured from the environment"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = MockProvider()
+        return _provider
+
+
+# -- in process ----------------------------------------------------------------------------------------------
+
+class MockLLM(BaseLLM):
+    """crewai LLM answering from a MockProvider; emits the usual LLM call events for the metrics listener"""
+
+    llm_type: str = "mock"
+    mock: Any = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            stage, text = self._mock().respond(messages, getattr(from_task, "name", None))
+            time.sleep(self._mock().delay(stage))
+            return self._completed(text, messages, from_task, from_agent)
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            stage, text = self._mock().respond(messages, getattr(from_task, "name", None))
+            await asyncio.sleep(self._mock().delay(stage))
+            return self._completed(text, messages, from_task, from_agent)
+
+    def _mock(self) -> MockProvider:
+        return self.mock or provider()
+
+    def _completed(self, text, messages, from_task, from_agent):
+        from crewai.events.types.llm_events import LLMCallType
+
+        self._emit_call_completed_event(
+            response=text, call_type=LLMCallType.LLM_CALL, from_task=from_task, from_agent=from_agent,
+            messages=messages, usage=_usage(messages, text),
+        )
+        return text
+
+
+class MockOpenAI:
+    """Stand-in for OpenAI/AsyncOpenAI (chat.completions.create, streaming included) answering from a MockProvider"""
+
+    def __init__(self, mock: Optional[MockProvider] = None, is_async: bool = False):
+        self.mock = mock or provider()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate if is_async else self._create))
+
+    def _create(self, model=MOCK_MODEL, messages=(), stream=False, **kwargs):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        stage, text = self.mock.respond(list(messages))
+        time.sleep(self.mock.delay(stage))
+        if stream:
+            return (ChatCompletionChunk.model_validate(chunk) for chunk in chunks(text, model))
+        return ChatCompletion.model_validate(completion(messages, text, model))
+
+    async def _acreate(self, model=MOCK_MODEL, messages=(), stream=False, **kwargs):
+        from openai.types.chat import ChatCompletion
+
+        stage, text = self.mock.respond(list(messages))
+        await asyncio.sleep(self.mock.delay(stage))
+        if stream:
+            return self._astream(text, model)
+        return ChatCompletion.model_validate(completion(messages, text, model))
+
+    @staticmethod
+    async def _astream(text, model):
+        from openai.types.chat import ChatCompletionChunk
+
+        for chunk in chunks(text, model):
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+def build_llm(config: Dict[str, Any]):
+    """The crew LLM for LLMMode.MOCK: in process, or crewai's OpenAI client against AI_MOCK_LLM_URL"""
+    base_url = config.get("base_url") or os.getenv("AI_MOCK_LLM_URL")
+    if base_url:
+        from crewai import LLM
+        return LLM(model=f"openai/{config['model']}", base_url=base_url, api_key="mock",
+                   temperature=config.get("temperature"))
+    return MockLLM(model=config["model"], temperature=config.get("temperature"))
+
+
+def openai_client(factory, is_async: bool = False):
+    """MyAgent's client under LLMMode.MOCK: in process, or factory() against AI_MOCK_LLM_URL"""
+    base_url = os.getenv("AI_MOCK_LLM_URL")
+    if base_url:
+        return factory(base_url=base_url, api_key="mock")
+    return MockOpenAI(is_async=is_async)
+
+
+# -- over HTTP -----------------------------------------------------------------------------------------------
+
+def create_app(mock: Optional[MockProvider] = None):
+    """OpenAI-compatible FastAPI app serving POST /v1/chat/completions from a MockProvider"""
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    mock = mock or provider()
+    app = FastAPI(title="Mock LLM")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        messages = body.get("messages", [])
+        model = body.get("model", MOCK_MODEL)
+        native = bool(body.get("tools"))
+        stage, text = mock.respond(messages, native=native)
+        await asyncio.sleep(mock.delay(stage))
+        if stage == "execute" and native:
+            called = tool_call(messages, model)
+            if called is not None:
+                return called
+        if not body.get("stream"):
+            return completion(messages, text, model)
+
+        def events():
+            for chunk in chunks(text, model):
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": MOCK_MODEL, "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    def stats():
+        return {"calls": dict(mock.calls)}
+
+    return app
+
+
+def main():
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    args = parser.parse_args()
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,46 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from peft import PeftModel
-from langchain_huggingface import HuggingFacePipeline
+from threading import Thread
+from startup import lazy
 
 """LOAD FINE TUNED MODEL"""
 
+# torch, transformers and peft take seconds to import and the weights are
+# downloaded/loaded on first use only (see get_model / get_tokenizer)
+
 # Base model name
 base_model_name = 'Qwen/Qwen2.5-0.5B-Instruct'
 
 # Folder of fine tuned adapter
 adapter_path = './models/fine-tuned qwen0.5B'
 
-# Load tokenizers
-tokenizer = AutoTokenizer.from_pretrained(
-    pretrained_model_name_or_path=adapter_path
-)
+@lazy
+def get_tokenizer():
+    """Load tokenizers"""
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(
+        pretrained_model_name_or_path=adapter_path
+    )
 
-# Load base model
-model = AutoModelForCausalLM.from_pretrained(
-    base_model_name,
-    dtype=torch.bfloat16,
-    device_map="auto",
-)
+@lazy
+def get_model():
+    """Load base model and add the fine tuned adapter to it"""
+    import torch
+    from transformers import AutoModelForCausalLM
+    from peft import PeftModel
+    
+    model = AutoModelForCausalLM.from_pretrained(
+        base_model_name,
+        dtype=torch.bfloat16,
+        device_map="auto",
+    )
+    return PeftModel.from_pretrained(model, adapter_path)
 
-# Add adapter too base model
-model = PeftModel.from_pretrained(model, adapter_path)
+def __getattr__(name):
+    # `model` and `tokenizer` used to be module attributes loaded at import
+    if name == "model":
+        return get_model()
+    if name == "tokenizer":
+        return get_tokenizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class ModelLoader:
     def __init__(
@@ -32,7 +48,7 @@ class ModelLoader:
         base_model_name: str = "Qwen/Qwen2.5-0.5B-Instruct",
         adapter_path: str = None,
         device: str = "auto",
-        dtype=torch.bfloat16
+        dtype=None
     ):
         self.base_model_name = base_model_name
         self.adapter_path = adapter_path
@@ -44,6 +60,10 @@ class ModelLoader:
        
     def load(self):
         """Load Tokenizer and Model. Adapter is optional"""
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        from peft import PeftModel
+        
         if self.adapter_path:
             self.tokenizer = AutoTokenizer.from_pretrained(self.adapter_path)
         else:
@@ -51,7 +71,7 @@ class ModelLoader:
         
         base_model = AutoModelForCausalLM.from_pretrained(
             self.base_model_name,
-            dtype=self.dtype,
+            dtype=self.dtype or torch.bfloat16,
             device_map=self.device
         )
         
@@ -63,6 +83,9 @@ class ModelLoader:
         return self.model, self.tokenizer
      
     def create_llm(self):
+        from transformers import pipeline
+        from langchain_huggingface import HuggingFacePipeline
+        
         model, tokenizer = self.load()
         
         pipe = pipeline(
@@ -78,11 +101,11 @@ class ModelLoader:
 
 class TextGenerating:
     def __init__(self, 
-                model: AutoModelForCausalLM = model,
-                tokenizer: AutoTokenizer = tokenizer
+                model=None,
+                tokenizer=None
     ):
-        self.model = model
-        self.tokenizer=tokenizer
+        self.model = model if model is not None else get_model()
+        self.tokenizer = tokenizer if tokenizer is not None else get_tokenizer()
         self.model.eval()
         
     def build_prompt(self, messages):
@@ -109,12 +132,12 @@ class TextGenerating:
             {"role": "system", "content": "You are a mathematics expert. Give correct, concise, and precise answers. Do not add unnecessary explanations."},
             {"role": "user", "content": prompt}
         ]
-        text = tokenizer.apply_chat_template(
+        text = self.tokenizer.apply_chat_template(
             messages,
             tokenize=False,
             add_generation_prompt=True
         )
-        model_inputs = tokenizer([text], return_tensors="pt").to(model.device)
+        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
         
         generated_ids = self.model.generate(
             **model_inputs,
@@ -129,4 +152,50 @@ class TextGenerating:
         ]
         
         return self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)[0]
-        
\ No newline at end of file
+
+    def stream(self,
+                prompt: str,
+                max_new_tokens: int = 512,
+                temperature: float = 0.7,
+                top_p: float = 0.9,
+                do_sample: bool = True,
+        ):
+        """
+        Same as generate(), but yields decoded text pieces as soon as the
+        model produces them instead of returning the whole completion.
+        """
+        messages = [
+            {"role": "system", "content": "You are a mathematics expert. Give correct, concise, and precise answers. Do not add unnecessary explanations."},
+            {"role": "user", "content": prompt}
+        ]
+        from transformers import TextIteratorStreamer
+        
+        text = self.build_prompt(messages)
+        model_inputs = self.tokenizer([text], return_tensors="pt").to(self.model.device)
+        
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True
+        )
+        
+        # generate() blocks until done, so run it in a thread and drain the streamer here
+        generation = Thread(
+            target=self.model.generate,
+            kwargs=dict(
+                **model_inputs,
+                streamer=streamer,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                do_sample=do_sample
+            ),
+            daemon=True
+        )
+        generation.start()
+        
+        for piece in streamer:
+            if piece:
+                yield piece
+        
+        generation.join()
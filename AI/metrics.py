@@ -0,0 +1,218 @@
+"""
+Prometheus metrics for the AI service.
+
+Exposed at GET /metrics:
+- ai_crew_task_duration_seconds: latency of each crew task (analyze_problem ... explain_solution)
+- ai_tool_duration_seconds: execution time of every math tool `_run`
+- ai_llm_call_duration_seconds / ai_llm_tokens: LLM latency and token counts per agent
+- ai_requests_in_flight / ai_queue_depth / ai_admission_rejections_total: load and shedding
+- ai_fast_path_requests_total: prompts answered by the tools without the crew
+- ai_pipeline_duration_seconds: end-to-end latency of the crew vs. the lean pipeline
+- ai_speculation_total / ai_speculation_saved_seconds_total: speculative explanations committed or discarded
+- ai_deadline_expirations_total: requests that ran out of time, by stage and outcome
+- ai_stage_cache_lookups_total: per-task memoization hits and misses
+- ai_context_tokens: estimated tokens of each task output passed downstream, before and after compaction
+- ai_llm_provider_duration_seconds / ai_llm_routing_events_total: routed LLM attempts per provider, hedges, failovers and circuit breaker trips
+- ai_llm_cost_dollars_total: list-price cost of LLM calls per agent and model
+- ai_model_escalations_total: crew runs moved to stronger models for hard prompts
+- ai_llm_cache_lookups_total: LLM response cache lookups per agent role (memory hit, disk hit or miss)
+"""
+
+import os
+import time
+import functools
+
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, generate_latest,
+                               CONTENT_TYPE_LATEST, multiprocess)
+
+# LLM-bound stages take seconds; tools and cache hits take milliseconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+TASK_DURATION = Histogram(
+    "ai_crew_task_duration_seconds",
+    "Wall time of a single crew task",
+    ["task", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TOOL_DURATION = Histogram(
+    "ai_tool_duration_seconds",
+    "Execution time of a math tool call",
+    ["tool", "action", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_CALL_DURATION = Histogram(
+    "ai_llm_call_duration_seconds",
+    "Latency of a single LLM call",
+    ["agent", "model", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_TOKENS = Histogram(
+    "ai_llm_tokens",
+    "Tokens used by a single LLM call",
+    ["agent", "model", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+
+REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds",
+    "End-to-end latency of an API request",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "ai_requests_in_flight",
+    "Requests currently being processed",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+
+QUEUE_DEPTH = Gauge(
+    "ai_queue_depth",
+    "Work items waiting or running in a queue",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "ai_admission_rejections_total",
+    "Requests shed by admission control",
+    ["reason"],
+)
+
+ANSWER_CACHE_LOOKUPS = Counter(
+    "ai_answer_cache_lookups_total",
+    "Answer cache lookups by result",
+    ["result"],
+)
+
+PIPELINE_DURATION = Histogram(
+    "ai_pipeline_duration_seconds",
+    "Wall time of one pipeline run (crew or lean; status fallback = lean fell back to the crew)",
+    ["pipeline", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+FAST_PATH_REQUESTS = Counter(
+    "ai_fast_path_requests_total",
+    "Prompts seen by the deterministic router (result: hit, error or fallback to the crew)",
+    ["route", "result"],
+)
+
+SPECULATION_RESULTS = Counter(
+    "ai_speculation_total",
+    "Speculative explanations by outcome (hit: verifier confirmed, miss: discarded, error: explainer failed)",
+    ["result"],
+)
+
+SPECULATION_SAVED_SECONDS = Counter(
+    "ai_speculation_saved_seconds_total",
+    "Latency saved by committing a speculative explanation instead of explaining after verification",
+)
+
+SPECULATION_WASTED_SECONDS = Counter(
+    "ai_speculation_wasted_seconds_total",
+    "Explainer time spent on speculative explanations that were discarded",
+)
+
+DEADLINE_EXPIRATIONS = Counter(
+    "ai_deadline_expirations_total",
+    "Requests whose deadline passed, by the stage that ran out of time (result: partial answer or timeout)",
+    ["stage", "result"],
+)
+
+STAGE_CACHE_LOOKUPS = Counter(
+    "ai_stage_cache_lookups_total",
+    "Stage cache lookups by crew task and result",
+    ["stage", "result"],
+)
+
+CONTEXT_TOKENS = Histogram(
+    "ai_context_tokens",
+    "Estimated tokens of a crew task output passed on as context (form: original or compacted)",
+    ["stage", "form"],
+    buckets=TOKEN_BUCKETS,
+)
+
+LLM_PROVIDER_DURATION = Histogram(
+    "ai_llm_provider_duration_seconds",
+    "Latency of one routed LLM attempt by provider (status: ok, error or cancelled as the losing hedge)",
+    ["provider", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_ROUTING_EVENTS = Counter(
+    "ai_llm_routing_events_total",
+    "LLM routing events by provider (hedge, hedge_won, failover, circuit_open)",
+    ["provider", "event"],
+)
+
+LLM_COST = Counter(
+    "ai_llm_cost_dollars_total",
+    "List-price cost of LLM calls (see config/llm_pricing.py)",
+    ["agent", "model"],
+)
+
+MODEL_ESCALATIONS = Counter(
+    "ai_model_escalations_total",
+    "Crew runs by escalation outcome (escalated: hard prompt got stronger models, kept: default models)",
+    ["result"],
+)
+
+LLM_CACHE_LOOKUPS = Counter(
+    "ai_llm_cache_lookups_total",
+    "LLM response cache lookups of deterministic calls by agent role and result (memory_hit, disk_hit, miss)",
+    ["agent", "result"],
+)
+
+COALESCED_REQUESTS = Counter(
+    "ai_coalesced_requests_total",
+    "Requests that attached to an identical in-flight crew run",
+)
+
+
+def instrument_tool(run):
+    """
+    Decorator for a tool's `_run` method recording ai_tool_duration_seconds.
+
+    functools.wraps keeps the original signature visible, which crewai
+    inspects to build the args schema for tools that don't declare one.
+    """
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        action = kwargs.get("action") or "none"
+        start = time.perf_counter()
+        status = "success"
+        try:
+            return run(self, *args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            TOOL_DURATION.labels(self.name, action, status).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def render():
+    """
+    Return (body, content_type) for the /metrics endpoint.
+
+    With several worker processes (serve.py sets PROMETHEUS_MULTIPROC_DIR)
+    every worker writes its samples to that directory and any worker
+    answering /metrics aggregates all of them.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a finished worker's live gauges from the multiprocess directory"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
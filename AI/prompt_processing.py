@@ -4,6 +4,25 @@ import re
 from typing import Dict, Optional
 from pathlib import Path
 
+# LaTeX spacing commands that change rendering but not meaning
+LATEX_SPACING = re.compile(r'\\(?:,|;|:|!|>| |quad\b|qquad\b|thinspace\b|medspace\b|thickspace\b)|~')
+# Whitespace next to operators and brackets carries no meaning: "x+1" == "x + 1"
+OPERATOR_SPACING = re.compile(r'\s*([=+\-*/^<>(),\[\]{}])\s*')
+
+def normalize_prompt(text: str) -> str:
+    """
+    Canonical form of a user prompt, used to detect identical questions.
+    
+    LaTeX spacing commands (\\, \\; \\quad ~ ...) are dropped, whitespace runs
+    collapse to one space and whitespace around operators is removed, so
+    "Solve  x^2 = 4" and "Solve x^2\\,=\\,4\\n" map to the same key. Case is
+    kept: A and a are different variables.
+    """
+    text = LATEX_SPACING.sub(' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = OPERATOR_SPACING.sub(r'\1', text)
+    return text.strip()
+
 class PromptProcessing:
     """
     Load and manage prompts for LLM agents.
@@ -48,6 +67,13 @@ class PromptProcessing:
     def get_system_prompt(self):
         return self._SYSTEM_PROMPTS
     
+    def get_prompt(self, key: str, filename: str = "system_prompts.json") -> str:
+        """Return one named prompt template from a prompt file"""
+        data = self.load(filename)
+        if key not in data:
+            raise KeyError(f"Prompt {key} not found in {filename}")
+        return data[key]
+    
     def parse_llm_output(self, texts):
         try:
             return json.load(texts)
@@ -67,4 +93,32 @@ class PromptProcessing:
             raise ValueError("No JSON found in assistant output")
 
         json_str = match.group(1)
-        return json.loads(json_str)
\ No newline at end of file
+        return json.loads(json_str)
+    
+    def extract_json(self, text: str) -> dict:
+        """
+        Extract the JSON tool call from a chat completion.
+        
+        Accepts a bare JSON object, one wrapped in a ```json fence or
+        surrounded by stray text, and the local model's "assistant {...}"
+        transcripts (see extract_assistant_json).
+        """
+        text = text.strip()
+        fenced = re.search(r'```(?:json)?\s*(\{[\s\S]*?\})\s*```', text)
+        if fenced:
+            text = fenced.group(1)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        
+        if re.search(r'assistant\s*\{', text):
+            return self.extract_assistant_json(text)
+        
+        match = re.search(r'\{[\s\S]*\}', text)
+        if not match:
+            raise ValueError("No JSON found in assistant output")
+        try:
+            return json.loads(match.group(0))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in assistant output: {e}")
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Production entry point for the AI service.
+
+    python serve.py
+
+Runs `app:app` under uvicorn with AI_WORKERS processes and no reload. Each
+worker imports the crew stack and warms up in the app lifespan before it
+accepts connections (see warmup.py); probe GET /readyz to know when a
+worker is warm. With more than one worker, Prometheus metrics are written
+to PROMETHEUS_MULTIPROC_DIR so GET /metrics aggregates all workers.
+
+Environment:
+- AI_WORKERS: number of worker processes (default 2)
+- AI_HOST / AI_PORT: bind address (default 0.0.0.0:8000)
+- AI_LOG_LEVEL: uvicorn log level (default info)
+"""
+
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+
+def main():
+    workers = int(os.getenv("AI_WORKERS", "2"))
+    host = os.getenv("AI_HOST", "0.0.0.0")
+    port = int(os.getenv("AI_PORT", "8000"))
+
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Must be set before any worker imports prometheus_client
+        metrics_dir = tempfile.mkdtemp(prefix="ai-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    else:
+        metrics_dir = None
+
+    try:
+        uvicorn.run(
+            "app:app",
+            host=host,
+            port=port,
+            workers=workers,
+            log_level=os.getenv("AI_LOG_LEVEL", "info"),
+            timeout_graceful_shutdown=30,
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Deferred initialization and startup-time accounting.
+
+Importing app.py must stay cheap: crewai, sympy, torch/transformers, the
+tool registry and the LLM clients are only built when first needed, behind
+accessors decorated with `lazy`. Each accessor records how long its first
+call took, and `import_report()` breaks down what importing a module costs
+per top-level package:
+
+    python startup.py            # cost of `import app`
+    python startup.py agents.crew_run
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+import functools
+import subprocess
+
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+# Seconds spent in the first call of each lazy accessor, by qualified name
+LOAD_TIMES: Dict[str, float] = {}
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def lazy(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turn a zero-argument factory into a thread-safe, memoized accessor.
+
+    The factory runs once, on first call; concurrent first callers wait for
+    it instead of building a second copy. If it raises, nothing is cached and
+    the next call tries again (e.g. an API key that is set later).
+    """
+    name = f"{factory.__module__}.{factory.__name__}"
+    lock = threading.Lock()
+    value: Any = _UNSET
+
+    @functools.wraps(factory)
+    def get() -> T:
+        nonlocal value
+        if value is _UNSET:
+            with lock:
+                if value is _UNSET:
+                    start = time.perf_counter()
+                    result = factory()
+                    LOAD_TIMES[name] = round(time.perf_counter() - start, 3)
+                    value = result
+        return value
+
+    def reset() -> None:
+        """Drop the built value, so the next call runs the factory again (tests)"""
+        nonlocal value
+        with lock:
+            value = _UNSET
+
+    get.loaded = lambda: value is not _UNSET
+    get.reset = reset
+    return get
+
+
+def report() -> Dict[str, Any]:
+    """
+    Lazy accessors loaded so far and what their first call cost.
+
+    Times are inclusive: an accessor that triggers another one first counts
+    both, so they don't add up to a total.
+    """
+    return {"pid": os.getpid(), "loaded": dict(LOAD_TIMES)}
+
+
+def import_report(module: str = "app", top: int = 15) -> List[Tuple[str, float]]:
+    """
+    Import `module` in a fresh interpreter with -X importtime and return the
+    self time (seconds) spent per top-level package, most expensive first.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    per_package: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            per_package[package] = per_package.get(package, 0.0) + int(match.group(1)) / 1e6
+    return sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "app"
+    costs = import_report(target)
+    print(f"Import cost of `{target}` by package (self time):")
+    for package, seconds in costs:
+        print(f"  {package:<30} {seconds:8.3f}s")
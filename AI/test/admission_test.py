@@ -0,0 +1,143 @@
+import time
+import asyncio
+import threading
+import anyio
+import pytest
+import view
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from agents.admission import AdmissionController, AdmissionRejected, Priority
+
+
+def hold_slot(controller, client, priority, release, order=None, deadline=None):
+    with controller.admit(client, priority=priority, deadline=deadline):
+        if order is not None:
+            order.append(client)
+        release.wait(5)
+
+
+def start(target, *args, **kwargs):
+    thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_per_client_limit_returns_429():
+    controller = AdmissionController(max_concurrent=4, max_queue=4, per_client_limit=1)
+    release = threading.Event()
+    thread = start(hold_slot, controller, "alice", Priority.INTERACTIVE, release)
+    time.sleep(0.05)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("alice"):
+            pass
+    assert exc.value.status_code == 429
+
+    # Other clients are unaffected
+    with controller.admit("bob"):
+        pass
+    release.set()
+    thread.join()
+
+
+def test_queue_full_returns_503_with_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, per_client_limit=10, initial_service_time=7)
+    release = threading.Event()
+    threads = [start(hold_slot, controller, f"c{i}", Priority.INTERACTIVE, release) for i in range(2)]
+    time.sleep(0.05)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("late"):
+            pass
+    assert exc.value.status_code == 503
+    assert exc.value.reason == "queue_full"
+    assert exc.value.retry_after_header == "14"
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_projected_wait_beyond_deadline_is_rejected():
+    controller = AdmissionController(max_concurrent=1, max_queue=10, per_client_limit=10, initial_service_time=30)
+    release = threading.Event()
+    thread = start(hold_slot, controller, "busy", Priority.INTERACTIVE, release)
+    time.sleep(0.05)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("hurry", deadline=8):
+            pass
+    assert exc.value.reason == "deadline"
+    release.set()
+    thread.join()
+
+
+def test_interactive_requests_jump_ahead_of_batch():
+    controller = AdmissionController(max_concurrent=1, max_queue=10, per_client_limit=10)
+    release = threading.Event()
+    order = []
+    first = start(hold_slot, controller, "first", Priority.INTERACTIVE, release, order)
+    time.sleep(0.05)
+    batch = start(hold_slot, controller, "batch", Priority.BATCH, release, order)
+    time.sleep(0.05)
+    interactive = start(hold_slot, controller, "interactive", Priority.INTERACTIVE, release, order)
+    time.sleep(0.05)
+
+    release.set()
+    for thread in (first, batch, interactive):
+        thread.join()
+    assert order == ["first", "interactive", "batch"]
+    assert controller.stats()["running"] == 0
+    assert controller.stats()["queued"] == 0
+
+
+def test_stream_slot_is_released_when_the_client_disconnects(monkeypatch):
+    controller = AdmissionController(max_concurrent=1, per_client_limit=1)
+    monkeypatch.setattr(view, "admission", controller)
+    monkeypatch.setattr(view, "stream", lambda inputs, pipeline: iter(["x = 2"]))
+    client = TestClient(FastAPI(routes=view.router.routes))
+
+    assert client.post("/chat/stream", data={"prompt": "x + 1 = 3"}, headers={"X-Priority": "urgent"}).status_code == 422
+
+    response = asyncio.run(view.chat_stream(None, prompt="x + 1 = 3", model="crew", pipeline="crew",
+                                            x_client_id="c", x_priority=None, x_deadline=None))
+    assert controller.running() == 1
+
+    async def disconnected(message):
+        raise OSError("client went away")
+
+    with pytest.raises(Exception):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, disconnected))
+    assert controller.running() == 0
+
+
+def test_queued_chat_requests_hold_no_worker_thread(monkeypatch):
+    controller = AdmissionController(max_concurrent=1, max_queue=1, per_client_limit=10)
+    release = threading.Event()
+    monkeypatch.setattr(view, "admission", controller)
+    monkeypatch.setattr(view, "run", lambda inputs, pipeline, deadline: release.wait(5) and "x = 2")
+
+    @asynccontextmanager
+    async def one_worker_thread(app):
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+        yield
+
+    responses = {}
+    with TestClient(FastAPI(routes=view.router.routes, lifespan=one_worker_thread)) as client:
+        def ask(name):
+            responses[name] = client.post("/chat", data={"prompt": "x + 1 = 3"})
+
+        running = start(ask, "running")
+        time.sleep(0.1)
+        queued = start(ask, "queued")
+        time.sleep(0.1)
+        # The running request has the only thread and one is queued, so this is
+        # shed by the admission queue instead of waiting for a thread
+        ask("shed")
+        assert responses["shed"].status_code == 503 and "queue is full" in responses["shed"].json()["error"]
+        assert controller.stats()["queued"] == 1
+
+        release.set()
+        running.join(5)
+        queued.join(5)
+    assert responses["running"].json()["response"] == responses["queued"].json()["response"] == "x = 2"
@@ -0,0 +1,58 @@
+import time
+import pytest
+from agents.answer_cache import AnswerCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(path=str(tmp_path / "answers.sqlite3"), max_entries=3, ttl=60)
+
+
+def test_hit_after_put_ignores_whitespace_and_latex_spacing(cache):
+    cache.put("Solve x^2 = 4", "x = 2 or x = -2")
+
+    hit = cache.get("Solve  x^2\\,=\\,4 ")
+    assert hit is not None
+    assert hit.raw == "x = 2 or x = -2"
+    assert cache.get("Solve X^2 = 4") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for i in range(3):
+        cache.put(f"q{i}", f"a{i}")
+        time.sleep(0.01)
+    cache.get("q0")
+    cache.put("q3", "a3")
+
+    assert cache.get("q1") is None
+    assert cache.get("q0").raw == "a0"
+    assert cache.stats()["entries"] == 3
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite3"), max_entries=10, ttl=0.05)
+    cache.put("q", "a")
+    time.sleep(0.1)
+    assert cache.get("q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_one_or_all(cache):
+    cache.put("q1", "a1")
+    cache.put("q2", "a2")
+
+    assert cache.invalidate(" q1\n") == 1
+    assert cache.get("q1") is None
+    assert cache.invalidate() == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_answers_are_kept_per_pipeline(cache):
+    cache.put("Solve x^2 = 4", "x = ±2", "lean")
+
+    assert cache.get("Solve x^2 = 4", "crew") is None
+    assert cache.get("Solve x^2 = 4", "lean").raw == "x = ±2"
+    cache.put("Solve x^2 = 4", "x = 2 or x = -2", "crew")
+    assert cache.invalidate("Solve x^2 = 4") == 2
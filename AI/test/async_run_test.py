@@ -0,0 +1,198 @@
+import time
+import asyncio
+
+import pytest
+from agents import crew_run, lean
+from agents.admission import AdmissionController
+from agents.coalescing import AsyncSingleFlight
+from agents.deadline import Deadline, DeadlineExceeded, PartialAnswer, arun_within
+from agents.results import StageOutput
+
+
+class SleepingAgent:
+    """Lean agent whose LLM calls are awaited sleeps, like requests over the async client"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def aselect_tool(self, question):
+        await asyncio.sleep(self.delay)
+        return {"tool": "calculator", "action": None, "args": {"expression": question}}
+
+    async def aexecute(self, call):
+        return call["args"]["expression"]
+
+    async def aexplain(self, question, call, result):
+        await asyncio.sleep(self.delay)
+        return f"The answer is {result}"
+
+
+@pytest.fixture
+def sleeping_agent(monkeypatch):
+    agent = SleepingAgent(delay=0.2)
+    get_agent = lambda: agent
+    get_agent.loaded = lambda: True
+    monkeypatch.setattr(lean, "get_agent", get_agent)
+    monkeypatch.setattr(crew_run, "router", None)
+    monkeypatch.setattr(crew_run, "get_answer_cache", lambda: None)
+    return agent
+
+
+def test_concurrent_requests_share_the_event_loop(sleeping_agent):
+    async def main():
+        return await asyncio.gather(*(crew_run.arun(f"{i} + 1", pipeline="lean") for i in range(200)))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    assert [result.raw for result in results] == [f"The answer is {i} + 1" for i in range(200)]
+    # Two 0.2s LLM calls per request; 200 requests on one thread overlap instead of queueing
+    assert elapsed < 2
+
+
+def test_identical_prompts_coalesce():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "x = 2"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("solve x + 1 = 3", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert calls == [1]
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(result == "x = 2" for result, _ in results)
+
+
+def test_identical_prompts_with_deadlines_coalesce(sleeping_agent):
+    calls = []
+    aselect_tool = sleeping_agent.aselect_tool
+
+    async def counting(question):
+        calls.append(question)
+        return await aselect_tool(question)
+
+    sleeping_agent.aselect_tool = counting
+
+    async def main():
+        return await asyncio.gather(
+            *(crew_run.arun("2 + 2", pipeline="lean", deadline=Deadline(5)) for _ in range(5)),
+            crew_run.arun("2 + 2", pipeline="lean", deadline=Deadline(0.1)),
+            return_exceptions=True,
+        )
+
+    *answers, expired = asyncio.run(main())
+
+    assert calls == ["2 + 2"]
+    assert [answer.raw for answer in answers] == ["The answer is 2 + 2"] * 5
+    assert isinstance(expired, DeadlineExceeded)
+
+
+def test_cancelled_leader_leaves_followers_their_result():
+    flights = AsyncSingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "x = 2"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("solve x + 1 = 3", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("solve x + 1 = 3", work))
+        await asyncio.sleep(0.01)
+        # The leader's client disconnects
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # Once nobody waits for it, the work itself is cancelled
+        alone = asyncio.ensure_future(flights.do("solve x + 2 = 3", work))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(main()) == ("x = 2", True)
+    assert cancelled == [True]
+    assert flights.in_flight() == 0
+
+
+def test_expired_deadline_cancels_the_pipeline():
+    cancelled = []
+
+    async def pipeline(callback):
+        callback(StageOutput("select_tool", "Tool Selector", "{...}"))
+        callback(StageOutput("execute_tool", "Tool Executor", "[-2, 2]"))
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        result = await arun_within(Deadline(0.2), pipeline, ["select_tool", "execute_tool", "explain"])
+        await asyncio.sleep(0)
+        return result
+
+    result = asyncio.run(main())
+
+    assert isinstance(result, PartialAnswer)
+    assert (result.raw, result.expired_stage) == ("[-2, 2]", "explain")
+    assert cancelled == [True]
+
+
+def test_async_admission_bounds_concurrency():
+    admission = AdmissionController(max_concurrent=2, max_queue=10, per_client_limit=10)
+    peak = []
+
+    async def request():
+        async with admission.admit_async("client"):
+            peak.append(admission.running())
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert max(peak) == 2
+    assert admission.stats()["running"] == 0 and admission.stats()["queued"] == 0
+
+
+def test_async_admission_wakes_on_release_and_honours_deadlines():
+    from agents.admission import AdmissionRejected
+
+    admission = AdmissionController(max_concurrent=1, max_queue=10, per_client_limit=10, initial_service_time=0.01)
+    waits = {}
+
+    async def request(name, hold, deadline=None):
+        async with admission.admit_async(name, deadline=deadline) as waited:
+            waits[name] = waited
+            await asyncio.sleep(hold)
+
+    async def main():
+        first = asyncio.ensure_future(request("first", 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await request("late", 0, deadline=0.05)
+        await asyncio.gather(first, request("next", 0))
+
+    asyncio.run(main())
+
+    # Admitted as soon as the first request released its slot, not on a poll tick
+    assert 0.1 < waits["next"] < 0.25
+    assert "late" not in waits
+    assert admission.stats()["rejected"] == {"deadline": 1}
+    assert admission.stats()["queued"] == 0
@@ -0,0 +1,96 @@
+import json
+import time
+import threading
+import view
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from agents.admission import AdmissionController
+from agents.batch import run_batch
+
+
+class FakeOutput:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+def test_results_come_back_in_completion_order():
+    delays = {"slow": 0.3, "fast": 0.0, "medium": 0.1}
+
+    def runner(prompt):
+        time.sleep(delays[prompt])
+        return FakeOutput(f"solved {prompt}")
+
+    items = list(run_batch(["slow", "fast", "medium"], runner, concurrency=3, item_timeout=5))
+
+    assert [item["prompt"] for item in items] == ["fast", "medium", "slow"]
+    assert [item["index"] for item in items] == [1, 2, 0]
+    assert all(item["status"] == "success" for item in items)
+    assert items[0]["response"] == "solved fast"
+
+
+def test_concurrency_is_bounded():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def runner(prompt):
+        with lock:
+            running.append(prompt)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(prompt)
+        return FakeOutput("ok")
+
+    items = list(run_batch([str(i) for i in range(8)], runner, concurrency=2, item_timeout=5))
+
+    assert len(items) == 8
+    assert max(peak) <= 2
+
+
+def test_per_item_errors_and_timeouts_do_not_stall_batch():
+    def runner(prompt):
+        if prompt == "hang":
+            time.sleep(1)
+        if prompt == "boom":
+            raise RuntimeError("provider down")
+        return FakeOutput("ok")
+
+    start = time.monotonic()
+    items = {item["prompt"]: item for item in run_batch(["hang", "boom", "fine", ""], runner, concurrency=4, item_timeout=0.2)}
+
+    assert time.monotonic() - start < 0.9
+    assert items["hang"]["status"] == "timeout"
+    assert items["boom"]["status"] == "error"
+    assert items["boom"]["error"] == "provider down"
+    assert items["fine"]["status"] == "success"
+    assert items[""]["status"] == "error"
+
+
+def test_chat_batch_items_run_under_deadlines_and_the_client_limit(monkeypatch):
+    controller = AdmissionController(max_concurrent=8, per_client_limit=2)
+    seen = []
+    lock = threading.Lock()
+
+    def run(inputs, pipeline, deadline):
+        with lock:
+            seen.append((deadline.seconds, controller._per_client.get("acme")))
+        time.sleep(0.05)
+        return FakeOutput(f"solved {inputs}")
+
+    monkeypatch.setattr(view, "admission", controller)
+    monkeypatch.setattr(view, "run", run)
+    client = TestClient(FastAPI(routes=view.router.routes))
+
+    body = {"prompts": [f"{i} + 1" for i in range(6)], "concurrency": 16, "timeout": 2}
+    response = client.post("/chat/batch", json=body, headers={"X-Client-Id": "acme"})
+    items = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [item["status"] for item in items] == ["success"] * 6
+    assert {seconds for seconds, _ in seen} == {2}
+    # Counted against the caller, never more than its per-client limit at once
+    assert max(count for _, count in seen) <= 2
+    assert controller.stats()["running"] == 0
+
+    body["concurrency"] = 10_000
+    assert client.post("/chat/batch", json=body).status_code == 422
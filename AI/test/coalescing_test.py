@@ -0,0 +1,67 @@
+import time
+import threading
+import pytest
+from agents.coalescing import SingleFlight
+from prompt_processing import normalize_prompt
+
+
+def test_normalize_prompt_ignores_whitespace_but_keeps_case():
+    assert normalize_prompt("  Solve  x^2 - 4 = 0\n") == normalize_prompt("Solve x^2 - 4 = 0")
+    assert normalize_prompt("Solve A x = b") != normalize_prompt("Solve a x = b")
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    def caller():
+        results.append(flights.do("key", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == "answer" for result, _ in results)
+    assert flights.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_to_followers_and_key_is_released():
+    flights = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("provider down")
+
+    def caller():
+        try:
+            flights.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == ["provider down"] * 3
+    assert flights.do("key", lambda: "fresh") == ("fresh", False)
+
+
+def test_different_keys_run_independently():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == (1, False)
+    assert flights.do("b", lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        flights.do("c", lambda: int("x"))
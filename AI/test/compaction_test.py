@@ -0,0 +1,104 @@
+import json
+
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from agents.compaction import ContextCompactor, compact_analysis, compact_execution, compact_verification, estimate_tokens
+
+ANALYSIS = """## Analysis
+
+Let me carefully read the problem. The student wants us to work with a quadratic
+equation, which is a polynomial of degree two, and it is important not to solve it yet.
+
+**Problem type:** Algebra - Quadratic equation
+**Given:** x^2 - 5x + 6 = 0
+**Variables to solve for:** x
+**Constraints:** x is real
+
+In summary, this is a standard quadratic that can be factored or solved with the formula.
+"""
+
+EXECUTION = """I will now run the planned tool.
+```json
+{"tool": "equation_solver", "action": "solve_equation", "args": {"equation": "x**2 - 5*x + 6", "var": "x"}, "result": "[2, 3]"}
+```
+The solver returned both roots."""
+
+VERIFICATION = """I substituted both values back into the equation.
+For x = 2: 4 - 10 + 6 = 0, which holds.
+For x = 3: 9 - 15 + 6 = 0, which holds.
+Both roots satisfy the equation and no constraints are violated.
+Overall I am satisfied with the work presented here.
+Verdict: CONFIRMED"""
+
+
+def test_analysis_keeps_only_the_fields():
+    compact = compact_analysis(ANALYSIS, budget=200)
+    assert compact.splitlines() == [
+        "Problem type: Algebra - Quadratic equation",
+        "Given: x^2 - 5x + 6 = 0",
+        "Variables to solve for: x",
+        "Constraints: x is real",
+    ]
+
+
+def test_execution_is_reduced_to_the_tool_call():
+    call = json.loads(compact_execution(EXECUTION, budget=200))
+    assert call == {"tool": "equation_solver", "action": "solve_equation",
+                    "args": {"equation": "x**2 - 5*x + 6", "var": "x"}, "result": "[2, 3]"}
+
+
+def test_oversized_tool_call_is_never_cut():
+    result = list(range(200))
+    text = "Running it.\n" + json.dumps({"tool": "statistics", "action": "describe", "args": {"data": result}, "result": result})
+    call = json.loads(compact_execution(text, budget=20))
+    assert call["result"] == result
+
+
+def test_correction_keeps_the_corrected_answer():
+    text = "\n".join(
+        [f"Step {i}: checking the expansion term by term, which holds." for i in range(10)]
+        + ["The executor dropped a sign in the constant term.", "Corrected answer: x = -2, x = -3",
+           "Verdict: CORRECTED"]
+    )
+    compact = compact_verification(text, budget=40)
+    assert estimate_tokens(compact) <= 40
+    assert compact.splitlines()[-3:] == ["The executor dropped a sign in the constant term.",
+                                         "Corrected answer: x = -2, x = -3", "Verdict: CORRECTED"]
+    assert "Step 0" not in compact
+
+
+def test_verification_budget_always_keeps_the_verdict():
+    compact = compact_verification(VERIFICATION, budget=30)
+    assert estimate_tokens(compact) <= 30
+    assert compact.splitlines()[-1] == "Verdict: CONFIRMED"
+    assert "For x = 2: 4 - 10 + 6 = 0, which holds." in compact
+    assert "satisfied" not in compact
+
+
+class FakeLLM(BaseLLM):
+    """Answers each task with a fixed output and records the prompts it was sent"""
+
+    answers: dict = {}
+    prompts: dict = {}
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.prompts[from_task.name] = "\n".join(str(m["content"]) for m in messages)
+        return f"Thought: done\nFinal Answer: {self.answers[from_task.name]}"
+
+
+def test_downstream_stage_receives_compacted_context():
+    llm = FakeLLM(model="fake", answers={"analyze_problem": ANALYSIS, "plan_solution": "Tool: equation_solver"}, prompts={})
+    compactor = ContextCompactor({"analyze_problem": 200})
+    analyst = Agent(role="Analyst", goal="Analyze", backstory="...", llm=llm)
+    planner = Agent(role="Planner", goal="Plan", backstory="...", llm=llm)
+    analyze = Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst,
+                   guardrail=compactor.guardrail("analyze_problem"))
+    plan = Task(name="plan_solution", description="Plan", expected_output="Plan", agent=planner, context=[analyze])
+
+    Crew(agents=[analyst, planner], tasks=[analyze, plan], process=Process.sequential).kickoff()
+
+    assert "Given: x^2 - 5x + 6 = 0" in llm.prompts["plan_solution"]
+    assert "Let me carefully read" not in llm.prompts["plan_solution"]
+    stats = compactor.stats()["stages"]["analyze_problem"]
+    assert stats["outputs"] == 1 and stats["saved_ratio"] > 0.5
@@ -0,0 +1,18 @@
+import pytest
+from agents import crew_run, usage
+from config import llm_cache
+
+
+@pytest.fixture(autouse=True)
+def local_stores(tmp_path, monkeypatch):
+    """Keep the SQLite stores tests build out of output/: each test gets fresh ones under tmp_path"""
+    monkeypatch.setenv("AI_LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setenv("AI_USAGE_PATH", str(tmp_path / "usage.sqlite3"))
+    monkeypatch.setenv("AI_ANSWER_CACHE_PATH", str(tmp_path / "answer_cache.sqlite3"))
+    monkeypatch.setenv("AI_STAGE_CACHE_PATH", str(tmp_path / "stage_cache.sqlite3"))
+    stores = [llm_cache.get_cache, usage.get_ledger, crew_run.get_answer_cache, crew_run.get_stage_cache]
+    for store in stores:
+        store.reset()
+    yield
+    for store in stores:
+        store.reset()
@@ -0,0 +1,186 @@
+import time
+import threading
+
+import pytest
+from agents import crew_run, deadline, lean
+from agents.deadline import Deadline, DeadlineExceeded, PartialAnswer, run_within
+from agents.results import StageOutput
+
+
+def test_stage_budgets_follow_weights_and_redistribute_slack():
+    budget = Deadline(10, weights={"a": 1, "b": 3})
+    budget.begin(["a", "b"])
+    assert budget.stage_budget("a") == pytest.approx(2.5, abs=0.05)
+
+    # "a" finished early: "b" gets everything that is left, not just its 7.5s share
+    budget.complete("a")
+    assert budget.current_stage == "b"
+    assert budget.stage_remaining() == pytest.approx(10, abs=0.05)
+
+
+def test_run_within_returns_result_and_exposes_budget():
+    seen = {}
+
+    def pipeline(callback):
+        seen["remaining"] = deadline.remaining()
+        callback(StageOutput("a", "A", "first"))
+        return "done"
+
+    stages = []
+    assert run_within(Deadline(5), pipeline, ["a"], stages.append) == "done"
+    assert 0 < seen["remaining"] <= 5
+    assert [stage.raw for stage in stages] == ["first"]
+    # Outside a deadline LLM clients keep their own timeouts
+    assert deadline.remaining() is None
+
+
+def test_expired_stage_returns_best_partial_output():
+    release = threading.Event()
+
+    def pipeline(callback):
+        callback(StageOutput("select_tool", "Tool Selector", "{...}"))
+        callback(StageOutput("execute_tool", "Tool Executor", "[-2, 2]"))
+        release.wait(5)
+        return "explained"
+
+    start = time.perf_counter()
+    result = run_within(Deadline(0.3), pipeline, ["select_tool", "execute_tool", "explain"])
+    release.set()
+
+    assert time.perf_counter() - start < 1
+    assert isinstance(result, PartialAnswer)
+    assert (result.raw, result.stage, result.expired_stage) == ("[-2, 2]", "execute_tool", "explain")
+
+
+def test_stage_budget_expires_before_request_deadline():
+    release = threading.Event()
+
+    def pipeline(callback):
+        release.wait(5)
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded) as e:
+        # "slow" may only use a tenth of the 2s request budget
+        run_within(Deadline(2, weights={"slow": 1, "rest": 9}), pipeline, ["slow", "rest"])
+    release.set()
+
+    assert time.perf_counter() - start < 0.5
+    assert e.value.stage == "slow"
+
+
+def test_abandoned_pipeline_settles_when_its_thread_exits():
+    release, exited = threading.Event(), threading.Event()
+    settled = []
+
+    def pipeline(callback):
+        callback(StageOutput("execute_tool", "Tool Executor", "4"))
+        release.wait(5)
+
+    budget = Deadline(0.2)
+    assert run_within(budget, pipeline, ["execute_tool", "explain"]).raw == "4"
+    budget.on_settled(lambda: (settled.append("slot"), exited.set()))
+    # The thread is still inside its stage, so e.g. its admission slot stays taken
+    assert settled == []
+
+    release.set()
+    assert exited.wait(2) and settled == ["slot"]
+    Deadline(1).on_settled(lambda: settled.append("now"))
+    assert settled == ["slot", "now"]
+
+
+class HangingExplainer:
+    """Lean agent whose tool selection and execution work but whose explainer call hangs"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def select_tool(self, question):
+        return {"tool": "calculator", "action": None, "args": {"expression": "2 + 3"}}
+
+    def execute(self, call):
+        return 5.0
+
+    def explain(self, question, call, result):
+        self.release.wait(5)
+        return "2 + 3 = 5"
+
+
+def test_lean_pipeline_returns_tool_result_on_deadline(monkeypatch):
+    agent = HangingExplainer()
+    monkeypatch.setattr(lean, "get_agent", lambda: agent)
+    monkeypatch.setattr(crew_run, "router", None)
+    monkeypatch.setattr(crew_run, "get_answer_cache", lambda: None)
+
+    result = crew_run.run("What is two plus three?", pipeline="lean", deadline=Deadline(0.5))
+    agent.release.set()
+
+    assert isinstance(result, PartialAnswer)
+    assert result.raw == "5"
+    assert result.expired_stage == "explain"
+
+
+def test_identical_prompts_with_deadlines_still_coalesce(monkeypatch):
+    agent = HangingExplainer()
+    selections = []
+    select_tool = agent.select_tool
+    agent.select_tool = lambda question: selections.append(question) or select_tool(question)
+    monkeypatch.setattr(lean, "get_agent", lambda: agent)
+    monkeypatch.setattr(crew_run, "router", None)
+    monkeypatch.setattr(crew_run, "get_answer_cache", lambda: None)
+
+    results, errors = [], []
+
+    def ask(seconds):
+        try:
+            results.append(crew_run.run("What is two plus three?", pipeline="lean", deadline=Deadline(seconds)))
+        except DeadlineExceeded as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ask, args=(5,)) for _ in range(3)]
+    threads[0].start()
+    time.sleep(0.05)
+    for thread in threads[1:]:
+        thread.start()
+    # Runs out of time while attached: gives up on its own deadline, the shared run goes on
+    ask(0.1)
+    agent.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(selections) == 1
+    assert [result.raw for result in results] == ["2 + 3 = 5"] * 3
+    assert len(errors) == 1 and "identical in-flight request" in str(errors[0])
+
+
+def test_deadline_caps_wrapped_llm_calls(tmp_path):
+    from types import SimpleNamespace
+    from typing import Optional
+    from crewai.llms.base_llm import BaseLLM
+    from config.llm_cache import CachedLLM, ResponseCache
+    from config.llm_router import LLMRouter, Provider, RoutedLLM
+
+    timeouts = []
+
+    class ProviderLLM(BaseLLM):
+        timeout: Optional[float] = None
+
+        def call(self, messages, *args, **kwargs):
+            timeouts.append(self.timeout)
+            return "ok"
+
+    shared = ProviderLLM(model="gpt-4o-mini", timeout=600)
+    cache = ResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    cached = CachedLLM(model=shared.model, temperature=0.7, inner=shared, cache=cache)
+    routed = RoutedLLM(model="routed", router=LLMRouter([Provider("openai", shared)], hedge=False))
+    agents = [SimpleNamespace(llm=cached.model_copy()), SimpleNamespace(llm=routed.model_copy())]
+
+    def pipeline(callback):
+        deadline.limit_llm_timeouts(agents)
+        for agent in agents:
+            agent.llm.call("2 + 2")
+        return "done"
+
+    assert run_within(Deadline(5), pipeline, ["a"]) == "done"
+    assert len(timeouts) == 2 and all(1 <= timeout <= 5 for timeout in timeouts)
+    # The provider LLM other requests share keeps its own timeout
+    assert shared.timeout == 600 and cached.timeout is None
@@ -0,0 +1,53 @@
+import pytest
+from agents.fast_path import FastPathRouter
+from tools.tools import (CalculatorTool, EquationSolverTool, SymbolicMathTool, MatrixToolAgent, StatisticsToolAgent,
+                        ToolRegistry, ToolExecutor)
+
+
+@pytest.fixture(scope="module")
+def router():
+    registry = ToolRegistry()
+    for tool in (CalculatorTool(), EquationSolverTool(), SymbolicMathTool(), MatrixToolAgent(), StatisticsToolAgent()):
+        registry.register(tool)
+    executor = ToolExecutor(registry=registry)
+    return FastPathRouter(executor_factory=lambda: executor)
+
+
+@pytest.mark.parametrize("prompt, route, expected", [
+    ("solve x^2 - 5x + 6 = 0", "solve", "x = 2, x = 3"),
+    ("Solve for y: 2y + 3 = 7", "solve", "y = 2"),
+    ("derivative of sin(x)*x^2", "derivative", "x^2*cos(x) + 2*x*sin(x)"),
+    ("integrate x^2 dx", "integral", "x^3/3 + C"),
+    # e is Euler's number, not a free symbol
+    ("integrate e^x dx", "integral", "exp(x) + C"),
+    ("derivative of e^x wrt x", "derivative", "= exp(x)**"),
+    ("det [[1,2],[3,4]]", "matrix_determinant", "**-2**"),
+    ("mean of 1, 2, 3, 4", "statistics_mean", "**2.5**"),
+    ("what is 2^10?", "arithmetic", "= 1024"),
+])
+def test_directly_solvable_prompts(router, prompt, route, expected):
+    answer = router.answer(prompt)
+    assert answer is not None
+    assert answer.route == route
+    assert expected in answer.raw
+
+
+@pytest.mark.parametrize("prompt", [
+    "A train leaves at 3pm going 60 km/h. When does it arrive?",
+    "solve x^2 + y = 3",
+    "solve sin(x) = 0",
+    "x^2 = -1",
+    "det [[1,2,3],[4,5,6]]",
+    "what is the derivative of the function f(x) = x^2",
+    "integrate 2e^x dx",
+])
+def test_ambiguous_prompts_fall_back(router, prompt):
+    assert router.answer(prompt) is None
+
+
+def test_hit_rate():
+    router = FastPathRouter(executor_factory=lambda: None)
+    router.answer("Explain what a derivative is")
+    stats = router.stats()
+    assert stats["fallbacks"] == 1
+    assert stats["hit_rate"] == 0.0
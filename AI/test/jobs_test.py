@@ -0,0 +1,66 @@
+import time
+import pytest
+from agents.jobs import JobManager, JobQueueFull, JobStatus
+
+
+class FakeTaskOutput:
+    def __init__(self, name, raw):
+        self.name = name
+        self.raw = raw
+        self.agent = "fake_agent"
+
+
+def fake_runner(prompt, task_callback):
+    for name in ["analyze_problem", "plan_solution", "explain_solution"]:
+        task_callback(FakeTaskOutput(name, f"{name}: {prompt}"))
+    return FakeTaskOutput("explain_solution", f"answer to {prompt}")
+
+
+def failing_runner(prompt, task_callback):
+    task_callback(FakeTaskOutput("analyze_problem", "partial"))
+    raise RuntimeError("provider down")
+
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_records_each_stage_and_result():
+    manager = JobManager(runner=fake_runner, max_workers=1)
+    job = wait_for(manager.submit("x + 1 = 2"))
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert [s["task"] for s in job.stages()] == ["analyze_problem", "plan_solution", "explain_solution"]
+    assert job.result == "answer to x + 1 = 2"
+    assert job.events[-1] == {"event": "done", "result": "answer to x + 1 = 2"}
+    assert manager.get(job.id) is job
+
+
+def test_job_failure_keeps_partial_stages():
+    manager = JobManager(runner=failing_runner, max_workers=1)
+    job = wait_for(manager.submit("x"))
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == "provider down"
+    assert len(job.stages()) == 1
+    assert job.events[-1]["event"] == "error"
+
+
+def test_queue_is_bounded():
+    release = []
+
+    def blocking_runner(prompt, task_callback):
+        while not release:
+            time.sleep(0.01)
+        return "done"
+
+    manager = JobManager(runner=blocking_runner, max_workers=1, max_pending=2)
+    manager.submit("a")
+    manager.submit("b")
+    with pytest.raises(JobQueueFull):
+        manager.submit("c")
+    release.append(True)
+    manager.shutdown()
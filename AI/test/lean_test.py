@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletion
+from agents import lean
+from agents.agent import MyAgent
+from prompt_processing import PromptProcessing
+from tools.tools import EquationSolverTool, ToolRegistry, ToolExecutor
+
+
+class FakeCompletions:
+    """Replies with queued contents and records the messages it was sent"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, model, messages, extra_body=None, stream=False, **sampling):
+        self.requests.append(messages)
+        return ChatCompletion.model_validate({
+            "id": "c1", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.replies.pop(0)}}],
+        })
+
+
+def make_agent(replies):
+    registry = ToolRegistry()
+    registry.register(EquationSolverTool())
+    p_proc = PromptProcessing()
+    p_proc.load("system_prompts.json")
+    agent = MyAgent(
+        SYSTEM_PROMPT=p_proc.get_system_prompt(),
+        EXPLAIN_PROMPT=p_proc.get_prompt("explain_prompt_template"),
+        p_proc=p_proc,
+        executor=ToolExecutor(registry=registry),
+        OPEN_ROUTER_API="test",
+    )
+    completions = FakeCompletions(replies)
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return agent, completions
+
+
+def test_lean_pipeline_two_llm_calls(monkeypatch):
+    tool_call = '```json\n{"tool": "equation_solver", "action": "solve_equation", "args": {"equation": "x**2 - 4 = 0", "var": "x"}}\n```'
+    agent, completions = make_agent([tool_call, "Factor it. **x = -2, x = 2**"])
+    monkeypatch.setattr(lean, "get_agent", lambda: agent)
+
+    stages = []
+    answer = lean.solve("Solve x^2 - 4 = 0", task_callback=stages.append)
+
+    assert answer.raw == "Factor it. **x = -2, x = 2**"
+    assert answer.result == "[-2, 2]"
+    assert [stage.name for stage in stages] == ["select_tool", "execute_tool", "explain"]
+    assert len(completions.requests) == 2
+    # The explainer sees the exact tool result
+    assert "Tool result: [-2, 2]" in completions.requests[1][1]["content"]
+
+
+def test_invalid_tool_call_raises_lean_error(monkeypatch):
+    agent, _ = make_agent(["I think the answer is 2"])
+    monkeypatch.setattr(lean, "get_agent", lambda: agent)
+
+    with pytest.raises(lean.LeanPipelineError):
+        lean.solve("Solve x^2 - 4 = 0")
+
+
+def test_tool_selection_is_answered_from_the_cache():
+    agent, completions = make_agent(['{"tool": "equation_solver", "args": {"equation": "x - 1 = 0"}}'])
+    assert agent.select_tool("Solve x = 1") == agent.select_tool("Solve x = 1")
+    assert len(completions.requests) == 1
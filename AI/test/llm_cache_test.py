@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from openai.types.chat import ChatCompletion
+from config import llm_cache
+from config.llm_cache import CachedLLM, ResponseCache, acached_completion, cached_completion
+
+
+class FakeLLM(BaseLLM):
+    """Provider stand-in that counts its calls and the stop words it was given"""
+
+    calls: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls.append(list(self.stop_sequences))
+        return f"Thought: done\nFinal Answer: {from_task.name}"
+
+
+def run_crew(llm):
+    planner = Agent(role="Mathematical Solution Planner\n", goal="Plan {topic}", backstory="...", llm=llm)
+    plan = Task(name="plan_solution", description="Plan", expected_output="Plan", agent=planner)
+    return Crew(agents=[planner], tasks=[plan], process=Process.sequential).kickoff(inputs={"topic": "x + 1 = 2"})
+
+
+def cached(llm, cache):
+    return CachedLLM(model=llm.model, temperature=llm.temperature, inner=llm, cache=cache)
+
+
+def test_memory_lru_over_disk(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = ResponseCache(path=path, memory_entries=1)
+    cache.put("a", "m", "first")
+    cache.put("b", "m", "second")
+
+    assert cache.get("b", "planner") == "second"
+    # "a" fell out of memory but is still on disk
+    assert cache.get("a", "planner") == "first"
+    assert ResponseCache(path=path).get("b", "verifier") == "second"
+    assert cache.get("c", "planner") is None
+    assert cache.stats()["roles"]["planner"] == {"memory_hit": 1, "disk_hit": 1, "miss": 1, "hit_rate": 2 / 3}
+
+    assert cache.eligible({"temperature": 0}) and not cache.eligible({"temperature": 0.7})
+    assert not cache.eligible({}) and not cache.eligible({"temperature": 0, "stream": True})
+
+
+def test_repeated_deterministic_crew_call_skips_the_provider(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    provider = FakeLLM(model="gemini/fake", temperature=0.0, calls=[])
+
+    first, second = run_crew(cached(provider, cache)), run_crew(cached(provider, cache))
+    assert first.raw == second.raw == "plan_solution"
+    assert len(provider.calls) == 1
+    assert any("\nObservation:" in stop for stop in provider.calls[0])
+    assert cache.stats()["roles"]["Mathematical Solution Planner"]["hit_rate"] == 0.5
+
+    # Sampled calls are never served from the cache
+    sampled = FakeLLM(model="gemini/fake", temperature=0.7, calls=[])
+    run_crew(cached(sampled, cache))
+    run_crew(cached(sampled, cache))
+    assert len(sampled.calls) == 2
+
+
+def completion(content):
+    return ChatCompletion.model_validate({
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "deepseek/deepseek-v3.2",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    })
+
+
+def test_openai_completions_are_cached_for_my_agent(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_cache", lambda: cache)
+    sent = []
+
+    def create(**kwargs):
+        sent.append(kwargs)
+        return completion('{"tool": "calculator"}')
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    request = {"model": "deepseek/deepseek-v3.2", "messages": [{"role": "user", "content": "2 + 3"}], "temperature": 0}
+    cached_completion(client, "tool_selector", **request, timeout=5)
+    # A different per-call timeout is still the same request
+    response = cached_completion(client, "tool_selector", **request, timeout=30)
+
+    assert response.choices[0].message.content == '{"tool": "calculator"}'
+    assert len(sent) == 1
+    cached_completion(client, "tool_selector", **{**request, "temperature": 1.0})
+    assert len(sent) == 2
+
+
+def test_async_lookups_stay_off_the_event_loop(tmp_path, monkeypatch):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    class RecordingCache(ResponseCache):
+        def get(self, key, role):
+            threads.append(threading.get_ident())
+            return super().get(key, role)
+
+        def put(self, key, model, response):
+            threads.append(threading.get_ident())
+            return super().put(key, model, response)
+
+    cache = RecordingCache(path=str(tmp_path / "llm.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_cache", lambda: cache)
+
+    async def create(**kwargs):
+        return completion("4")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    request = {"model": "deepseek/deepseek-v3.2", "messages": [{"role": "user", "content": "2 + 2"}], "temperature": 0}
+
+    async def main():
+        await acached_completion(client, "tool_selector", **request)
+        return await acached_completion(client, "tool_selector", **request)
+
+    assert asyncio.run(main()).choices[0].message.content == "4"
+    # get, put, get: every SQLite call ran on a worker thread
+    assert len(threads) == 3 and loop_thread not in threads
+
+
+def test_configured_planner_is_answered_from_the_cache(monkeypatch):
+    import yaml
+    from agents import multi_agents
+    from config.llm_config import LLMConfig
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test")
+    monkeypatch.delenv("LLM_MODE", raising=False)
+    monkeypatch.setattr(multi_agents, "get_llm_router", lambda: None)
+    monkeypatch.setattr(LLMConfig, "_llms", {})
+    with open("config/agents.yaml") as f:
+        planner = yaml.safe_load(f)["math_planner"]
+
+    llm = multi_agents.agent_llm(planner)
+    assert isinstance(llm, CachedLLM) and llm.temperature == 0
+    # The real provider behind it, swapped for one that doesn't need the network
+    provider = FakeLLM(model=llm.model, temperature=0.0, calls=[])
+    llm = llm.model_copy(update={"inner": provider})
+
+    assert run_crew(llm).raw == run_crew(llm).raw == "plan_solution"
+    assert len(provider.calls) == 1
+
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from openai.types.chat import ChatCompletion
+from config.llm_cassette import Cassette, CassetteMiss, CassetteOpenAI, replay_llm, wrap_llm
+
+
+class FakeLLM(BaseLLM):
+    """Provider stand-in that counts its calls"""
+
+    calls: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls.append(from_task.name)
+        return f"Thought: done\nFinal Answer: {from_task.name} #{len(self.calls)}"
+
+
+def run_crew(llm):
+    analyst = Agent(role="Analyst", goal="Analyze {topic}", backstory="...", llm=llm)
+    explainer = Agent(role="Explainer", goal="Explain the analysis", backstory="...", llm=llm)
+    analyze = Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst)
+    explain = Task(name="explain_solution", description="Explain", expected_output="Answer", agent=explainer)
+    crew = Crew(agents=[analyst, explainer], tasks=[analyze, explain], process=Process.sequential)
+    return crew.kickoff(inputs={"topic": "x + 1 = 2"})
+
+
+def test_crew_run_replays_without_provider(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    provider = FakeLLM(model="gemini/fake", temperature=0.7, calls=[])
+
+    recorded = run_crew(wrap_llm(provider, Cassette(path, mode="record")))
+    assert provider.calls == ["analyze_problem", "explain_solution"]
+
+    replay = Cassette(path, mode="replay")
+    replayed = run_crew(replay_llm({"model": "gemini/fake", "temperature": 0.7}, replay))
+
+    assert replayed.raw == recorded.raw == "explain_solution #2"
+    assert [t.raw for t in replayed.tasks_output] == [t.raw for t in recorded.tasks_output]
+    assert provider.calls == ["analyze_problem", "explain_solution"]
+    assert replay.stats()["replayed"] == 2 and replay.stats()["misses"] == 0
+
+
+def test_changed_request_is_a_miss(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    run_crew(wrap_llm(FakeLLM(model="gemini/fake", temperature=0.7, calls=[]), Cassette(path, mode="record")))
+
+    # Same prompts at another temperature were never recorded
+    with pytest.raises(CassetteMiss):
+        run_crew(replay_llm({"model": "gemini/fake", "temperature": 0.2}, Cassette(path, mode="replay")))
+
+
+def completion(content):
+    return ChatCompletion.model_validate({
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "deepseek/deepseek-v3.2",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+    })
+
+
+def test_openai_client_replays_with_original_latency(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    sent = []
+
+    def create(**kwargs):
+        sent.append(kwargs)
+        return completion('{"tool": "calculator"}')
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    request = {"model": "deepseek/deepseek-v3.2", "messages": [{"role": "user", "content": "2 + 3"}]}
+    CassetteOpenAI(client, Cassette(path, mode="record")).chat.completions.create(**request, timeout=5)
+
+    replay = Cassette(path, mode="replay", latency="original")
+    # A different per-call timeout is still the same request
+    response = CassetteOpenAI(None, replay).chat.completions.create(**request, timeout=30)
+
+    assert response.choices[0].message.content == '{"tool": "calculator"}'
+    assert response.usage.prompt_tokens == 12
+    assert len(sent) == 1
+
+
+def test_async_client_records_and_replays_streams(tmp_path):
+    import asyncio
+    from openai.types.chat import ChatCompletionChunk
+
+    path = str(tmp_path / "cassette.jsonl")
+
+    def chunk(content):
+        return ChatCompletionChunk.model_validate({
+            "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "deepseek/deepseek-v3.2",
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        })
+
+    async def stream():
+        for content in ("x = ", "2"):
+            yield chunk(content)
+
+    async def create(**kwargs):
+        return stream()
+
+    async def collect(client, request):
+        return [piece.choices[0].delta.content async for piece in await client.chat.completions.create(**request)]
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    request = {"model": "deepseek/deepseek-v3.2", "messages": [{"role": "user", "content": "x - 2 = 0"}], "stream": True}
+    recorded = asyncio.run(collect(CassetteOpenAI(client, Cassette(path, mode="record"), is_async=True), request))
+    replayed = asyncio.run(collect(CassetteOpenAI(None, Cassette(path, mode="replay"), is_async=True), request))
+    assert recorded == replayed == ["x = ", "2"]
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+from openai import AsyncOpenAI, OpenAI
+from config import llm_clients
+from config.llm_clients import HealthProbe
+from config.llm_config import LLMConfig, LLMMode
+
+
+def test_pooled_clients_share_one_connection_pool():
+    get = llm_clients.pooled(OpenAI)
+    first = get(base_url="https://example.invalid/v1", api_key="k1")
+    assert get(base_url="https://example.invalid/v1", api_key="k1") is first
+    assert get(base_url="https://example.invalid/v1", api_key="k2") is not first
+    assert first._client is llm_clients.http_client()
+
+
+def test_async_clients_get_one_pool_per_event_loop():
+    aclient = llm_clients.pooled(AsyncOpenAI, is_async=True)(base_url="https://example.invalid/v1", api_key="k1")
+
+    async def pool():
+        assert aclient.current() is aclient.current()
+        assert aclient._client is llm_clients.http_client(is_async=True)
+        return aclient.current()
+
+    async def closed():
+        client = await pool()
+        http = client._client
+        await llm_clients.aclose()
+        return client, http
+
+    first, http = asyncio.run(closed())
+    assert http.is_closed
+    # A later loop (another asyncio.run, a restarted app) builds a fresh client instead of reusing a dead one
+    assert asyncio.run(pool()) is not first
+
+
+def test_health_probe_is_cached_and_refreshed_in_background():
+    calls = []
+    refreshed = threading.Event()
+
+    def probe(url, timeout):
+        calls.append(url)
+        if len(calls) > 1:
+            refreshed.set()
+            raise ConnectionError("down")
+        return True
+
+    health = HealthProbe("http://localhost:11434", ttl=60, probe=probe)
+    # The first check waits for the probe, later ones are served from cache
+    assert health.healthy() and health.healthy()
+    assert len(calls) == 1
+
+    # Stale: the cached answer comes back at once while a refresh runs
+    health._checked_at -= 120
+    assert health.healthy()
+    assert refreshed.wait(2)
+    for _ in range(100):
+        if health.stats()["probes"] == 2:
+            break
+        threading.Event().wait(0.01)
+    assert not health.healthy()
+    assert len(calls) == 2
+
+
+def test_ollama_check_uses_the_cached_probe(monkeypatch):
+    probe = HealthProbe("http://localhost:11434", probe=lambda url, timeout: False)
+    monkeypatch.setattr(llm_clients, "health_probe", lambda url: probe)
+    with pytest.raises(ValueError, match="Cannot connect to Ollama"):
+        LLMConfig(LLMMode.OLLAMA)
+    assert probe.stats()["probes"] == 1
@@ -0,0 +1,95 @@
+import time
+import asyncio
+
+import pytest
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from config.llm_router import CLOSED, OPEN, LLMRouter, Provider, parse_providers, routed_llm
+
+
+class FakeLLM(BaseLLM):
+    """Provider stand-in with a fixed delay that can be made to fail"""
+
+    delay: float = 0.0
+    fail: bool = False
+    calls: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls.append(list(self.stop_sequences))
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.model} is down")
+        return f"Thought: done\nFinal Answer: {self.model}"
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+        self.calls.append(list(self.stop_sequences))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.model} is down")
+        return f"Thought: done\nFinal Answer: {self.model}"
+
+
+def fake(model, **kwargs):
+    return FakeLLM(model=model, calls=[], **kwargs)
+
+
+def test_slow_primary_is_hedged_to_the_secondary():
+    router = LLMRouter([Provider("google", fake("gemini/slow", delay=1.0)), Provider("openai", fake("openai/fast"))],
+                       hedge_after=0.05)
+    start = time.perf_counter()
+    assert router.call(lambda llm: llm.call([])) == "Thought: done\nFinal Answer: openai/fast"
+    assert time.perf_counter() - start < 0.5
+
+
+def test_failures_open_the_breaker_until_a_trial_succeeds():
+    now = [0.0]
+    primary = Provider("google", fake("gemini/down", fail=True), failures=2, cooldown=30, clock=lambda: now[0])
+    router = LLMRouter([primary, Provider("openai", fake("openai/up"))], hedge=False)
+
+    for _ in range(2):
+        assert router.call(lambda llm: llm.call([])).endswith("openai/up")
+    assert primary.state == OPEN and len(primary.llm.calls) == 2
+
+    # Open: the primary is skipped, not tried
+    router.call(lambda llm: llm.call([]))
+    assert len(primary.llm.calls) == 2
+
+    # After the cooldown one trial call goes through and closes the breaker
+    now[0] += 31
+    primary.llm.fail = False
+    assert router.call(lambda llm: llm.call([])).endswith("gemini/down")
+    assert primary.state == CLOSED
+
+
+def test_async_hedge_cancels_the_loser():
+    router = LLMRouter([Provider("google", fake("gemini/slow", delay=5.0)), Provider("openai", fake("openai/fast"))],
+                       hedge_after=0.05)
+
+    async def main():
+        start = time.perf_counter()
+        answer = await router.acall(lambda llm: llm.acall([]))
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0)
+        return answer, elapsed, len(asyncio.all_tasks())
+
+    answer, elapsed, tasks = asyncio.run(main())
+    assert answer.endswith("openai/fast") and elapsed < 1.0
+    assert tasks == 1
+
+
+def test_crew_fails_over_with_the_agents_stop_words():
+    down, up = fake("gemini/down", fail=True), fake("openai/up")
+    llm = routed_llm(LLMRouter([Provider("google", down), Provider("openai", up)]))
+    analyst = Agent(role="Analyst", goal="Analyze {topic}", backstory="...", llm=llm)
+    task = Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst)
+    result = Crew(agents=[analyst], tasks=[task], process=Process.sequential).kickoff(inputs={"topic": "x + 1 = 2"})
+
+    assert result.raw == "openai/up"
+    assert any("\nObservation:" in stop for stop in up.calls[0])
+
+
+def test_parse_providers():
+    assert parse_providers("google=gemini/gemini-2.5-flash-lite, ollama=ollama/llama3.2:3b,openai") == [
+        ("google", "gemini/gemini-2.5-flash-lite"), ("ollama", "ollama/llama3.2:3b"), ("openai", None)]
@@ -0,0 +1,76 @@
+import pytest
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from agents.crew_metrics import StageUsage
+from agents.escalation import EscalationPolicy, difficulty
+from config.llm_config import LLMConfig, LLMMode
+from config.llm_pricing import cost
+
+
+class FakeLLM(BaseLLM):
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        return "Thought: done\nFinal Answer: ok"
+
+
+def template():
+    analyst = Agent(role="Mathematical Problem Analyst\n", goal="Analyze {topic}", backstory="...",
+                    llm=FakeLLM(model="gemini/gemini-2.5-flash-lite"))
+    verifier = Agent(role="Mathematical Solution Verifier\n", goal="Verify", backstory="...",
+                     llm=FakeLLM(model="gemini/gemini-2.5-flash"))
+    tasks = [Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst),
+             Task(name="verify_solution", description="Verify", expected_output="Verdict", agent=verifier)]
+    return Crew(agents=[analyst, verifier], tasks=tasks, process=Process.sequential)
+
+
+def test_difficulty_ranks_hard_prompts_higher():
+    easy = difficulty("What is 2 + 3?")
+    system = difficulty("Solve the system 2x + 3y = 9, x - y = 1")
+    hard = difficulty("Prove by induction that the series sum 1/n^2 converges, then find its limit.")
+    assert easy < system < hard
+    assert easy < 0.5 <= hard
+
+
+def test_escalation_only_changes_the_run_copy():
+    crew = template()
+    shared = {}
+    policy = EscalationPolicy({"Mathematical Solution Verifier": "gemini/gemini-2.5-pro"},
+                              resolve=lambda model, temperature: shared.setdefault(model, FakeLLM(model=model, temperature=temperature)))
+
+    easy = crew.copy()
+    assert not policy.apply(easy, "What is 2 + 3?")
+
+    hard = crew.copy()
+    assert policy.apply(hard, "Prove that the integral of sin(x)^2 over [0, pi] is pi/2")
+    assert [agent.llm.model for agent in hard.agents] == ["gemini/gemini-2.5-flash-lite", "gemini/gemini-2.5-pro"]
+    assert hard.tasks[1].agent.llm.model == "gemini/gemini-2.5-pro"
+    assert crew.agents[1].llm.model == "gemini/gemini-2.5-flash"
+    # The resolved LLM is shared with other runs; this run gets its own copy to adjust
+    assert hard.agents[1].llm is not shared["gemini/gemini-2.5-pro"]
+    assert policy.stats()["escalated"] == 1 and policy.stats()["kept"] == 1
+
+
+def test_agent_models_resolve_to_modes_and_prices():
+    assert LLMConfig.mode_for_model("gemini/gemini-2.5-pro") == LLMMode.GOOGLE
+    assert LLMConfig.mode_for_model("ollama/llama3.2:3b") == LLMMode.OLLAMA
+    assert LLMConfig.mode_for_model("gpt-4o-mini") == LLMMode.OPENAI
+    with pytest.raises(ValueError):
+        LLMConfig.mode_for_model("nobody/knows")
+
+    assert cost("gemini/gemini-2.5-flash", 1_000_000, 100_000) == pytest.approx(0.55)
+    assert cost("ollama/llama3.2", 5000, 5000) == 0
+    assert cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert cost("gemini-2.5-flash-lite", 1_000_000, 0) == pytest.approx(0.10)
+    assert cost("unknown/model", 10, 10) is None
+
+
+def test_stage_usage_reports_latency_and_cost_per_model():
+    usage = StageUsage()
+    usage.record("verify_solution", "gemini/gemini-2.5-flash", 2.0, {"prompt": 1000, "completion": 200}, 0.0008)
+    usage.record("verify_solution", "gemini/gemini-2.5-flash", 4.0, {"prompt": 1000, "completion": 200}, 0.0008)
+    usage.record("verify_solution", "gemini/gemini-2.5-pro", 9.0, {"prompt": 1000, "completion": 400}, None)
+
+    stages = usage.stats()["verify_solution"]
+    assert stages["gemini/gemini-2.5-flash"]["mean_seconds"] == 3.0
+    assert stages["gemini/gemini-2.5-flash"]["cost"] == pytest.approx(0.0016)
+    assert stages["gemini/gemini-2.5-pro"]["completion_tokens"] == 400
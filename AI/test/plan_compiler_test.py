@@ -0,0 +1,91 @@
+import json
+import pytest
+from types import SimpleNamespace
+
+from tools.plan_compiler import compile_plan, plan_guardrail, PlanCompileError
+from tools.tools import (CalculatorTool, EquationSolverTool, SymbolicMathTool, MatrixToolAgent, StatisticsToolAgent,
+                        ToolRegistry, ToolExecutor)
+
+# =========================
+# Compilation
+# =========================
+def test_compile_system_block_list():
+    plan = """
+    Tool: equation_solver
+    Action: solve_system
+    Equations:
+      - 2*x + 3*y = 9
+      - x - y = 1
+    Variables: [x, y]
+    """
+    assert compile_plan(plan) == {
+        "tool": "equation_solver",
+        "action": "solve_system",
+        "args": {"equations": ["2*x + 3*y = 9", "x - y = 1"], "vars": ["x", "y"]},
+    }
+
+def test_compile_aliases_and_markdown():
+    plan = "```yaml\n**Tool:** Symbolic Math\n**Action:** differentiate\nFunction: x^3 + 2*x\nWith respect to: x\n```"
+    assert compile_plan(plan) == {
+        "tool": "symbolic_math", "action": "derivative", "args": {"expr": "x**3 + 2*x", "var": "x"},
+    }
+
+def test_compile_matrix_and_statistics():
+    matrix = compile_plan("Tool: matrix\nAction: det\nMatrix: [[1, 2], [3, 4]]")
+    assert matrix["action"] == "determinant" and matrix["args"] == {"A": [[1, 2], [3, 4]]}
+
+    stats = compile_plan("Tool: statistics\nAction: average\nData: 1, 2, 3.5")
+    assert stats["args"] == {"data": [1, 2, 3.5]}
+
+def test_compile_calculator_has_no_action():
+    assert compile_plan("Tool: calculator\nExpression: 2 ^ 10") == {
+        "tool": "calculator", "action": None, "args": {"expression": "2 ** 10"},
+    }
+
+def test_compile_accepts_json():
+    call = {"tool": "equation_solver", "action": "solve", "args": {"equation": "x + 2 = 5", "variable": "x"}}
+    assert compile_plan(json.dumps(call)) == {
+        "tool": "equation_solver", "action": "solve_equation", "args": {"equation": "x + 2 = 5", "var": "x"},
+    }
+
+@pytest.mark.parametrize("plan, message", [
+    ("Action: solve_equation", "Missing 'Tool:'"),
+    ("Tool: abacus\nAction: add", "Unknown tool"),
+    ("Tool: matrix\nAction: transpose\nA: [[1]]", "Unknown action"),
+    ("Tool: matrix\nAction: multiply\nA: [[1, 2], [3, 4]]", "missing 'B'"),
+    ("Tool: matrix\nAction: determinant\nA: [[1, 2], [3]]", "same length"),
+    ("Tool: equation_solver\nAction: solve_equation\nEquation: x + 1 = 2\nVar: 2x", "not a variable name"),
+])
+def test_compile_errors(plan, message):
+    with pytest.raises(PlanCompileError, match=message):
+        compile_plan(plan)
+
+# =========================
+# Guardrail
+# =========================
+def test_guardrail_output_runs_on_executor():
+    registry = ToolRegistry()
+    for tool in (CalculatorTool(), EquationSolverTool(), SymbolicMathTool(), MatrixToolAgent(), StatisticsToolAgent()):
+        registry.register(tool)
+
+    ok, call = plan_guardrail(SimpleNamespace(raw="Tool: equation_solver\nAction: solve\nEquation: x + 2 = 5\nVar: x"))
+    assert ok
+    assert ToolExecutor(registry).execute(json.loads(call))[0] == 3
+
+@pytest.mark.parametrize("plan", [
+    "Tool: none\nThe answer follows directly from the definition: 0! = 1",
+    "Tool: geometry\nAction: area\nShape: circle\nRadius: 2",
+    "I think we should solve it",
+])
+def test_guardrail_passes_plans_without_a_tool_call_through(plan):
+    # Neither rejected (retries would fail the request) nor rewritten
+    assert plan_guardrail(SimpleNamespace(raw=plan)) == (True, plan)
+
+def test_function_definitions_are_stripped_and_bad_expressions_rejected():
+    call = compile_plan("Tool: symbolic_math\nAction: derivative\nExpr: f(x) = 2x\nVar: x")
+    assert call["args"] == {"expr": "2x", "var": "x"}
+
+    with pytest.raises(PlanCompileError, match="not a valid expression"):
+        compile_plan("Tool: calculator\nExpression: 2 * (3 +")
+    with pytest.raises(PlanCompileError, match="not an equation"):
+        compile_plan("Tool: symbolic_math\nAction: simplify\nExpr: y = x + x")
@@ -0,0 +1,75 @@
+import time
+import threading
+from types import SimpleNamespace
+
+from agents.speculative import Speculator, confirmed
+
+
+def stage(fn, delay=0.0):
+    """A fake crew stage: records the context it ran on and returns fn(context) as .raw"""
+    calls = []
+
+    def run(context):
+        calls.append(context)
+        time.sleep(delay)
+        return SimpleNamespace(raw=fn(context))
+    run.calls = calls
+    return run
+
+
+def test_verdict_parsing():
+    assert confirmed("The roots check out.\nVerdict: CONFIRMED")
+    assert confirmed("**Verdict:** confirmed")
+    assert not confirmed("x = 3 was wrong, it is x = 4.\nVerdict: CORRECTED")
+    # No verdict: nothing unverified gets committed
+    assert not confirmed("Looks right to me")
+
+
+def test_confirmed_commits_speculative_explanation():
+    speculator = Speculator(max_workers=1)
+    verify = stage(lambda solution: f"{solution} is right. Verdict: CONFIRMED", delay=0.1)
+    explain = stage(lambda context: f"Explained: {context}", delay=0.1)
+
+    verification, explanation, hit, timings = speculator.run("x = 3", verify, explain)
+
+    assert hit
+    assert explanation.raw == "Explained: x = 3"
+    assert explain.calls == ["x = 3"]
+    # Verification and explanation overlapped
+    assert timings["saved"] > 0.05
+    assert speculator.stats()["hits"] == 1 and speculator.stats()["hit_rate"] == 1.0
+
+
+def test_correction_discards_speculation_and_regenerates():
+    speculator = Speculator(max_workers=1)
+    release = threading.Event()
+    verify = stage(lambda solution: "It is x = 4.\nVerdict: CORRECTED")
+    # The speculative run is still going when the verifier finishes
+    explain = stage(lambda context: (context != "x = 3" or release.wait(1)) and f"Explained: {context}")
+
+    verification, explanation, hit, _ = speculator.run("x = 3", verify, explain)
+    release.set()
+
+    assert not hit
+    assert explanation.raw == "Explained: It is x = 4.\nVerdict: CORRECTED"
+    assert explain.calls[-1] == verification.raw
+    stats = speculator.stats()
+    assert stats["misses"] == 1 and stats["hit_rate"] == 0.0
+
+
+def test_failed_speculation_falls_back_to_verified_solution():
+    speculator = Speculator(max_workers=1)
+    verify = stage(lambda solution: "Verdict: CONFIRMED")
+    attempts = []
+
+    def explain(context):
+        attempts.append(context)
+        if len(attempts) == 1:
+            raise RuntimeError("provider timeout")
+        return SimpleNamespace(raw="Explained")
+
+    _, explanation, hit, _ = speculator.run("x = 3", verify, explain)
+
+    assert not hit and explanation.raw == "Explained"
+    assert attempts == ["x = 3", "Verdict: CONFIRMED"]
+    assert speculator.stats()["errors"] == 1
@@ -0,0 +1,105 @@
+import time
+import pytest
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from agents.stage_cache import StageCache, fingerprint, kickoff_cached, stage_key
+
+
+class FakeLLM(BaseLLM):
+    """Answers every task with a fixed final answer and records which task asked"""
+
+    answers: dict = {}
+    calls: list = []
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        self.calls.append(from_task.name)
+        return f"Thought: done\nFinal Answer: {self.answers[from_task.name]}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(path=str(tmp_path / "stages.sqlite3"), max_entries=3, ttl=60)
+
+
+def make_crew(llm):
+    analyst = Agent(role="Analyst", goal="Analyze the math {topic}", backstory="...", llm=llm)
+    planner = Agent(role="Planner", goal="Plan the solution", backstory="...", llm=llm)
+    executor = Agent(role="Executor", goal="Run the tool", backstory="...", llm=llm)
+    analyze = Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst)
+    plan = Task(name="plan_solution", description="Plan", expected_output="Plan", agent=planner, context=[analyze])
+    execute = Task(name="execute_solution", description="Execute", expected_output="Result", agent=executor)
+    return Crew(agents=[analyst, planner, executor], tasks=[analyze, plan, execute], process=Process.sequential)
+
+
+def test_paraphrase_resumes_after_matching_analysis(cache):
+    llm = FakeLLM(model="fake", answers={
+        "analyze_problem": "Linear equation in x",
+        "plan_solution": "Tool: equation_solver",
+        "execute_solution": "x = 1",
+    }, calls=[])
+    template = make_crew(llm)
+
+    first = kickoff_cached(template.copy(), {"topic": "Solve x + 1 = 2"}, cache)
+    stages = []
+    second = kickoff_cached(template.copy(), {"topic": "What x satisfies x + 1 = 2?"}, cache, stages.append)
+
+    assert first.raw == second.raw == "x = 1"
+    # The paraphrase only re-ran the stage that reads the prompt
+    assert llm.calls == ["analyze_problem", "plan_solution", "execute_solution", "analyze_problem"]
+    # Cached stages are still reported to the task callback, in order
+    assert [stage.name for stage in stages] == ["analyze_problem", "plan_solution", "execute_solution"]
+
+    stats = cache.stats()["stages"]
+    assert stats["plan_solution"]["hit_rate"] == 0.5
+    assert stats["analyze_problem"]["hits"] == 0
+
+
+def test_different_upstream_output_is_a_miss(cache):
+    llm = FakeLLM(model="fake", answers={
+        "analyze_problem": "Linear equation in x",
+        "plan_solution": "Tool: equation_solver",
+        "execute_solution": "x = 1",
+    }, calls=[])
+    template = make_crew(llm)
+    kickoff_cached(template.copy(), {"topic": "Solve x + 1 = 2"}, cache)
+
+    llm.answers["analyze_problem"] = "Quadratic equation in x"
+    kickoff_cached(template.copy(), {"topic": "Solve x^2 = 4"}, cache)
+
+    assert llm.calls.count("plan_solution") == 2
+
+
+def test_least_recently_used_outputs_are_evicted(cache):
+    for i in range(3):
+        cache.put("plan_solution", f"k{i}", f"plan {i}")
+        time.sleep(0.01)
+    cache.get("plan_solution", "k0")
+    cache.put("plan_solution", "k3", "plan 3")
+
+    assert cache.get("plan_solution", "k1") is None
+    assert cache.get("plan_solution", "k0") == "plan 0"
+    assert cache.stats()["entries"] == 3
+    assert cache.invalidate("plan_solution") == 3
+
+
+def test_compaction_policy_is_part_of_the_fingerprint():
+    from agents.compaction import ContextCompactor
+
+    analyst = Agent(role="Analyst", goal="Analyze the math {topic}", backstory="...", llm=FakeLLM(model="fake"))
+
+    def analyze(budget):
+        guardrail = ContextCompactor({"analyze_problem": budget}).guardrail("analyze_problem")
+        return Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst,
+                    guardrail=guardrail)
+
+    assert fingerprint(analyze(200)) == fingerprint(analyze(200))
+    assert fingerprint(analyze(200)) != fingerprint(analyze(100))
+
+
+def test_inputs_keep_their_case_in_the_key():
+    template = {"task": "analyze_problem", "goal": "Analyze the math {topic}"}
+    key = lambda topic: stage_key(template, {"topic": topic}, [])
+    assert key("Solve  A x = b\n") == key("Solve A x = b")
+    # A and a are different matrices
+    assert key("Solve A x = b") != key("solve a x = b")
@@ -0,0 +1,47 @@
+import threading
+import time
+import pytest
+from startup import lazy, LOAD_TIMES
+
+
+def test_lazy_builds_once_across_threads():
+    calls = []
+
+    @lazy
+    def expensive():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    assert not expensive.loaded()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(expensive())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert expensive.loaded()
+    assert LOAD_TIMES[f"{__name__}.expensive"] >= 0.05
+
+    expensive.reset()
+    assert not expensive.loaded()
+    assert expensive() is not results[0] and len(calls) == 2
+
+
+def test_lazy_retries_after_failure():
+    attempts = []
+
+    @lazy
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("not yet")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        flaky()
+    assert flaky() == "ok"
+    assert len(attempts) == 2
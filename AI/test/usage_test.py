@@ -0,0 +1,96 @@
+import pytest
+from crewai import Agent, Crew, Process, Task
+from crewai.events import crewai_event_bus
+from crewai.events.types.llm_events import LLMCallType
+from crewai.llms.base_llm import BaseLLM, llm_call_context
+from agents import usage
+from agents.crew_metrics import CrewMetricsListener
+from agents.usage import UsageLedger
+from config.llm_cache import ResponseCache, cached_completion
+from openai.types.chat import ChatCompletion
+
+
+class FakeLLM(BaseLLM):
+    """Provider stand-in that reports Gemini-style usage through the LLM events"""
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        response = "Thought: done\nFinal Answer: ok"
+        with llm_call_context():
+            self._emit_call_started_event(messages=messages, from_task=from_task, from_agent=from_agent)
+            self._emit_call_completed_event(
+                response=response, call_type=LLMCallType.LLM_CALL, from_task=from_task,
+                from_agent=from_agent, messages=messages,
+                usage={"prompt_token_count": 1000, "completion_tokens": 300, "reasoning_tokens": 100},
+            )
+        return response
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = UsageLedger(path=str(tmp_path / "usage.sqlite3"))
+    monkeypatch.setattr(usage, "get_ledger", lambda: ledger)
+    return ledger
+
+
+def test_calls_are_attributed_to_the_tracked_request(ledger):
+    with usage.tracking("r1", tenant="acme") as request:
+        usage.record("tool_selector", "gemini-2.5-flash-lite", {"prompt": 1_000_000, "completion": 0})
+        usage.record("explainer", "gemini-2.5-flash-lite", {"prompt": 0, "completion": 1_000_000, "reasoning": 10})
+    assert usage.current() is None
+    usage.record("tool_selector", "gemini-2.5-flash-lite", {"prompt": 5})
+
+    totals = request.totals()
+    assert totals["request_id"] == "r1" and totals["calls"] == 2
+    assert totals["cost"] == pytest.approx(0.10 + 0.40)
+    assert totals["stages"]["explainer"]["reasoning_tokens"] == 10
+
+    assert [call["stage"] for call in ledger.request("r1")] == ["tool_selector", "explainer"]
+    by_tenant = ledger.summary("tenant")["groups"]
+    assert by_tenant["acme"]["requests"] == 1 and by_tenant["None"]["prompt_tokens"] == 5
+    assert ledger.summary("agent", tenant="acme")["groups"]["tool_selector"]["cost"] == pytest.approx(0.10)
+    with pytest.raises(ValueError):
+        ledger.summary("prompt")
+
+
+def test_crew_calls_are_broken_down_by_stage(ledger):
+    analyst = Agent(role="Mathematical Problem Analyst\n", goal="Analyze {topic}", backstory="...",
+                    llm=FakeLLM(model="gemini/gemini-2.5-flash-lite"))
+    verifier = Agent(role="Mathematical Solution Verifier\n", goal="Verify", backstory="...",
+                     llm=FakeLLM(model="gemini/gemini-2.5-flash"))
+    tasks = [Task(name="analyze_problem", description="Analyze", expected_output="Analysis", agent=analyst),
+             Task(name="verify_solution", description="Verify", expected_output="Verdict", agent=verifier)]
+    crew = Crew(agents=[analyst, verifier], tasks=tasks, process=Process.sequential)
+
+    with crewai_event_bus.scoped_handlers():
+        CrewMetricsListener()
+        with usage.tracking(tenant="acme") as request:
+            crew.kickoff(inputs={"topic": "x + 1 = 2"})
+
+    stages = request.totals()["stages"]
+    assert set(stages) == {"analyze_problem", "verify_solution"}
+    assert stages["verify_solution"] == {
+        "calls": 1, "prompt_tokens": 1000, "completion_tokens": 300, "reasoning_tokens": 100,
+        "cost": pytest.approx((1000 * 0.30 + 300 * 2.50) / 1_000_000),
+    }
+    agents = ledger.summary("agent")["groups"]
+    assert agents["Mathematical Problem Analyst"]["requests"] == 1
+
+
+def test_cached_completion_hits_spend_no_tokens(tmp_path, monkeypatch):
+    monkeypatch.setattr("config.llm_cache.get_cache", lambda: cache)
+    cache = ResponseCache(path=str(tmp_path / "llm.sqlite3"))
+    completion = ChatCompletion.model_validate({
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "gemini-2.5-flash-lite",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "4"}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 1, "total_tokens": 13},
+    })
+
+    class Client:
+        class chat:
+            class completions:
+                create = staticmethod(lambda **kwargs: completion)
+
+    request = {"model": "gemini-2.5-flash-lite", "messages": [{"role": "user", "content": "2 + 2"}], "temperature": 0}
+    assert cached_completion(Client, "tool_selector", **request).usage.prompt_tokens == 12
+    assert cached_completion(Client, "tool_selector", **request).usage is None
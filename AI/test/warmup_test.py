@@ -0,0 +1,21 @@
+from warmup import Readiness
+
+
+def test_readiness_records_checks():
+    readiness = Readiness()
+    assert readiness.check("ok_step", lambda: None)
+    assert not readiness.check("bad_step", lambda: 1 / 0)
+    assert not readiness.ready
+
+    state = readiness.to_dict()
+    assert state["status"] == "starting"
+    assert state["checks"]["ok_step"]["status"] == "ok"
+    assert state["checks"]["bad_step"]["status"] == "error"
+
+
+def test_readiness_finish():
+    readiness = Readiness()
+    readiness.finish(True)
+    assert readiness.ready
+    readiness.finish(False)
+    assert readiness.to_dict()["status"] == "failed"
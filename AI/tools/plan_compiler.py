@@ -0,0 +1,390 @@
+"""
+Deterministic compiler from the math_planner's YAML-like plan
+
+    Tool: equation_solver
+    Action: solve_system
+    Equations:
+      - 2*x + 3*y = 9
+      - x - y = 1
+    Variables: [x, y]
+
+to the tool call ToolExecutor expects:
+
+    {"tool": "equation_solver", "action": "solve_system",
+     "args": {"equations": ["2*x + 3*y = 9", "x - y = 1"], "vars": ["x", "y"]}}
+
+It replaces the input_formatter agent, which spent a whole LLM call on this.
+"""
+
+import re
+import json
+import logging
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class PlanCompileError(ValueError):
+    """The plan cannot be turned into a valid tool call; the message says what to fix"""
+
+
+# =============================================================================================================
+# ARGUMENT TYPES
+# =============================================================================================================
+
+def _split_list(text: str) -> List[str]:
+    """Split "[x, y]" / "x, y" on top-level commas, keeping nested brackets intact"""
+    text = text.strip()
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1]
+    items, depth, current = [], 0, ""
+    for char in text:
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        if char in ",;" and depth == 0:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return [item.strip().strip("'\"") for item in items if item.strip()]
+
+
+def _expression(value: Any) -> str:
+    """A sympy-parsable expression string ('^' is XOR in Python, so it becomes '**')"""
+    if isinstance(value, list):
+        if len(value) != 1:
+            raise PlanCompileError(f"expected a single expression, got {len(value)}")
+        value = value[0]
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str) or not value.strip():
+        raise PlanCompileError("expected a non-empty expression")
+    value = value.strip().strip("`'\"").rstrip(".")
+    value = value.replace("^", "**").replace("−", "-").replace("×", "*").replace("÷", "/")
+    _check_parses(value)
+    return value
+
+
+# "f(x) = ..." in front of the expression a derivative or integral is taken of
+FUNCTION_DEFINITION = re.compile(r"^[A-Za-z]\w*\s*\(\s*[A-Za-z]\w*\s*\)\s*=\s*")
+
+
+def _function(value: Any) -> str:
+    """An expression to differentiate, integrate or simplify: no '=' except a leading "f(x) =" """
+    value = FUNCTION_DEFINITION.sub("", _expression(value))
+    if "=" in value:
+        raise PlanCompileError(f"expected an expression, not an equation: {value!r}")
+    return value
+
+
+def _check_parses(value: str) -> None:
+    """Reject what the tools' sympy parser would choke on (each side of an equation)"""
+    from sympy.parsing.sympy_parser import (implicit_multiplication_application, parse_expr,
+                                            standard_transformations)
+    transformations = standard_transformations + (implicit_multiplication_application,)
+    for side in value.split("="):
+        try:
+            parse_expr(side, transformations=transformations, evaluate=False)
+        except Exception:
+            raise PlanCompileError(f"{value!r} is not a valid expression")
+
+
+def _symbol(value: Any) -> str:
+    if isinstance(value, list):
+        if len(value) != 1:
+            raise PlanCompileError(f"expected a single variable, got {len(value)}")
+        value = value[0]
+    value = str(value).strip().strip("'\"")
+    if not re.fullmatch(r"[A-Za-z_]\w*", value):
+        raise PlanCompileError(f"{value!r} is not a variable name")
+    return value
+
+
+def _expression_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = _split_list(value)
+    if not isinstance(value, list) or not value:
+        raise PlanCompileError("expected a non-empty list of expressions")
+    return [_expression(item) for item in value]
+
+
+def _symbol_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = _split_list(value)
+    if not isinstance(value, list) or not value:
+        raise PlanCompileError("expected a non-empty list of variables")
+    return [_symbol(item) for item in value]
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if isinstance(value, bool):
+        raise PlanCompileError(f"expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        raise PlanCompileError(f"expected a number, got {value!r}")
+    return int(number) if number.is_integer() else number
+
+
+def _number_list(value: Any) -> List[float]:
+    if isinstance(value, str):
+        value = _split_list(value)
+    if not isinstance(value, list) or not value:
+        raise PlanCompileError("expected a non-empty list of numbers")
+    return [_number(item) for item in value]
+
+
+def _matrix(value: Any) -> List[List[float]]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value.replace("'", '"'))
+        except ValueError:
+            raise PlanCompileError(f"expected a matrix like [[1, 2], [3, 4]], got {value!r}")
+    if isinstance(value, list) and value and all(isinstance(row, str) for row in value):
+        # Block list of rows: "- [1, 2]" / "- [3, 4]"
+        value = [_number_list(row) for row in value]
+    if not isinstance(value, list) or not value or not all(isinstance(row, list) and row for row in value):
+        raise PlanCompileError("expected a matrix like [[1, 2], [3, 4]]")
+    width = len(value[0])
+    if any(len(row) != width for row in value):
+        raise PlanCompileError("matrix rows must all have the same length")
+    return [[_number(cell) for cell in row] for row in value]
+
+
+# =============================================================================================================
+# TOOL SCHEMAS
+# =============================================================================================================
+
+# Argument spec: (name, converter, required, aliases the planner uses for it)
+ArgSpec = Tuple[str, Callable[[Any], Any], bool, Tuple[str, ...]]
+
+EXPR_ALIASES = ("expression", "function", "f", "equation", "integrand")
+VAR_ALIASES = ("variable", "variables", "vars", "with_respect_to", "wrt", "respect_to")
+
+SCHEMAS: Dict[str, Dict[Optional[str], List[ArgSpec]]] = {
+    "calculator": {
+        None: [("expression", _expression, True, ("expr", "equation", "input", "calculation"))],
+    },
+    "equation_solver": {
+        "solve_equation": [
+            ("equation", _expression, True, ("equations", "expr", "expression")),
+            ("var", _symbol, True, VAR_ALIASES + ("unknown", "solve_for")),
+        ],
+        "solve_system": [
+            ("equations", _expression_list, True, ("equation", "system")),
+            ("vars", _symbol_list, True, ("variables", "var", "unknowns", "solve_for")),
+        ],
+    },
+    "symbolic_math": {
+        "derivative": [("expr", _function, True, EXPR_ALIASES), ("var", _symbol, True, VAR_ALIASES)],
+        "integral": [("expr", _function, True, EXPR_ALIASES), ("var", _symbol, True, VAR_ALIASES)],
+        "simplify": [("expr", _function, True, EXPR_ALIASES)],
+    },
+    "matrix": {
+        action: [("A", _matrix, True, ("a", "matrix", "matrix_a", "m"))]
+        + ([("B", _matrix, True, ("b", "matrix_b"))] if action in ("add", "multiply") else [])
+        for action in ("add", "multiply", "determinant", "inverse", "eigen")
+    },
+    "statistics": {
+        **{
+            action: [("data", _number_list, True, ("values", "numbers", "list", "dataset", "sample"))]
+            for action in ("mean", "median", "variance", "std")
+        },
+        "probability": [
+            ("favorable", _number, True, ("favorable_outcomes", "successes")),
+            ("total", _number, True, ("total_outcomes", "outcomes", "n")),
+        ],
+        "normal_pdf": [
+            ("x", _number, True, ("value",)),
+            ("mu", _number, False, ("mean",)),
+            ("sigma", _number, False, ("std", "standard_deviation", "sd")),
+        ],
+    },
+}
+
+TOOL_ALIASES = {
+    "calc": "calculator", "calculate": "calculator",
+    "solver": "equation_solver", "equation": "equation_solver", "equations": "equation_solver",
+    "symbolic": "symbolic_math", "sympy": "symbolic_math",
+    "matrix_tool": "matrix", "matrices": "matrix",
+    "stats": "statistics", "statistic": "statistics",
+}
+
+ACTION_ALIASES = {
+    "solve": "solve_equation", "equation": "solve_equation",
+    "system": "solve_system", "solve_equations": "solve_system",
+    "differentiate": "derivative", "diff": "derivative", "derive": "derivative",
+    "integrate": "integral", "antiderivative": "integral",
+    "simplification": "simplify",
+    "det": "determinant", "inv": "inverse", "eigenvalues": "eigen", "eig": "eigen",
+    "mul": "multiply", "product": "multiply", "sum": "add",
+    "average": "mean", "standard_deviation": "std", "stdev": "std",
+}
+
+
+def _key(name: str) -> str:
+    """Normalize planner keys and names: "Matrix A" → "matrix_a" """
+    return re.sub(r"[\s\-]+", "_", str(name).strip().strip("*`'\"").lower())
+
+
+# =============================================================================================================
+# PARSER
+# =============================================================================================================
+
+def _inline_value(value: str) -> Any:
+    """Inline value: JSON-looking lists ("[[1, 2], [3, 4]]", "[1, 2]") are parsed, "[x, y]" is split"""
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return _split_list(value)
+    if value.lower() in ("null", "none", "~"):
+        return None
+    return value
+
+
+def parse_plan(text: str) -> Dict[str, Any]:
+    """
+    Parse planner output into a flat dict of normalized keys.
+
+    Accepts a JSON object, or "Key: value" lines where a value may be an
+    inline list ([x, y]) or a block of "- item" lines under an empty key.
+    Markdown fences and bullet/bold decoration are ignored.
+    """
+    text = re.sub(r"```(?:\w+)?", "", text or "").strip()
+
+    match = re.search(r"\{[\s\S]*\}", text)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            args = data.get("args") if isinstance(data.get("args"), dict) else {}
+            flat = {_key(k): v for k, v in data.items() if k != "args"}
+            flat.update({_key(k): v for k, v in args.items()})
+            return flat
+
+    result: Dict[str, Any] = {}
+    current_key = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if line.startswith("- ") or line == "-":
+            if current_key is None:
+                continue
+            item = _inline_value(line[1:].strip())
+            if not isinstance(result.get(current_key), list):
+                result[current_key] = []
+            result[current_key].append(item)
+            continue
+
+        match = re.match(r"^[*\s]*([A-Za-z_][\w \-]*?)[*\s]*:\s*(.*)$", line)
+        if not match:
+            continue
+        key, value = _key(match.group(1)), match.group(2).strip().lstrip("*").strip()
+        if value:
+            result[key] = _inline_value(value)
+            current_key = None
+        else:
+            result[key] = []
+            current_key = key
+
+    return result
+
+
+# =============================================================================================================
+# COMPILER
+# =============================================================================================================
+
+def _resolve_tool(plan: Dict[str, Any]) -> str:
+    tool = plan.get("tool")
+    if not tool:
+        raise PlanCompileError(f"Missing 'Tool:'. Use one of: {', '.join(SCHEMAS)}")
+    tool = _key(tool)
+    tool = TOOL_ALIASES.get(tool, tool)
+    if tool not in SCHEMAS:
+        raise PlanCompileError(f"Unknown tool {plan.get('tool')!r}. Use one of: {', '.join(SCHEMAS)}")
+    return tool
+
+
+def _resolve_action(tool: str, plan: Dict[str, Any]) -> Optional[str]:
+    actions = SCHEMAS[tool]
+    if list(actions) == [None]:
+        # calculator takes no action
+        return None
+
+    action = plan.get("action")
+    if not action:
+        raise PlanCompileError(f"Missing 'Action:' for {tool}. Use one of: {', '.join(actions)}")
+    action = _key(action)
+    action = ACTION_ALIASES.get(action, action)
+
+    if tool == "equation_solver" and action == "solve_equation":
+        # "solve" with several equations is a system
+        equations = plan.get("equations")
+        if isinstance(equations, list) and len(equations) > 1:
+            action = "solve_system"
+
+    if action not in actions:
+        raise PlanCompileError(
+            f"Unknown action {plan.get('action')!r} for {tool}. Use one of: {', '.join(actions)}"
+        )
+    return action
+
+
+def compile_plan(text: str) -> Dict[str, Any]:
+    """
+    Compile planner output into {"tool", "action", "args"} for ToolExecutor.
+
+    Raises:
+        PlanCompileError: Unknown tool/action, missing or malformed arguments
+    """
+    plan = parse_plan(text)
+    tool = _resolve_tool(plan)
+    action = _resolve_action(tool, plan)
+
+    args: Dict[str, Any] = {}
+    errors = []
+    for name, convert, required, aliases in SCHEMAS[tool][action]:
+        key = next((k for k in (_key(name),) + aliases if plan.get(k) not in (None, [], "")), None)
+        if key is None:
+            if required:
+                errors.append(f"missing '{name}'")
+            continue
+        try:
+            args[name] = convert(plan[key])
+        except PlanCompileError as e:
+            errors.append(f"'{name}': {e}")
+
+    if errors:
+        raise PlanCompileError(f"Invalid arguments for {tool}.{action or 'evaluate'}: " + "; ".join(errors))
+    return {"tool": tool, "action": action, "args": args}
+
+
+def plan_guardrail(output) -> Tuple[bool, str]:
+    """
+    crewai Task guardrail for plan_solution.
+
+    A plan that compiles is replaced by the JSON tool call; anything else
+    (no tool needed, a tool or argument the compiler doesn't know) is passed
+    on to math_executor unchanged, as before the compiler existed. It never
+    rejects, so a plan can't fail the request after the guardrail retries.
+    """
+    try:
+        return True, json.dumps(compile_plan(output.raw))
+    except PlanCompileError as e:
+        logger.info(f"Plan not compiled ({e}), passing it to the executor as written")
+        return True, output.raw
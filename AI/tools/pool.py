@@ -0,0 +1,13 @@
+import os
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Math tools are CPU-bound (sympy, numpy); async callers run them here so they
+# never block the event loop. Kept apart from tools.tools, which imports crewai.
+TOOL_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("AI_TOOL_WORKERS", "4")), thread_name_prefix="tools")
+
+
+async def in_tool_pool(fn, *args):
+    """Run a blocking tool-side callable on TOOL_POOL and await its result"""
+    return await asyncio.get_running_loop().run_in_executor(TOOL_POOL, fn, *args)
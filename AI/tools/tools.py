@@ -1,9 +1,10 @@
-from .math_tools import Calculator, EquationSolver, SymbolicMath, MatrixTool, StatisticsTool
 from .preprocessing_tools import InputProcessing
+from metrics import instrument_tool
 from abc import ABC, abstractmethod
 from crewai.tools import BaseTool
 from pydantic import BaseModel, PrivateAttr
 from typing import Optional, List
+from tools.pool import in_tool_pool
 
 class CalculatorArgs(BaseModel):
     expression: str
@@ -42,6 +43,7 @@ class CalculatorTool(BaseTool):
         from .math_tools import Calculator
         self._calc = Calculator()
 
+    @instrument_tool
     def _run(self, expression: str, action: str | None = None):
         return self._calc.evaluate(expression)
 
@@ -60,6 +62,7 @@ class EquationSolverTool(BaseTool):
         from .math_tools import EquationSolver
         self._solver = EquationSolver()
 
+    @instrument_tool
     def _run(
         self,
         action: str,
@@ -93,6 +96,7 @@ class SymbolicMathTool(BaseTool):
         from .math_tools import SymbolicMath
         self._sym = SymbolicMath()
 
+    @instrument_tool
     def _run(self, action: str, expr: str, var: str | None = None):
         if action == "derivative":
             if var is None:
@@ -122,6 +126,7 @@ class MatrixToolAgent(BaseTool):
         from .math_tools import MatrixTool
         self._m = MatrixTool()
 
+    @instrument_tool
     def _run(self, action: str, A: list | None = None, B: list | None = None):
         if action == "add":
             return self._m.add(A, B)
@@ -148,6 +153,7 @@ class StatisticsToolAgent(BaseTool):
         from .math_tools import StatisticsTool
         self._stats = StatisticsTool()
 
+    @instrument_tool
     def _run(self, 
             action: str,
             data: list | None = None,
@@ -188,6 +194,7 @@ class InputProcessingTool(BaseTool):
         super().__init__()
         self._processor = InputProcessing()
 
+    @instrument_tool
     def _run(self, raw_input: str):
         """
         Process raw input string and extract tool, action, and parameters.
@@ -235,4 +242,8 @@ class ToolExecutor:
     def execute(self, call: dict):
         tool = self.registry.get(call["tool"])
         action = call.get("action")
-        return tool.run(action=action, **call["args"])
\ No newline at end of file
+        return tool.run(action=action, **call["args"])
+    
+    async def aexecute(self, call: dict):
+        """execute() for async callers, offloaded to TOOL_POOL"""
+        return await in_tool_pool(self.execute, call)
\ No newline at end of file
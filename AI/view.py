@@ -1,14 +1,54 @@
-from agents.crew_run import run
-from fastapi import Form, APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from agents.crew_run import run, arun, stream, get_answer_cache, get_stage_cache, resolve_pipeline, router as fast_path
+from agents.admission import AdmissionController, AdmissionRejected, Priority
+from agents.batch import run_batch, DEFAULT_CONCURRENCY, DEFAULT_ITEM_TIMEOUT, MAX_CONCURRENCY
+from agents.deadline import Deadline, DeadlineExceeded, PartialAnswer, DEFAULT_TIMEOUT
+from agents.jobs import JobManager, JobQueueFull
+from agents.results import extract_answer
+from agents import usage
+from contextlib import ExitStack
+from fastapi import Form, APIRouter, HTTPException, Header, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from metrics import ADMISSION_REJECTIONS, REQUESTS_IN_FLIGHT, REQUEST_DURATION, render as render_metrics
+from pydantic import BaseModel, Field
+from startup import lazy, report as startup_report
+from typing import Optional, Dict, Any, List
+import asyncio
+import json
 import logging
+import os
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Bounded, prioritized admission in front of the crew for /chat, /chat/stream and /chat/batch.
+# Requests queue on the event loop; each admitted one runs on a worker thread, so
+# AI_MAX_CONCURRENT_CREWS should stay below the threadpool size (anyio's default is 40)
+admission = AdmissionController()
+# /chat/async requests hold no thread while they wait on LLMs, so many more can run at once
+async_admission = AdmissionController(max_concurrent=int(os.getenv("AI_MAX_CONCURRENT_ASYNC", "256")))
+
+# Background crew runs for /chat/jobs
+# (a job's timeout starts when it starts running, not when it is queued)
+jobs = JobManager(runner=lambda prompt, task_callback, timeout=None, **options: run(
+    inputs=prompt, task_callback=task_callback, deadline=Deadline.after(timeout), **options))
+
+# How often the SSE stream checks a job for new events (seconds)
+JOB_EVENTS_POLL_INTERVAL = 0.25
+# Send an SSE comment after this many idle seconds so proxies keep the connection open
+JOB_EVENTS_KEEPALIVE = 15.0
+
+# Shared secret for /admin endpoints; when unset they are open (local development)
+ADMIN_TOKEN = os.getenv("AI_ADMIN_TOKEN")
+
+# Largest number of prompts accepted by one /chat/batch request
+BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "1000"))
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
 class ChatRequest(BaseModel):
     """Chat request schema"""
     prompt: str
@@ -18,18 +58,157 @@ class ChatResponse(BaseModel):
     response: str
     status: str = "success"
     error: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    """Batch chat request schema"""
+    prompts: List[str]
+    concurrency: int = Field(DEFAULT_CONCURRENCY, ge=1, le=MAX_CONCURRENCY)
+    timeout: float = Field(DEFAULT_ITEM_TIMEOUT, gt=0)
+    pipeline: Optional[str] = None
+
+class JobResponse(BaseModel):
+    """Background chat job schema"""
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stages: List[Dict[str, Any]] = []
+    result: Optional[str] = None
+    error: Optional[str] = None
+
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that releases an admission slot however the stream ends.
+
+    Closing the slot from the generator would leak it when the client
+    disconnects (the generator is abandoned, not closed) and Starlette skips
+    background tasks on a disconnect, so it is released once the response is done.
+    """
+
+    def __init__(self, content, slot: ExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.close()
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _require_admin(token: Optional[str]) -> None:
+    """Reject admin calls that don't carry AI_ADMIN_TOKEN (when it is configured)"""
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _client_id(request: Request, x_client_id: Optional[str]) -> str:
+    """Identify the caller for per-client limits: explicit header, else remote address"""
+    if x_client_id:
+        return x_client_id
+    return request.client.host if request.client else "unknown"
+
+async def _admit(request: Request, x_client_id: Optional[str], priority: Priority,
+                 x_deadline: Optional[float]) -> ExitStack:
+    """
+    Wait for an interactive endpoint's admission slot (raises AdmissionRejected).
+
+    The wait happens on the event loop, so a queued request holds no worker
+    thread and the admission queue (priorities, deadlines, queue_full 503s)
+    decides who waits, not the threadpool's. Closing the returned ExitStack
+    releases the slot, from any thread.
+    """
+    slot = ExitStack()
+    slot.callback(await admission.acquire_async(
+        _client_id(request, x_client_id),
+        priority=priority,
+        deadline=x_deadline,
+    ))
+    return slot
+
+def _priority(value: Optional[str]) -> Priority:
+    """Validate the X-Priority header up front (422 for unknown classes)"""
+    try:
+        return Priority.parse(value)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+def _release_when_settled(slot: ExitStack, deadline: Optional[Deadline]) -> None:
+    """
+    Free an admission slot once the request's pipeline thread has exited.
+
+    A pipeline abandoned at its deadline keeps making LLM calls until its
+    current stage ends, so its slot is only released then (Deadline.on_settled).
+    """
+    if deadline is None:
+        slot.close()
+    else:
+        deadline.on_settled(slot.close)
+
+def _pipeline(name: Optional[str]) -> str:
+    """Validate the requested pipeline up front (422 for unknown names)"""
+    try:
+        return resolve_pipeline(name)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+def _rejected(e: AdmissionRejected) -> JSONResponse:
+    """429/503 response with Retry-After for a shed request"""
+    ADMISSION_REJECTIONS.labels(e.reason).inc()
+    logger.warning(f"Request rejected ({e.reason}): {str(e)}")
+    return JSONResponse(
+        status_code=e.status_code,
+        content=ChatResponse(response="", status="rejected", error=str(e)).model_dump(),
+        headers={"Retry-After": e.retry_after_header},
+    )
+
+@lazy
+def _get_text_generator():
+    """Local fine-tuned Qwen generator, loaded on first use (torch + weights)"""
+    from load_models import TextGenerating
+    return TextGenerating()
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(prompt: str = Form(...)) -> ChatResponse:
+async def chat(
+    request: Request,
+    prompt: str = Form(...),
+    pipeline: Optional[str] = Form(None),
+    x_client_id: Optional[str] = Header(None),
+    x_priority: Optional[str] = Header(None),
+    x_deadline: Optional[float] = Header(None),
+    x_timeout: Optional[float] = Header(None, gt=0),
+    x_request_id: Optional[str] = Header(None),
+) -> ChatResponse:
     """
     Process user prompt through the math crew and return the final answer.
     
     Args:
         prompt: User's mathematical problem
+        pipeline: "crew" (five agents), "lean" (tool selector + tool +
+            explainer) or "speculative" (crew, explaining while verifying);
+            defaults to AI_PIPELINE
+        x_client_id: Caller identity for per-client limits (default: remote address)
+        x_priority: "interactive" (default) or "batch"
+        x_deadline: Seconds the client will wait for work to start; requests
+            whose projected queue wait exceeds it are rejected with 503
+        x_timeout: Seconds the client will wait for the answer, queueing
+            included (default AI_REQUEST_TIMEOUT). When it runs out the best
+            stage output so far is returned with status "partial", or a 504
+            if there is none yet
+        x_request_id: Id the request's LLM usage is recorded under (default: random)
         
     Returns:
-        ChatResponse with the agent's answer or error message
+        ChatResponse with the agent's answer or error message (metadata
+        carries the request id and its token and cost totals by stage), or
+        a 429/503 with Retry-After when the request is shed
     """
+    pipeline = _pipeline(pipeline)
+    priority = _priority(x_priority)
+    deadline = Deadline.after(x_timeout or DEFAULT_TIMEOUT)
     try:
         if not prompt or not prompt.strip():
             raise ValueError("Prompt cannot be empty")
@@ -37,48 +216,491 @@ def chat(prompt: str = Form(...)) -> ChatResponse:
         logger.info(f"Processing prompt: {prompt}")
         
         # Run the crew to get the result
-        result = run(inputs=prompt)
-        
-        # Extract the final answer from the crew output
-        if result is None:
-            raise ValueError("No response from agents")
-        
-        # Extract answer from different possible attributes
-        answer = None
+        client = _client_id(request, x_client_id)
+        with usage.tracking(x_request_id, tenant=client) as request_usage:
+            slot = await _admit(request, x_client_id, priority, x_deadline)
+            try:
+                with REQUESTS_IN_FLIGHT.labels("chat").track_inprogress(), REQUEST_DURATION.labels("chat").time():
+                    # Only admitted requests take a worker thread
+                    result = await run_in_threadpool(run, inputs=prompt, pipeline=pipeline, deadline=deadline)
+            finally:
+                _release_when_settled(slot, deadline)
         
-        # Try .raw first (most common from CrewAI)
-        if hasattr(result, 'raw'):
-            answer = str(result.raw).strip()
-        # Try .output
-        elif hasattr(result, 'output'):
-            answer = str(result.output).strip()
-        # Try string conversion
-        elif result:
-            answer = str(result).strip()
+        return _chat_response(result, request_usage)
+    
+    except Exception as e:
+        return _chat_error(e)
+
+@router.post("/chat/async", response_model=ChatResponse)
+async def chat_async(
+    request: Request,
+    prompt: str = Form(...),
+    pipeline: Optional[str] = Form(None),
+    x_client_id: Optional[str] = Header(None),
+    x_priority: Optional[str] = Header(None),
+    x_deadline: Optional[float] = Header(None),
+    x_timeout: Optional[float] = Header(None, gt=0),
+    x_request_id: Optional[str] = Header(None),
+) -> ChatResponse:
+    """
+    Same as /chat, but runs on the event loop instead of a worker thread.
+    
+    LLM calls are awaited and tools run on a small thread pool, so a worker
+    can keep hundreds of requests in flight (AI_MAX_CONCURRENT_ASYNC) without
+    one thread each. Takes the same fields and headers as /chat.
+    """
+    pipeline = _pipeline(pipeline)
+    priority = _priority(x_priority)
+    deadline = Deadline.after(x_timeout or DEFAULT_TIMEOUT)
+    try:
+        if not prompt or not prompt.strip():
+            raise ValueError("Prompt cannot be empty")
         
-        if not answer:
-            raise ValueError("Empty response from agents")
+        logger.info(f"Processing prompt: {prompt}")
         
-        logger.info(f"Generated answer: {answer}")
+        client = _client_id(request, x_client_id)
+        with usage.tracking(x_request_id, tenant=client) as request_usage:
+            async with async_admission.admit_async(
+                client, priority=priority, deadline=x_deadline,
+            ):
+                with REQUESTS_IN_FLIGHT.labels("chat_async").track_inprogress(), REQUEST_DURATION.labels("chat_async").time():
+                    result = await arun(inputs=prompt, pipeline=pipeline, deadline=deadline)
         
+        return _chat_response(result, request_usage)
+    
+    except Exception as e:
+        return _chat_error(e)
+
+def _chat_response(result, request_usage: Optional[usage.RequestUsage] = None) -> ChatResponse:
+    """ChatResponse for a finished /chat run (raises ValueError when there is no answer)"""
+    # Extract the final answer from the crew output
+    if result is None:
+        raise ValueError("No response from agents")
+    
+    answer = extract_answer(result)
+    
+    if not answer:
+        raise ValueError("Empty response from agents")
+    
+    logger.info(f"Generated answer: {answer}")
+    metadata = {"request_id": request_usage.request_id, "usage": request_usage.totals()} if request_usage else None
+    
+    if isinstance(result, PartialAnswer):
         return ChatResponse(
             response=answer,
-            status="success"
+            status="partial",
+            error=f"Deadline exceeded in {result.expired_stage}; returning the {result.stage} output",
+            metadata=metadata
         )
     
-    except ValueError as ve:
-        logger.error(f"Validation error: {str(ve)}")
-        return ChatResponse(
-            response="",
-            status="error",
-            error=f"Validation error: {str(ve)}"
+    return ChatResponse(
+        response=answer,
+        status="success",
+        metadata=metadata
+    )
+
+def _chat_error(e: Exception):
+    """Map a /chat failure to its response: shed, timed out, invalid or failed"""
+    if isinstance(e, AdmissionRejected):
+        return _rejected(e)
+    
+    if isinstance(e, DeadlineExceeded):
+        logger.warning(f"Deadline exceeded: {str(e)}")
+        return JSONResponse(
+            status_code=504,
+            content=ChatResponse(response="", status="timeout", error=str(e)).model_dump(),
         )
     
-    except Exception as e:
-        logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
+    if isinstance(e, ValueError):
+        logger.error(f"Validation error: {str(e)}")
         return ChatResponse(
             response="",
             status="error",
-            error=f"Failed to process prompt: {str(e)}"
+            error=f"Validation error: {str(e)}"
         )
+    
+    logger.error(f"Error processing prompt: {str(e)}", exc_info=True)
+    return ChatResponse(
+        response="",
+        status="error",
+        error=f"Failed to process prompt: {str(e)}"
+    )
+
+@router.post("/chat/jobs", response_model=JobResponse, status_code=202)
+def submit_chat_job(
+    prompt: str = Form(...),
+    pipeline: Optional[str] = Form(None),
+    timeout: Optional[float] = Form(None, gt=0),
+) -> JobResponse:
+    """
+    Queue a prompt for background processing and return its job id immediately.
+
+    Progress can be polled at /chat/jobs/{job_id} or streamed from
+    /chat/jobs/{job_id}/events as each crew task finishes. With a timeout
+    (seconds from when the job starts) the job finishes with the best stage
+    output so far once it runs out.
+    """
+    if not prompt or not prompt.strip():
+        raise HTTPException(status_code=422, detail="Prompt cannot be empty")
+    pipeline = _pipeline(pipeline)
+
+    try:
+        job = jobs.submit(prompt, pipeline=pipeline, timeout=timeout)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    logger.info(f"Queued job {job.id} for prompt: {prompt}")
+    return JobResponse(**job.to_dict())
+
+@router.get("/chat/jobs/{job_id}", response_model=JobResponse)
+def get_chat_job(job_id: str) -> JobResponse:
+    """Return the current status, finished stages and result of a job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobResponse(**job.to_dict())
+
+@router.get("/chat/jobs/{job_id}/events")
+async def stream_chat_job(job_id: str) -> StreamingResponse:
+    """
+    Stream job progress as Server-Sent Events.
+
+    Emits one `stage` event per finished crew task, followed by a single
+    `done` or `error` event, then closes the stream.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        cursor = 0
+        idle = 0.0
+        while True:
+            # Snapshot the finished flag first: events are appended before it flips
+            finished = job.finished
+            events = job.events[cursor:]
+            for event in events:
+                yield _sse(event["event"], event)
+            cursor += len(events)
+            if finished and cursor >= len(job.events):
+                break
+
+            if events:
+                idle = 0.0
+            elif idle >= JOB_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+            idle += JOB_EVENTS_POLL_INTERVAL
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: Request,
+    prompt: str = Form(...),
+    model: str = Form("crew"),
+    pipeline: Optional[str] = Form(None),
+    x_client_id: Optional[str] = Header(None),
+    x_priority: Optional[str] = Header(None),
+    x_deadline: Optional[float] = Header(None),
+):
+    """
+    Stream the final answer token by token as Server-Sent Events.
+    
+    Args:
+        prompt: User's mathematical problem
+        model: "crew" streams the math_explainer output of the full crew,
+            "local" streams the fine-tuned Qwen model directly
+        pipeline: With model "crew": "crew", "lean" (streams the lean
+            explainer call) or "speculative" (one chunk); defaults to AI_PIPELINE
+        x_client_id, x_priority, x_deadline: Admission parameters, as for /chat
+            
+    Returns:
+        An SSE stream of `token` events followed by one `done` (with the
+        full answer) or `error` event, or a 429/503 with Retry-After when
+        the request is shed
+    """
+    if not prompt or not prompt.strip():
+        raise HTTPException(status_code=422, detail="Prompt cannot be empty")
+    if model not in ("crew", "local"):
+        raise HTTPException(status_code=422, detail=f"Unknown model: {model}")
+    pipeline = _pipeline(pipeline)
+    priority = _priority(x_priority)
+
+    # Admit before the response starts so a rejection can still set the status code;
+    # the slot is then held until the stream is sent or the client goes away
+    try:
+        slot = await _admit(request, x_client_id, priority, x_deadline)
+    except AdmissionRejected as e:
+        return _rejected(e)
+
+    logger.info(f"Streaming prompt ({model}): {prompt}")
+
+    def token_stream():
+        with REQUESTS_IN_FLIGHT.labels("chat_stream").track_inprogress(), REQUEST_DURATION.labels("chat_stream").time():
+            yield from _tokens()
+
+    def _tokens():
+        pieces = []
+        try:
+            if model == "local":
+                tokens = _get_text_generator().stream(prompt)
+            else:
+                tokens = stream(inputs=prompt, pipeline=pipeline)
+            while True:
+                try:
+                    token = next(tokens)
+                except StopIteration as stop:
+                    # crew_run.stream returns the crew output once the last chunk is out
+                    result = stop.value
+                    break
+                pieces.append(token)
+                yield _sse("token", {"token": token})
+            answer = extract_answer(result) or "".join(pieces).strip()
+            yield _sse("done", {"response": answer})
+        except Exception as e:
+            logger.error(f"Error streaming prompt: {str(e)}", exc_info=True)
+            yield _sse("error", {"error": f"Failed to process prompt: {str(e)}"})
+
+    return _SlotStreamingResponse(
+        token_stream(),
+        slot,
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@router.post("/chat/batch")
+def chat_batch(
+    batch: BatchRequest,
+    request: Request,
+    x_client_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """
+    Solve many prompts with bounded concurrency.
+    
+    Results are streamed as newline-delimited JSON in completion order, one
+    line per prompt with its index, status (success | error | timeout),
+    response and error, so one slow problem never holds back the others.
+    
+    Items are admitted at batch priority under the caller's client id, so
+    a batch runs at most AI_PER_CLIENT_LIMIT items at once (fewer while the
+    client has other requests in flight; items shed then are errors). Each
+    item runs under a deadline of `timeout` seconds, so a timed-out item
+    stops and gives its admission slot back.
+    """
+    if not batch.prompts:
+        raise HTTPException(status_code=422, detail="Prompts cannot be empty")
+    if len(batch.prompts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} prompts per batch")
+    pipeline = _pipeline(batch.pipeline)
+    client = _client_id(request, x_client_id)
+    concurrency = min(batch.concurrency, admission.per_client_limit)
+
+    logger.info(f"Processing batch of {len(batch.prompts)} prompts (concurrency={concurrency})")
+
+    def result_stream():
+        with REQUESTS_IN_FLIGHT.labels("chat_batch").track_inprogress(), REQUEST_DURATION.labels("chat_batch").time():
+            yield from _batch_items()
+
+    def admitted_run(prompt):
+        # Batch items queue behind interactive traffic; the item timeout counts from here
+        deadline = Deadline.after(batch.timeout)
+        slot = ExitStack()
+        slot.enter_context(admission.admit(client, priority=Priority.BATCH))
+        try:
+            return run(inputs=prompt, pipeline=pipeline, deadline=deadline)
+        finally:
+            _release_when_settled(slot, deadline)
+
+    def _batch_items():
+        for item in run_batch(
+            batch.prompts,
+            runner=admitted_run,
+            concurrency=concurrency,
+            item_timeout=batch.timeout,
+        ):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@router.get("/admin/cache")
+def answer_cache_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return answer cache size and hit/miss counters."""
+    _require_admin(x_admin_token)
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+@router.delete("/admin/cache")
+def invalidate_answer_cache(prompt: Optional[str] = None, x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Invalidate cached answers.
+    
+    Args:
+        prompt: Drop only this prompt's answer (matched after normalization);
+            when omitted the whole cache is cleared
+    """
+    _require_admin(x_admin_token)
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        raise HTTPException(status_code=404, detail="Answer cache is disabled")
+    removed = answer_cache.invalidate(prompt)
+    logger.info(f"Invalidated {removed} cached answers")
+    return {"removed": removed}
+
+@router.get("/admin/stage-cache")
+def stage_cache_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return stage cache size and per-task hit ratios."""
+    _require_admin(x_admin_token)
+    stage_cache = get_stage_cache()
+    if stage_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **stage_cache.stats()}
+
+@router.delete("/admin/stage-cache")
+def invalidate_stage_cache(stage: Optional[str] = None, x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Invalidate cached stage outputs.
+    
+    Args:
+        stage: Drop only this task's outputs (e.g. explain_solution); when
+            omitted the whole cache is cleared
+    """
+    _require_admin(x_admin_token)
+    stage_cache = get_stage_cache()
+    if stage_cache is None:
+        raise HTTPException(status_code=404, detail="Stage cache is disabled")
+    removed = stage_cache.invalidate(stage)
+    logger.info(f"Invalidated {removed} cached stage outputs")
+    return {"removed": removed}
+
+@router.get("/admin/llm-cache")
+def llm_cache_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return LLM response cache size and hit rates per agent role."""
+    _require_admin(x_admin_token)
+    from config.llm_cache import get_cache
+    llm_cache = get_cache()
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
+
+@router.delete("/admin/llm-cache")
+def invalidate_llm_cache(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Drop every cached LLM response (e.g. after changing prompts or provider settings)."""
+    _require_admin(x_admin_token)
+    from config.llm_cache import get_cache
+    llm_cache = get_cache()
+    if llm_cache is None:
+        raise HTTPException(status_code=404, detail="LLM response cache is disabled")
+    removed = llm_cache.invalidate()
+    logger.info(f"Invalidated {removed} cached LLM responses")
+    return {"removed": removed}
+
+@router.get("/admin/usage")
+def usage_summary(
+    group_by: str = "stage",
+    tenant: Optional[str] = None,
+    since: Optional[float] = None,
+    x_admin_token: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+    """
+    Return LLM token and cost totals from the usage ledger.
+    
+    Args:
+        group_by: "stage" (default), "agent", "model" or "tenant"
+        tenant: Only this client's calls
+        since: Only calls at or after this Unix time
+    """
+    _require_admin(x_admin_token)
+    ledger = usage.get_ledger()
+    if ledger is None:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, **ledger.summary(group_by, since=since, tenant=tenant)}
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+@router.get("/admin/usage/{request_id}")
+def usage_for_request(request_id: str, x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return every LLM call recorded for one request."""
+    _require_admin(x_admin_token)
+    ledger = usage.get_ledger()
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Usage ledger is disabled")
+    calls = ledger.request(request_id)
+    if not calls:
+        raise HTTPException(status_code=404, detail=f"No usage recorded for request {request_id}")
+    return {"request_id": request_id, "calls": calls}
+
+@router.get("/metrics")
+def metrics() -> Response:
+    """Prometheus metrics: per-task, per-tool and per-LLM-call latency, tokens, load gauges."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/admin/admission")
+def admission_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return admission queue state, service time estimate and rejection counts."""
+    _require_admin(x_admin_token)
+    return {**admission.stats(), "async": async_admission.stats()}
+
+@router.get("/admin/startup")
+def startup_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return which heavy components this worker has loaded and what each cost."""
+    _require_admin(x_admin_token)
+    return startup_report()
+
+@router.get("/admin/fast-path")
+def fast_path_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return how many prompts the deterministic router answered without the crew, per route."""
+    _require_admin(x_admin_token)
+    if fast_path is None:
+        return {"enabled": False}
+    return {"enabled": True, **fast_path.stats()}
+
+@router.get("/admin/compaction")
+def compaction_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return estimated tokens of each stage's output before and after context compaction."""
+    _require_admin(x_admin_token)
+    from agents.compaction import compactor
+    return compactor.stats()
+
+@router.get("/admin/llm-clients")
+def llm_client_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return the shared LLM client pool and cached provider health probes."""
+    _require_admin(x_admin_token)
+    from config import llm_clients
+    return llm_clients.stats()
+
+@router.get("/admin/llm-router")
+def llm_router_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return per-provider latency, error rate and circuit breaker state of the LLM router."""
+    _require_admin(x_admin_token)
+    from agents.multi_agents import get_llm_router
+    llm_router = get_llm_router() if get_llm_router.loaded() else None
+    if llm_router is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_router.stats()}
+
+@router.get("/admin/model-routing")
+def model_routing_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return each crew stage's LLM latency, tokens and cost per model, and how often hard prompts escalated."""
+    _require_admin(x_admin_token)
+    from agents import crew_run
+    if crew_run.crew_metrics is None:
+        return {"stages": {}, "escalation": None}
+    from agents.multi_agents import get_escalation_policy
+    return {"stages": crew_run.crew_metrics.usage.stats(), "escalation": get_escalation_policy().stats()}
 
+@router.get("/admin/speculation")
+def speculation_stats(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Return how often the speculative pipeline kept its early explanation and the latency it saved."""
+    _require_admin(x_admin_token)
+    from agents.speculative import speculator
+    return speculator.stats()
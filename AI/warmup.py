@@ -0,0 +1,139 @@
+"""
+Startup warmup and readiness for the AI service.
+
+Each worker runs `preload()` in the app lifespan before it accepts traffic
+(heavy imports, LLMConfig, MathCrew construction, one call per math tool),
+then asks the crew a warmup question in the background. GET /readyz only
+reports ready once that is done, so the orchestrator never routes a user to
+a cold worker.
+
+Environment:
+- AI_WARMUP: crew (default) | tools (skip the LLM warmup question) | off
+  (off keeps crewai unloaded until the first crew request)
+- AI_WARMUP_QUESTION: question sent through MathCrew
+- AI_WARMUP_STRICT: 1 keeps the worker not-ready when the crew warmup fails
+"""
+
+import os
+import time
+import logging
+import threading
+
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODE = os.getenv("AI_WARMUP", "crew").lower()
+WARMUP_QUESTION = os.getenv("AI_WARMUP_QUESTION", "Solve x + 2 = 5")
+WARMUP_STRICT = os.getenv("AI_WARMUP_STRICT", "0") == "1"
+
+# One cheap call per tool so sympy/numpy code paths are compiled and cached
+TOOL_WARMUP_CALLS = [
+    {"tool": "calculator", "action": None, "args": {"expression": "2 + 3"}},
+    {"tool": "equation_solver", "action": "solve_equation", "args": {"equation": "x + 2 = 5", "var": "x"}},
+    {"tool": "symbolic_math", "action": "derivative", "args": {"expr": "sin(x)*x**2", "var": "x"}},
+    {"tool": "matrix", "action": "determinant", "args": {"A": [[1, 2], [3, 4]]}},
+    {"tool": "statistics", "action": "mean", "args": {"data": [1, 2, 3]}},
+]
+
+
+class Readiness:
+    """
+    Readiness state of this worker.
+
+    state is "starting" until warmup finished, then "ready" (or "failed" when
+    a required step raised). Every step is recorded in `checks` with its
+    status and duration so /readyz shows why a worker is not ready.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = "starting"
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def check(self, name: str, fn: Callable[[], Any]) -> bool:
+        """Run one warmup step and record its outcome"""
+        start = time.perf_counter()
+        try:
+            fn()
+            result = {"status": "ok"}
+        except Exception as e:
+            logger.error(f"Warmup step {name} failed: {str(e)}")
+            result = {"status": "error", "error": str(e)}
+        result["elapsed"] = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self.checks[name] = result
+        return result["status"] == "ok"
+
+    def finish(self, ok: bool) -> None:
+        with self._lock:
+            self.state = "ready" if ok else "failed"
+        logger.info(f"Worker {os.getpid()} is {self.state} after {time.time() - self.started_at:.1f}s")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"status": self.state, "pid": os.getpid(), "checks": dict(self.checks)}
+
+
+readiness = Readiness()
+
+
+def preload() -> bool:
+    """Import the crew stack, build a MathCrew and exercise every tool"""
+    def load_crew():
+        # crewai, the tool registry and LLMConfig are all deferred until here
+        from agents.crew_run import load_crew
+        from agents.multi_agents import new_crew
+        load_crew()
+        new_crew()
+
+    def run_tools():
+        from agents.multi_agents import get_executor
+        executor = get_executor()
+        for call in TOOL_WARMUP_CALLS:
+            executor.execute(call)
+
+    return readiness.check("crew_import", load_crew) and readiness.check("tools", run_tools)
+
+
+def warm_crew() -> bool:
+    """Send the warmup question through a full crew run, bypassing the answer and stage caches"""
+    def kickoff():
+        from agents.crew_run import _kickoff
+        _kickoff(WARMUP_QUESTION, cached=False)
+
+    return readiness.check("crew_warmup", kickoff)
+
+
+def start() -> None:
+    """
+    Warm this worker up; called from the app lifespan before serving.
+
+    The preload runs synchronously so the worker does not accept requests
+    until imports and tools are hot. The crew warmup question goes to the LLM
+    provider and may take a while, so it runs in the background and /readyz
+    reports "starting" until it completes.
+    """
+    if WARMUP_MODE == "off":
+        readiness.finish(True)
+        return
+
+    if not preload():
+        readiness.finish(False)
+        return
+
+    if WARMUP_MODE != "crew":
+        readiness.finish(True)
+        return
+
+    def background():
+        ok = warm_crew()
+        # A flaky provider during startup shouldn't keep the worker out of rotation forever
+        readiness.finish(ok or not WARMUP_STRICT)
+
+    threading.Thread(target=background, name="crew-warmup", daemon=True).start()